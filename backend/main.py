@@ -1,13 +1,15 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse
 from backend.services.database import engine, SessionLocal, get_db
 from backend.services.models import Base, Room
 from backend.routers import auth, admin, student, groups, stats
-from backend.services import models, database
+from backend.services import models, database, migrations, storage, ingestion
 from fastapi.staticfiles import StaticFiles
 import os
 
-models.Base.metadata.create_all(bind=database.engine)
+migrations.run_migrations(database.engine)
 
 def seed_rooms():
     db = SessionLocal()
@@ -31,7 +33,40 @@ def seed_rooms():
     print("Rooms added successfully!")
     db.close()
 
-app = FastAPI()
+# Responses smaller than this aren't worth compressing
+GZIP_MIN_BYTES = int(os.getenv("GZIP_MIN_BYTES", "1024"))
+
+class CompressAPIResponses:
+    """
+    GZip for API responses only. PDFs under /static and JPEG previews are
+    already compressed, so gzipping them would just burn CPU.
+    """
+    def __init__(self, app):
+        self.app = app
+        self.gzip = GZipMiddleware(app, minimum_size=GZIP_MIN_BYTES, compresslevel=6)
+
+    async def __call__(self, scope, receive, send):
+        path = scope.get("path", "")
+        if scope["type"] == "http" and not path.startswith("/static/") and not path.endswith("/preview"):
+            await self.gzip(scope, receive, send)
+        else:
+            await self.app(scope, receive, send)
+
+app = FastAPI(default_response_class=ORJSONResponse)
+
+app.add_middleware(CompressAPIResponses)
+
+# Refuse oversized uploads from the Content-Length header, before the body is parsed.
+# Registered before CORS, so CORS wraps it and the browser can read the 413
+@app.middleware("http")
+async def limit_upload_size(request: Request, call_next):
+    if request.method == "POST":
+        path = request.url.path
+        files = ingestion.MAX_BATCH_FILES if path.endswith("/batch-upload") else 1
+        if (path.endswith("/upload") or files > 1) \
+                and storage.exceeds_limit(request.headers.get("content-length"), files):
+            return JSONResponse(status_code=413, content={"detail": storage.too_large_message()})
+    return await call_next(request)
 
 app.add_middleware(
     CORSMiddleware,
@@ -1,135 +1,323 @@
 import sys
 import os
+import argparse
 import random
+import time
+from collections import Counter, defaultdict
 from datetime import datetime, timedelta, timezone
 
 # Add Project Root to System Path
 current_dir = os.path.dirname(os.path.abspath(__file__))
 parent_dir = os.path.dirname(current_dir)
-sys.path.append(parent_dir) 
+sys.path.append(parent_dir)
 
+from sqlalchemy import func, insert
 from sqlalchemy.orm import Session
 from backend.services.database import SessionLocal, engine, Base
-from backend.services import models, auth
+from backend.services.migrations import run_migrations
+from backend.services import models, auth, counters
 
-# CONFIGURATION
-NUM_USERS = 5
-NUM_RESOURCES = 50
-NUM_RATINGS = 40
+# Synthetic dataset generator for development and load testing.
+# Every table is written with bulk executemany inserts in batches, all users
+# share one precomputed password hash ("password123"), rating pairs are drawn
+# without DB lookups, and the denormalized counters are computed in memory so
+# the result is consistent without running repair_counters.py.
+#
+#   python backend/populatedb.py                                  # small dev dataset
+#   python backend/populatedb.py --users 50000 --resources 200000 --ratings 1000000 \
+#       --comments 300000 --groups 2000 --messages 1000000 --pdfs 20 --seed 7
+
+FIXTURE_DIR = "static/uploads/fixtures"
+DEFAULT_ROOMS = [
+    ("Computer Science", "cs"),
+    ("Electronics & Comm", "ece"),
+    ("Mechanical Eng", "mech"),
+    ("Civil Engineering", "civil"),
+    ("Basic Sciences (Phy/Chem/Math)", "science"),
+    ("Management & Humanities", "hum"),
+]
+TAG_POOL = ["notes", "exam", "assignment", "lab", "slides", "solutions", "summary",
+            "important", "past papers", "cheat sheet", "tutorial", "project"]
+WORDS = (
+    "entropy gradient matrix vector theorem lemma proof algorithm complexity graph tree "
+    "signal voltage current circuit stress strain beam torque fluid pressure enzyme cell "
+    "market demand supply equilibrium integral derivative limit series probability sample "
+    "variance regression network protocol memory cache compiler kernel process thread"
+).split()
+
+
+def sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_fixture_pdf(path: str, title: str, pages: int, rng: random.Random, lines_per_page: int = 40):
+    """
+    Writes a small text PDF (no external tools). Every page carries the same
+    course-code header and a page-number footer, like real lecture notes.
+    Fewer lines_per_page makes it look more like a slide deck.
+    """
+    header = f"{title.upper()} | DEPT-{rng.randint(100, 999)} | University of Example"
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in once the page objects are numbered
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_ids = []
+    for page_number in range(1, pages + 1):
+        lines = [header, ""] + [sentence(rng, rng.randint(8, 14)) for _ in range(lines_per_page)] + ["", f"Page {page_number}"]
+        stream = "BT /F1 10 Tf 50 800 Td 14 TL " + " ".join(f"({_pdf_escape(line)}) Tj T*" for line in lines) + " ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        content_id = len(objects)
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>"
+        )
+        page_ids.append(len(objects))
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(f'{i} 0 R' for i in page_ids)}] /Count {len(page_ids)} >>"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref_at = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref_at}\n%%EOF\n".encode()
+
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def bulk_insert(db: Session, table, rows, batch_size: int) -> int:
+    """executemany in batches; rows can be any iterable of dicts."""
+    total = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            db.execute(insert(table), batch)
+            total += len(batch)
+            batch = []
+    if batch:
+        db.execute(insert(table), batch)
+        total += len(batch)
+    return total
+
+
+def next_id(db: Session, column) -> int:
+    return (db.query(func.max(column)).scalar() or 0) + 1
+
+
+def populate(users=5, rooms=6, resources=50, ratings=40, comments=0, groups=0, messages=0,
+             members_per_group=5, pdfs=0, pdf_pages=8, days=7, seed=None, batch_size=20000):
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
 
-def populate():
     # 1. Init Database
-    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
     db: Session = SessionLocal()
-
     print("🔌 Connected to Database...")
+    started = time.perf_counter()
+
+    def step(label, count):
+        print(f"   {label:<14} {count:>10,} rows   ({time.perf_counter() - started:6.1f}s)")
 
     try:
-        # --- 1. CREATE USERS ---
-        print("👤 Creating users...")
-        users = []
-        for i in range(NUM_USERS):
-            email = f"student{i}@test.com"
-            existing = db.query(models.User).filter(models.User.email == email).first()
-            
-            if existing:
-                users.append(existing)
-            else:
-                new_user = models.User(
-                    email=email,
-                    full_name=f"Student {i}",
-                    password_hash=auth.hash_password("password123"), 
-                    role=models.UserRole.STUDENT, 
-                    last_login=datetime.now(timezone.utc)
-                )
-                db.add(new_user)
-                users.append(new_user)
-        
-        db.commit() 
-        for u in users: db.refresh(u) 
-
-        # --- 2. CREATE ROOMS ---
+        # --- 1. ROOMS (small; plain ORM) ---
         print("🏫 Checking rooms...")
-        room_slugs = ["cs", "ece", "mech", "civil", "science", "hum"]
-        rooms = []
-        for slug in room_slugs:
-            room = db.query(models.Room).filter(models.Room.slug == slug).first()
-            if not room:
-                room = models.Room(name=slug.upper(), slug=slug)
-                db.add(room)
-            rooms.append(room)
+        wanted = DEFAULT_ROOMS + [(f"Room {i}", f"room-{i}") for i in range(len(DEFAULT_ROOMS) + 1, rooms + 1)]
+        existing = {r.slug for r in db.query(models.Room)}
+        db.add_all(models.Room(name=name, slug=slug) for name, slug in wanted[:rooms] if slug not in existing)
         db.commit()
-        # Refresh to get IDs
-        for r in rooms: db.refresh(r)
+        room_ids = [r.id for r in db.query(models.Room).order_by(models.Room.id).limit(rooms)]
+
+        # --- 2. FIXTURE PDFS ---
+        fixture_paths = ["fake/path.pdf"]
+        if pdfs:
+            print(f"📄 Writing {pdfs} fixture PDFs to {FIXTURE_DIR}...")
+            os.makedirs(FIXTURE_DIR, exist_ok=True)
+            fixture_paths = []
+            for i in range(pdfs):
+                path = f"{FIXTURE_DIR}/fixture_{i:04d}.pdf"
+                write_fixture_pdf(path, f"Course {i}", pdf_pages, rng)
+                fixture_paths.append(path)
 
-        # --- 3. CREATE RESOURCES ---
+        # --- 3. USERS (one bcrypt hash for everyone) ---
+        print("👤 Creating users...")
+        password_hash = auth.hash_password("password123")
+        first_user = next_id(db, models.User.id)
+        user_ids = list(range(first_user, first_user + users))
+
+        # --- 4. PLAN RATINGS FIRST, so resource/user counters are known up front ---
+        first_resource = next_id(db, models.Resource.id)
+        resource_ids = list(range(first_resource, first_resource + resources))
+        ratings = min(ratings, users * resources)
+        # Unique (user, resource) pairs straight from the index space: no DB checks
+        pairs = rng.sample(range(users * resources), ratings) if ratings else []
+        stars_for = [rng.choices((1, 2, 3, 4, 5), weights=(1, 1, 3, 5, 5))[0] for _ in pairs]
+
+        rating_sum = [0] * resources
+        rating_count = [0] * resources
+        for pair, stars in zip(pairs, stars_for):
+            r = pair % resources
+            rating_sum[r] += stars
+            rating_count[r] += 1
+
+        # Group ids are needed for group-shared resources
+        first_group = next_id(db, models.StudyGroup.id)
+        group_ids = list(range(first_group, first_group + groups))
+
+        # Each resource: uploader, room (or ~10% shared in a group), date
+        uploader_of = [rng.choice(user_ids) for _ in resource_ids] if users else []
+        in_group = [bool(group_ids) and rng.random() < 0.1 for _ in resource_ids]
+        room_of = [None if shared else rng.choice(room_ids) for shared in in_group]
+        created_of = [now - timedelta(days=rng.random() * days) for _ in resource_ids]
+        tags_of = [rng.sample(TAG_POOL, rng.randint(1, 3)) for _ in resource_ids]
+        comment_on = [rng.randrange(resources) for _ in range(comments)] if resources else []
+        comment_count = Counter(comment_on)
+
+        karma = Counter()
+        room_karma = Counter()
+        for r in range(resources):
+            if rating_sum[r]:
+                karma[uploader_of[r]] += rating_sum[r]
+                if room_of[r] is not None:
+                    room_karma[(uploader_of[r], room_of[r])] += rating_sum[r]
+
+        step("users", bulk_insert(db, models.User.__table__, (
+            {
+                "id": user_id,
+                "email": f"student{user_id}@test.com",
+                "full_name": f"Student {user_id}",
+                "password_hash": password_hash,
+                "role": models.UserRole.STUDENT,
+                "created_at": now - timedelta(days=days + rng.random() * 30),
+                "last_login": now - timedelta(hours=rng.random() * 24 * days),
+                "karma": karma[user_id],
+            }
+            for user_id in user_ids
+        ), batch_size))
+
+        # --- 5. STUDY GROUPS + MEMBERS ---
+        print("👥 Creating study groups...")
+        members_of = {}
+        for group_id in group_ids:
+            creator = rng.choice(user_ids)
+            others = rng.sample(user_ids, min(members_per_group, len(user_ids)))
+            members_of[group_id] = (creator, sorted(set(others) | {creator}))
+
+        step("study_groups", bulk_insert(db, models.StudyGroup.__table__, (
+            {
+                "id": group_id,
+                "name": f"Study Group {group_id}",
+                "description": sentence(rng, 6),
+                "created_at": now - timedelta(days=rng.random() * days),
+                "creator_id": creator,
+                "member_count": len(members),
+            }
+            for group_id, (creator, members) in members_of.items()
+        ), batch_size))
+        step("group_members", bulk_insert(db, models.group_members, (
+            {"group_id": group_id, "user_id": user_id}
+            for group_id, (_, members) in members_of.items()
+            for user_id in members
+        ), batch_size))
+
+        # --- 6. RESOURCES ---
         print("📄 Generating backdated uploads...")
-        resources = []
-        for _ in range(NUM_RESOURCES):
-            days_ago = random.randint(0, 7)
-            fake_date = datetime.now(timezone.utc) - timedelta(days=days_ago)
-            
-            uploader = random.choice(users)
-            room = random.choice(rooms) 
-
-            res = models.Resource(
-                title=f"Notes for Subject {random.randint(101, 999)}",
-                file_path="fake/path.pdf",
-                tags="notes,pdf,important",
-                ai_summary="This is a generated summary for testing.",
-                uploader_id=uploader.id,
-                room_id=room.id,
-                created_at=fake_date 
-            )
-            db.add(res)
-            resources.append(res)
-        
-        db.commit()
-        for r in resources: db.refresh(r)
+        step("resources", bulk_insert(db, models.Resource.__table__, (
+            {
+                "id": resource_ids[r],
+                "title": f"Notes for Subject {rng.randint(101, 999)}",
+                "file_path": fixture_paths[r % len(fixture_paths)],
+                "tags": ", ".join(tags_of[r]),
+                "ai_summary": "This is a generated summary for testing.",
+                "created_at": created_of[r],
+                "rating_sum": rating_sum[r],
+                "rating_count": rating_count[r],
+                "comment_count": comment_count[r],
+                "uploader_id": uploader_of[r],
+                "room_id": room_of[r],
+                "group_id": rng.choice(group_ids) if in_group[r] else None,
+            }
+            for r in range(resources)
+        ), batch_size))
+
+        tag_id_of = counters.tag_ids(db, TAG_POOL)
+        step("resource_tags", bulk_insert(db, models.resource_tags, (
+            {"resource_id": resource_ids[r], "tag_id": tag_id_of[name]}
+            for r in range(resources)
+            for name in tags_of[r]
+        ), batch_size))
 
-        # --- 4. ADD RATINGS (FIXED LOGIC) ---
+        # --- 7. RATINGS ---
         print("⭐ Adding ratings...")
-        
-        # Track pairs we've already added in this session to prevent duplicates
-        seen_pairs = set()
-        
-        count = 0
-        max_retries = NUM_RATINGS * 2 # Safety break
-        
-        while count < NUM_RATINGS and max_retries > 0:
-            user = random.choice(users)
-            res = random.choice(resources)
-            pair = (user.id, res.id)
-            
-            # 1. Skip if we just decided to add this pair a second ago
-            if pair in seen_pairs:
-                max_retries -= 1
-                continue
-
-            # 2. Skip if it's already in the DB (from a previous run)
-            db_exists = db.query(models.Rating).filter(
-                models.Rating.user_id == user.id, 
-                models.Rating.resource_id == res.id
-            ).first()
-
-            if db_exists:
-                seen_pairs.add(pair)
-                max_retries -= 1
-                continue
-
-            # 3. Add Valid Rating
-            rating = models.Rating(
-                user_id=user.id,
-                resource_id=res.id,
-                stars=random.randint(3, 5),
-                value=0
-            )
-            db.add(rating)
-            seen_pairs.add(pair)
-            count += 1
+        step("ratings", bulk_insert(db, models.Rating.__table__, (
+            {
+                "user_id": user_ids[pair // resources],
+                "resource_id": resource_ids[pair % resources],
+                "stars": stars,
+                "value": 0,
+            }
+            for pair, stars in zip(pairs, stars_for)
+        ), batch_size))
+
+        # --- 8. COMMENTS ---
+        if comments and resources:
+            print("💬 Adding comments...")
+            step("comments", bulk_insert(db, models.Comment.__table__, (
+                {
+                    "content": sentence(rng, rng.randint(5, 20)),
+                    "is_verified": rng.random() < 0.1,
+                    "created_at": now - timedelta(days=rng.random() * days),
+                    "user_id": rng.choice(user_ids),
+                    "resource_id": resource_ids[r],
+                }
+                for r in comment_on
+            ), batch_size))
+
+        # --- 9. CHAT MESSAGES (ids ascend with time inside each group) ---
+        if messages and group_ids:
+            print("📨 Adding chat messages...")
+            per_group = defaultdict(int)
+            for _ in range(messages):
+                per_group[rng.choice(group_ids)] += 1
+
+            def message_rows():
+                for group_id, count in per_group.items():
+                    members = members_of[group_id][1]
+                    start = now - timedelta(days=days)
+                    step_seconds = days * 86400 / max(count, 1)
+                    for i in range(count):
+                        yield {
+                            "content": sentence(rng, rng.randint(3, 15)),
+                            "timestamp": start + timedelta(seconds=i * step_seconds),
+                            "user_id": rng.choice(members),
+                            "group_id": group_id,
+                        }
+
+            step("messages", bulk_insert(db, models.Message.__table__, message_rows(), batch_size))
+
+        # --- 10. COUNTERS THAT SPAN EXISTING ROWS ---
+        step("room_karma", bulk_insert(db, models.RoomKarma.__table__, (
+            {"user_id": user_id, "room_id": room_id, "karma": total}
+            for (user_id, room_id), total in room_karma.items()
+        ), batch_size))
+        for day, count in Counter(created.date() for created in created_of).items():
+            counters.bump_daily(db, day, uploads=count)
+        tag_counts = Counter(
+            (room_of[r], name) for r in range(resources) if room_of[r] is not None for name in tags_of[r]
+        )
+        for (room_id, name), count in tag_counts.items():
+            counters.bump_tag(db, tag_id_of[name], room_id, count)
 
         db.commit()
-        print("✅ Success! Database populated correctly.")
+        print(f"✅ Success! Database populated in {time.perf_counter() - started:.1f}s.")
 
     except Exception as e:
         print(f"❌ Error: {e}")
@@ -137,5 +325,27 @@ def populate():
     finally:
         db.close()
 
+
 if __name__ == "__main__":
-    populate()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Generate a synthetic Unimind dataset")
+    parser.add_argument("--users", type=int, default=5)
+    parser.add_argument("--rooms", type=int, default=6)
+    parser.add_argument("--resources", type=int, default=50)
+    parser.add_argument("--ratings", type=int, default=40)
+    parser.add_argument("--comments", type=int, default=0)
+    parser.add_argument("--groups", type=int, default=0)
+    parser.add_argument("--members-per-group", type=int, default=5)
+    parser.add_argument("--messages", type=int, default=0)
+    parser.add_argument("--pdfs", type=int, default=0, help="write N fixture PDFs and point resources at them")
+    parser.add_argument("--pdf-pages", type=int, default=8)
+    parser.add_argument("--days", type=int, default=7, help="spread timestamps over the last N days")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=20000)
+    args = parser.parse_args()
+
+    populate(
+        users=args.users, rooms=args.rooms, resources=args.resources, ratings=args.ratings,
+        comments=args.comments, groups=args.groups, messages=args.messages,
+        members_per_group=args.members_per_group, pdfs=args.pdfs, pdf_pages=args.pdf_pages,
+        days=args.days, seed=args.seed, batch_size=args.batch_size,
+    )
@@ -1,13 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from backend.services import auth, models, database
+from backend.services import auth, models, database, counters, passwords, ai_services, page_text
 import os
 
 # Dependency: Block anyone who is NOT an admin
-def require_admin(user: models.User = Depends(auth.get_current_user)):
-    if user.role != models.UserRole.ADMIN: 
+# The role travels in the signed JWT, so this never touches the DB
+def require_admin(claims: dict = Depends(auth.get_token_claims)):
+    if claims.get("role") != models.UserRole.ADMIN.value: 
         raise HTTPException(status_code=403, detail="Admins only")
-    return user
+    return claims
 
 router = APIRouter(
     prefix="/admin", 
@@ -15,6 +16,13 @@ router = APIRouter(
     dependencies=[Depends(require_admin)] # 🔒 Protects ALL endpoints below
 )
 
+@router.get("/password-pool")
+def password_pool_metrics():
+    """
+    Load on the bcrypt executor (queue depth, rejections, avg wait/work time)
+    """
+    return passwords.metrics()
+
 @router.put("/verify-comment/{comment_id}")
 def verify_comment(comment_id: int, db: Session = Depends(database.get_db)):
     """
@@ -31,6 +39,21 @@ def verify_comment(comment_id: int, db: Session = Depends(database.get_db)):
     status = "Verified" if comment.is_verified else "Unverified"
     return {"status": f"Comment {status}", "is_verified": comment.is_verified}
 
+@router.delete("/delete-comment/{comment_id}")
+def delete_comment(comment_id: int, db: Session = Depends(database.get_db)):
+    """
+    Admin moderation tool: Remove an abusive or spam comment
+    """
+    comment = db.query(models.Comment).filter(models.Comment.id == comment_id).first()
+    if not comment:
+        raise HTTPException(404, "Comment not found")
+
+    counters.remove_comment(db, comment.resource_id)
+    db.delete(comment)
+    db.commit()
+
+    return {"status": "Comment deleted"}
+
 @router.delete("/delete-resource/{resource_id}")
 def delete_resource(resource_id: int, db: Session = Depends(database.get_db)):
     """
@@ -42,10 +65,21 @@ def delete_resource(resource_id: int, db: Session = Depends(database.get_db)):
         raise HTTPException(404, "Resource not found")
         
     
-    if os.path.exists(resource.file_path):
-        os.remove(resource.file_path)
+    # Storage is content-addressed, so the file may be shared with other uploads
+    shared = db.query(models.Resource.id).filter(
+        models.Resource.file_path == resource.file_path, models.Resource.id != resource.id
+    ).first()
+    if not shared:
+        if os.path.exists(resource.file_path):
+            os.remove(resource.file_path)
+        if resource.sha256:
+            page_text.discard(resource.sha256)
 
+    counters.remove_resource(db, resource)
     db.delete(resource) # This cascades to comments/votes if models are set up right
     db.commit()
+
+    # ...and its chat chunks from the vector store (and from a re-index in progress)
+    ai_services.delete_chunks([resource_id])
     
     return {"status": "Resource and associated data deleted"}
\ No newline at end of file
@@ -1,20 +1,23 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
-from backend.services import database, crud, auth, models, schemas
+from backend.services import database, crud, auth, models, schemas, passwords
 from datetime import datetime, timezone
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
 @router.post("/register", status_code=status.HTTP_201_CREATED, response_model=schemas.UserOut)
-def register(user_data: schemas.UserCreate, db: Session = Depends(database.get_db)):
+async def register(user_data: schemas.UserCreate, db: Session = Depends(database.get_db)):
+    # Async handler: bcrypt runs on its own bounded pool and DB calls hop to
+    # the threadpool, so a sign-up burst never parks the shared workers.
     # Check if user already exists
-    db_user = crud.get_user_by_email(db, email=user_data.email)
+    db_user = await run_in_threadpool(crud.get_user_by_email, db, email=user_data.email)
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
     # Hash the password
-    hashed_pwd = auth.hash_password(user_data.password)
+    hashed_pwd = await passwords.hash_password(user_data.password)
     
     # Create the DB Model
     new_user = models.User(
@@ -27,17 +30,24 @@ def register(user_data: schemas.UserCreate, db: Session = Depends(database.get_d
     
     # Save and Return
     # Note: Ensure crud.create_user adds and commits this user
-    created_user = crud.create_user(db, new_user)
+    created_user = await run_in_threadpool(crud.create_user, db, new_user)
     return created_user
 
 @router.post("/login")
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(database.get_db)):
-    user = crud.get_user_by_email(db, email=form_data.username)
-    if not user or not auth.verify_password(form_data.password, user.password_hash):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(database.get_db)):
+    user = await run_in_threadpool(crud.get_user_by_email, db, email=form_data.username)
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+
+    is_valid, new_hash = await passwords.verify_and_update(form_data.password, user.password_hash)
+    if not is_valid:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
-    user.last_login = datetime.now(timezone.utc)
-    db.commit() # Save the new time to DB
+    changes = {"last_login": datetime.now(timezone.utc)}
+    if new_hash:
+        # Stored hash used an old bcrypt cost: upgrade it while we have the password
+        changes["password_hash"] = new_hash
+    await run_in_threadpool(crud.update_user, db, user, **changes) # Save the new time to DB
     
     access_token = auth.create_token(user)
     
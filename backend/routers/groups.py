@@ -1,10 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, Request, UploadFile, File, Form, WebSocket, WebSocketDisconnect, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from backend.services import database, auth, models
+from sqlalchemy import exists, func
+from backend.services import database, auth, models, crud, chat_broker, counters, storage, http_cache
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 from datetime import datetime
-import shutil
+import asyncio
+import json
 import os
 from backend.services.schemas import GroupCreate, MessageCreate, MessageResponse
 
@@ -28,31 +31,56 @@ def create_group(
         description=group.description,
         creator_id=user.id
     )
-    # Auto-join the creator
-    new_group.members.append(user)
-    
     db.add(new_group)
+    db.flush()
+
+    # Auto-join the creator
+    crud.add_group_member(db, new_group, user.id)
     db.commit()
     return {"msg": "Group created!", "id": new_group.id}
 
 @router.get("/all")
-def get_all_groups(db: Session = Depends(database.get_db),
+def get_all_groups(request: Request,
+                   search: Optional[str] = None,  # name prefix, case-insensitive
+                   limit: int = 50,
+                   offset: int = 0,
+                   db: Session = Depends(database.get_db),
                    user: models.User = Depends(auth.get_current_user),):
+    limit = max(1, min(limit, 200))
+    offset = max(0, offset)
 
-    # Returns list of groups with member count
-    groups = db.query(models.StudyGroup).all()
+    # is_member makes the list per-user
+    etag = http_cache.etag(db, "groups", user.id, request.url.query)
+    if http_cache.is_fresh(request, etag):
+        return http_cache.not_modified(etag)
 
-    return [
+    # Membership is a PK lookup per row, member count is a stored counter
+    is_member = exists().where(
+        models.group_members.c.group_id == models.StudyGroup.id,
+        models.group_members.c.user_id == user.id
+    )
+    name_key = func.lower(models.StudyGroup.name)
+
+    query = db.query(models.StudyGroup, is_member.label("is_member"))
+
+    if search:
+        # Prefix match as a range so it walks the lower(name) index
+        prefix = search.lower()
+        query = query.filter(name_key >= prefix, name_key < prefix + "\uffff")
+
+    groups = query.order_by(name_key).offset(offset).limit(limit).all()
+
+    return http_cache.json_response([
         {
             "id": g.id,
             "name": g.name,
             "description": g.description,
             "creator_id": g.creator_id,
-            "member_count": len(g.members),
-            "is_member": user in g.members
+            "member_count": g.member_count,
+            "is_member": bool(member)
         }
-        for g in groups
-    ]
+        for g, member in groups
+    ], etag)
 
 @router.post("/{group_id}/join")
 def join_group(
@@ -64,10 +92,10 @@ def join_group(
     if not group:
         raise HTTPException(404, "Group not found")
         
-    if user in group.members:
+    if crud.is_group_member(db, group.id, user.id):
         return {"msg": "Already a member"}
         
-    group.members.append(user)
+    crud.add_group_member(db, group, user.id)
     db.commit()
     return {"msg": f"Joined {group.name}!"}
 
@@ -103,7 +131,7 @@ def send_message(
         raise HTTPException(404, "Group not found")
 
     # 2. STRICT SECURITY: Only members can chat
-    if user not in group.members:
+    if not crud.is_group_member(db, group.id, user.id):
         raise HTTPException(403, "You must join the group to send messages.")
     
     new_msg = models.Message(
@@ -113,35 +141,139 @@ def send_message(
     )
     db.add(new_msg)
     db.commit()
-    return {"msg": "Sent"}
+
+    # Push to anyone connected over the WebSocket
+    chat_broker.get_broker().publish(group_id, _message_payload(new_msg, user.full_name))
+    return {"msg": "Sent", "id": new_msg.id}
 
 @router.get("/{group_id}/messages", response_model=List[MessageResponse])
 def get_chat_history(
     group_id: int,
+    request: Request,
+    since_id: Optional[int] = None,   # Polling: only messages newer than this id
+    before_id: Optional[int] = None,  # Scrollback: the page just older than this id
+    limit: int = 50,
     db: Session = Depends(database.get_db)
 ):
-    msgs = db.query(models.Message)\
-        .filter(models.Message.group_id == group_id)\
-        .order_by(models.Message.timestamp.asc())\
-        .limit(50)\
-        .all()
+    limit = max(1, min(limit, 200))
+
+    etag = http_cache.etag(db, f"messages:{group_id}", request.url.query)
+    if http_cache.is_fresh(request, etag):
+        return http_cache.not_modified(etag)
+
+    # One query, user name joined in, walking the (group_id, id) index
+    query = db.query(models.Message, models.User.full_name)\
+        .join(models.User, models.Message.user_id == models.User.id)\
+        .filter(models.Message.group_id == group_id)
+
+    if since_id is not None:
+        # Oldest-first from the cursor, so the client can keep paging forward
+        rows = query.filter(models.Message.id > since_id)\
+            .order_by(models.Message.id.asc())\
+            .limit(limit)\
+            .all()
+    else:
+        # Latest page (optionally before a cursor), flipped back to oldest-first
+        if before_id is not None:
+            query = query.filter(models.Message.id < before_id)
+        rows = query.order_by(models.Message.id.desc()).limit(limit).all()
+        rows.reverse()
         
-    return [
+    # Same shape as MessageResponse, rendered without a validation pass per row
+    return http_cache.json_response([
         {
             "id": m.id,
-            "user_name": m.user.full_name,
+            "user_name": user_name,
             "content": m.content,
             "timestamp": m.timestamp
         }
-        for m in msgs
-    ]
+        for m, user_name in rows
+    ], etag)
 
-# --- 3. RESOURCE SHARING (GROUP) ---
+# --- 2b. REAL-TIME CHAT (WEBSOCKET) ---
+
+def _message_payload(message: models.Message, user_name: str) -> dict:
+    # Same shape as MessageResponse, JSON-ready
+    return {
+        "id": message.id,
+        "user_name": user_name,
+        "content": message.content,
+        "timestamp": message.timestamp.isoformat()
+    }
 
-UPLOAD_DIR = "static/uploads" # Ensure this folder exists
+def _load_chat_member(group_id: int, user_id: int):
+    db = database.SessionLocal()
+    try:
+        user = crud.get_user_by_id(db, user_id)
+        if user is None or not crud.is_group_member(db, group_id, user_id):
+            return None
+        return user.full_name
+    finally:
+        db.close()
+
+def _save_message(group_id: int, user_id: int, user_name: str, content: str) -> dict:
+    db = database.SessionLocal()
+    try:
+        new_msg = models.Message(content=content, user_id=user_id, group_id=group_id)
+        db.add(new_msg)
+        db.commit()
+        return _message_payload(new_msg, user_name)
+    finally:
+        db.close()
+
+async def _pump_messages(websocket: WebSocket, subscription: chat_broker.Subscription):
+    while True:
+        message = await subscription.get()
+        if message is None:
+            # Fell too far behind: reconnect and catch up with ?since_id=
+            await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+            return
+        await websocket.send_json(message)
+
+@router.websocket("/{group_id}/ws")
+async def chat_socket(websocket: WebSocket, group_id: int, token: str):
+    # Browsers can't set headers on WebSockets, so the JWT comes as ?token=
+    try:
+        user_id = int(auth.verify_token(token)["sub"])
+    except (HTTPException, KeyError, TypeError, ValueError):
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    # Membership is checked once, at connect
+    user_name = await run_in_threadpool(_load_chat_member, group_id, user_id)
+    if user_name is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    broker = chat_broker.get_broker()
+    subscription = broker.subscribe(group_id)
+    sender = asyncio.create_task(_pump_messages(websocket, subscription))
+
+    try:
+        while True:
+            try:
+                data = json.loads(await websocket.receive_text())
+                content = str(data.get("content", "")).strip()
+            except (ValueError, AttributeError):
+                continue
+            if not content:
+                continue
+
+            # Persist first, then fan out
+            message = await run_in_threadpool(_save_message, group_id, user_id, user_name, content)
+            broker.publish(group_id, message)
+    except (WebSocketDisconnect, RuntimeError):
+        # RuntimeError: the sender already closed us as a slow consumer
+        pass
+    finally:
+        broker.unsubscribe(subscription)
+        sender.cancel()
+
+# --- 3. RESOURCE SHARING (GROUP) ---
 
 @router.post("/{group_id}/upload")
-def upload_group_resource(
+async def upload_group_resource(
     group_id: int,
     file: UploadFile = File(...),
     title: str = Form(...),
@@ -150,51 +282,63 @@ def upload_group_resource(
     db: Session = Depends(database.get_db)
 ):
     # Verify Group
-    group = db.query(models.StudyGroup).filter(models.StudyGroup.id == group_id).first()
+    group = await run_in_threadpool(
+        lambda: db.query(models.StudyGroup).filter(models.StudyGroup.id == group_id).first()
+    )
     if not group:
         raise HTTPException(404, "Group not found")
 
-    # Save File
-    file_location = f"{UPLOAD_DIR}/{file.filename}"
-    with open(file_location, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    # Save File (streamed to content-addressed storage, so same-named files can't collide)
+    stored = await storage.save_upload(file)
 
     # Create Resource
     new_resource = models.Resource(
         title=title,
-        file_path=file_location,
+        file_path=stored.path,
+        sha256=stored.sha256,
         tags=tags,
         uploader_id=user.id,
         group_id=group.id,  # Linked to Group
         room_id=None,       # Public room is None
         ai_summary="Processing..." 
     )
-    
-    db.add(new_resource)
-    db.commit()
-    
-    return {"msg": "File uploaded to group", "id": new_resource.id}
+
+    def save():
+        db.add(new_resource)
+        db.flush()
+        counters.add_resource(db, new_resource)
+        db.commit()
+        return new_resource.id
+
+    resource_id = await run_in_threadpool(save)
+    return {"msg": "File uploaded to group", "id": resource_id}
 
 @router.get("/{group_id}/resources")
 def get_group_resources(
     group_id: int,
+    request: Request,
     db: Session = Depends(database.get_db)
 ):
+    etag = http_cache.etag(db, f"group_resources:{group_id}")
+    if http_cache.is_fresh(request, etag):
+        return http_cache.not_modified(etag)
+
     resources = db.query(models.Resource)\
         .filter(models.Resource.group_id == group_id)\
         .order_by(models.Resource.created_at.desc())\
         .all() #type: ignore
         
-    return [
+    return http_cache.json_response([
         {
             "id": r.id,
             "title": r.title,
             "filename": os.path.basename(r.file_path),
+            "file_path": r.file_path,
             "uploader": r.uploader.full_name,
             "created_at": r.created_at
         }
         for r in resources
-    ]
+    ], etag)
 
 @router.delete("/{group_id}")
 def delete_group(
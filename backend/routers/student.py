@@ -1,25 +1,25 @@
-import shutil
+import base64
 import os
 from datetime import datetime, timezone
 from typing import List, Optional, Dict
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, status
+from fastapi import APIRouter, Depends, HTTPException, Request, UploadFile, File, Form, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from backend.services import database, models, auth
+from sqlalchemy import func, select, tuple_
+from backend.services import database, models, auth, crud, counters, storage, upload_sessions, previews, search, http_cache, ingestion
 from backend.services import ai_services
 from pydantic import BaseModel 
 from backend.services.models import Comment, Rating
-from backend.services.schemas import ChatRequest, CommentCreate, UserProfileResponse, VoteCreate, RatingCreate
+from backend.services.schemas import ChatRequest, CommentCreate, UserProfileResponse, VoteCreate, RatingCreate, UploadSessionCreate
 
 
 
 router = APIRouter(prefix="/student", tags=["Student Features"])
 
-UPLOAD_DIR = "static/uploads"
-
 # --- 1. UPLOAD ENDPOINT ---
 @router.post("/upload")
-def upload_resource(
+async def upload_resource(
     title: str = Form(...),
     room_slug: str = Form(...),  # e.g., "cs", "physics"
     tags: str = Form(...),       # e.g., "Notes, Exam"
@@ -31,28 +31,26 @@ def upload_resource(
     if file.content_type != "application/pdf":
         raise HTTPException(400, detail="Only PDF files are allowed")
 
-    room = db.query(models.Room).filter(models.Room.slug == room_slug).first()
+    room = await run_in_threadpool(
+        lambda: db.query(models.Room).filter(models.Room.slug == room_slug).first()
+    )
     
     if not room:
         raise HTTPException(404, detail="Invalid Study Room")
-    
-    room_folder = os.path.join(UPLOAD_DIR, room_slug)
-    
-    # Create the folder if it doesn't exist yet
-    os.makedirs(room_folder, exist_ok=True)
 
-    # C. Save File Locally
-    timestamp = int(datetime.now(timezone.utc).timestamp())
-    clean_filename = f"{timestamp}_{file.filename.replace(' ', '_')}" # type: ignore
-    file_path = os.path.join(room_folder, clean_filename)
+    # B. Stream the file to content-addressed storage (size-capped, hashed on the way)
+    stored = await storage.save_upload(file)
 
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    # C. Save Entry to Database + AI processing (blocking work, off the event loop)
+    return await run_in_threadpool(_save_room_resource, db, user, room, title, tags, stored)
 
-    # D. Save Entry to Database
+
+def _save_room_resource(db: Session, user: models.User, room: models.Room, title: str, tags: str,
+                        stored: storage.StoredFile):
     new_resource = models.Resource(
         title=title,
-        file_path=f"static/uploads/{room_slug}/{clean_filename}", # Relative path for frontend
+        file_path=stored.path, # Relative path for frontend
+        sha256=stored.sha256,
         tags=tags,
         uploader_id=user.id,
         room_id=room.id,
@@ -60,12 +58,14 @@ def upload_resource(
     )
 
     db.add(new_resource)
+    db.flush()
+    counters.add_resource(db, new_resource)
     db.commit()
     db.refresh(new_resource)
     
     try:
         # 1. Run the AI processing (This might take 3-5 seconds)
-        summary = ai_services.process_document(file_path, new_resource.id)
+        summary = ai_services.process_document(stored.path, new_resource.id, stored.sha256)
         
         # 2. Update the database with the real summary
         new_resource.ai_summary = summary # type: ignore
@@ -78,10 +78,142 @@ def upload_resource(
 
     return {"msg": "Upload successful", "resource_id": new_resource.id, "summary": new_resource.ai_summary}
 
+# --- 1b. RESUMABLE UPLOADS (large scans over flaky Wi-Fi) ---
+# POST /uploads -> PUT /uploads/{id}/chunks/{n} ... -> GET /uploads/{id} to resume -> POST /uploads/{id}/complete
+
+@router.post("/uploads")
+def create_upload_session(
+    data: UploadSessionCreate,
+    user: models.User = Depends(auth.get_current_user),
+    db: Session = Depends(database.get_db)
+):
+    # Same checks as a direct upload; the bytes themselves are checked as they arrive
+    if not data.filename.lower().endswith(".pdf") or data.content_type != "application/pdf":
+        raise HTTPException(400, detail="Only PDF files are allowed")
+    if not db.query(models.Room.id).filter(models.Room.slug == data.room_slug).first():
+        raise HTTPException(404, detail="Invalid Study Room")
+
+    meta = upload_sessions.create(
+        user.id, data.filename, data.size,
+        {"title": data.title, "room_slug": data.room_slug, "tags": data.tags},
+    )
+    return upload_sessions.status(meta)
+
+
+@router.get("/uploads/{upload_id}")
+def get_upload_session(upload_id: str, user: models.User = Depends(auth.get_current_user)):
+    return upload_sessions.status(upload_sessions.load(upload_id, user.id))
+
+
+@router.put("/uploads/{upload_id}/chunks/{index}")
+async def put_upload_chunk(
+    upload_id: str,
+    index: int,
+    request: Request,
+    user: models.User = Depends(auth.get_current_user)
+):
+    meta = await run_in_threadpool(upload_sessions.load, upload_id, user.id)
+    limit = upload_sessions.expected_length(meta, index)
+
+    body = bytearray()
+    async for piece in request.stream():
+        body += piece
+        if len(body) > limit:
+            raise HTTPException(413, detail=f"Chunk {index} must be {limit} bytes")
+
+    return await run_in_threadpool(upload_sessions.write_chunk, meta, index, bytes(body))
+
+
+@router.post("/uploads/{upload_id}/complete")
+def complete_upload_session(
+    upload_id: str,
+    user: models.User = Depends(auth.get_current_user),
+    db: Session = Depends(database.get_db)
+):
+    meta = upload_sessions.load(upload_id, user.id)
+    fields = meta["fields"]
+    room = db.query(models.Room).filter(models.Room.slug == fields["room_slug"]).first()
+    if not room:
+        raise HTTPException(404, detail="Invalid Study Room")
+
+    # Same hand-off as a direct upload: content-addressed storage, Resource row, AI processing
+    stored = storage.store_local_file(upload_sessions.assemble(meta), meta["filename"])
+    return _save_room_resource(db, user, room, fields["title"], fields["tags"], stored)
+
+
+@router.delete("/uploads/{upload_id}")
+def abort_upload_session(upload_id: str, user: models.User = Depends(auth.get_current_user)):
+    upload_sessions.discard(upload_sessions.load(upload_id, user.id))
+    return {"msg": "Upload cancelled"}
+
+
+# --- 1c. BATCH UPLOAD (a semester of notes at once) ---
+# Rows are created up front; summaries and chat indexing run on the ingestion pool.
+# Poll GET /batches/{batch_id} for progress.
+
+@router.post("/batch-upload")
+async def batch_upload(
+    files: List[UploadFile] = File(...),
+    room_slug: Optional[str] = Form(None),  # either a room...
+    group_id: Optional[int] = Form(None),   # ...or a group the user belongs to
+    tags: str = Form(""),
+    user: models.User = Depends(auth.get_current_user),
+    db: Session = Depends(database.get_db)
+):
+    # A. Validate the whole batch before storing anything
+    if (room_slug is None) == (group_id is None):
+        raise HTTPException(400, detail="Give either room_slug or group_id")
+    if len(files) > ingestion.MAX_BATCH_FILES:
+        raise HTTPException(400, detail=f"At most {ingestion.MAX_BATCH_FILES} files per batch")
+    not_pdf = [f.filename for f in files if f.content_type != "application/pdf"]
+    if not_pdf:
+        raise HTTPException(400, detail=f"Only PDF files are allowed: {', '.join(not_pdf)}")
+
+    room_id = await run_in_threadpool(_batch_room_id, db, user, room_slug, group_id)
+
+    # B. Stream every file to content-addressed storage
+    stored = [(os.path.splitext(f.filename)[0] or "Untitled", await storage.save_upload(f)) for f in files]
+
+    # C. One transaction for all rows, then hand off to the pool
+    def queue():
+        batch = ingestion.create_batch(db, user, room_id, group_id, tags, stored)
+        return {"msg": "Batch queued", "batch_id": batch.id, "total": batch.total}
+
+    return await run_in_threadpool(queue)
+
+
+def _batch_room_id(db: Session, user: models.User, room_slug: Optional[str], group_id: Optional[int]):
+    if room_slug is not None:
+        room = db.query(models.Room).filter(models.Room.slug == room_slug).first()
+        if not room:
+            raise HTTPException(404, detail="Invalid Study Room")
+        return room.id
+
+    if not db.query(models.StudyGroup.id).filter(models.StudyGroup.id == group_id).first():
+        raise HTTPException(404, detail="Group not found")
+    if not crud.is_group_member(db, group_id, user.id):
+        raise HTTPException(403, detail="Join the group to upload to it")
+    return None
+
+
+@router.get("/batches/{batch_id}")
+def get_batch_progress(
+    batch_id: str,
+    user: models.User = Depends(auth.get_current_user),
+    db: Session = Depends(database.get_db)
+):
+    batch = db.query(models.IngestBatch).filter(models.IngestBatch.id == batch_id).first()
+    if not batch or batch.user_id != user.id:
+        raise HTTPException(404, detail="Batch not found")
+    return ingestion.progress(db, batch)
+
 # 2. LIST FILES ENDPOINT
 @router.get("/room/{room_slug}/resources")
 def get_room_resources(
     room_slug: str, 
+    request: Request,
+    sort: str = "newest",  # "newest" or "top_rated"
+    tag: Optional[str] = None,  # e.g. "exam"; only resources carrying this tag
     user: models.User = Depends(auth.get_current_user), 
     db: Session = Depends(database.get_db)
 ):
@@ -91,51 +223,185 @@ def get_room_resources(
     if not room:
         raise HTTPException(404, detail="Room not found")
 
-    # B. Fetch Resources with Uploader Name
-    results = (
-        db.query(models.Resource, models.User.full_name)
+    if sort == "top_rated":
+        ordering = models.Resource.average_rating.desc()
+    elif sort == "newest":
+        ordering = models.Resource.created_at.desc()
+    else:
+        raise HTTPException(400, detail="sort must be 'newest' or 'top_rated'")
+
+    # Unchanged since the client's last poll? (user_rating makes the list per-user)
+    etag = http_cache.etag(db, f"room:{room.id}", user.id, request.url.query)
+    if http_cache.is_fresh(request, etag):
+        return http_cache.not_modified(etag)
+
+    # B. Fetch Resources with Uploader Name + the current user's own rating (one query)
+    query = (
+        db.query(models.Resource, models.User.full_name, models.Rating.stars)
         .join(models.User, models.Resource.uploader_id == models.User.id)
+        .outerjoin(
+            models.Rating,
+            (models.Rating.resource_id == models.Resource.id) & (models.Rating.user_id == user.id)
+        )
         .filter(models.Resource.room_id == room.id)
-        .order_by(models.Resource.created_at.desc())
-        .all()
     )
+    if tag:
+        names = counters.parse_tags(tag)
+        tag_id = db.query(models.Tag.id).filter(models.Tag.name == names[0]).scalar() if names else None
+        if tag_id is None:
+            return http_cache.json_response([], etag)
+        query = query.filter(models.Resource.id.in_(
+            select(models.resource_tags.c.resource_id).where(models.resource_tags.c.tag_id == tag_id)
+        ))
+    results = query.order_by(ordering).all()
     
-    # C. Format the output + Add RATING Data
-    final_output = []
-    
-    for resource, full_name in results:
-        # 1. Calculate Average Rating (Avg of 1-5 stars)
-        avg_stars = db.query(func.avg(models.Rating.stars))\
-            .filter(models.Rating.resource_id == resource.id)\
-            .scalar()
-            
-        # Handle "None" if no one has rated it yet
-        final_average = round(avg_stars, 1) if avg_stars else 0.0
-
-        # 2. Check if the CURRENT user has rated this file
-        existing_rating = db.query(models.Rating).filter(
-            models.Rating.resource_id == resource.id,
-            models.Rating.user_id == user.id
-        ).first()
-        
-        # Get their stars (e.g., 5) or 0 if they haven't rated
-        current_user_stars = existing_rating.stars if existing_rating else 0
-
-        final_output.append({
-            "id": resource.id,
-            "title": resource.title,
-            "file_path": resource.file_path,
-            "tags": resource.tags,
-            "ai_summary": resource.ai_summary,
-            "uploader": full_name,
-            "created_at": resource.created_at,
-            # --- REPLACED FIELDS ---
-            "average_rating": final_average,    # Send e.g. 4.2 to frontend
-            "user_rating": current_user_stars   # Send e.g. 5 to frontend (for coloring stars)
-        })
-
-    return final_output
-    
+    # C. Format the output (rating aggregates are stored on the resource row)
+    return http_cache.json_response(
+        [_resource_card(resource, full_name, user_stars) for resource, full_name, user_stars in results], etag
+    )
+
+
+def _resource_card(resource: models.Resource, full_name: str, user_stars: Optional[int]) -> dict:
+    return {
+        "id": resource.id,
+        "title": resource.title,
+        "file_path": resource.file_path,
+        "tags": resource.tags,
+        "ai_summary": resource.ai_summary,
+        "uploader": full_name,
+        "created_at": resource.created_at,
+        "thumbnail_url": f"/student/resources/{resource.id}/pages/1/preview?size=thumb",
+        "average_rating": round(resource.average_rating, 1),  # e.g. 4.2
+        "total_ratings": resource.rating_count,
+        "comment_count": resource.comment_count,
+        "user_rating": user_stars or 0  # e.g. 5, or 0 if not rated (for coloring stars)
+    }
+
+
+# 2a. TAG FACETS (counts are maintained on write, see counters.bump_tag)
+@router.get("/tags")
+def get_tag_facets(
+    room_slug: Optional[str] = None,
+    limit: int = 30,
+    db: Session = Depends(database.get_db)
+):
+    limit = max(1, min(limit, 200))
+
+    if room_slug:
+        room_id = db.query(models.Room.id).filter(models.Room.slug == room_slug).scalar()
+        if room_id is None:
+            raise HTTPException(404, detail="Room not found")
+        facets = (
+            db.query(models.Tag.name, models.RoomTag.resource_count)
+            .join(models.Tag, models.RoomTag.tag_id == models.Tag.id)
+            .filter(models.RoomTag.room_id == room_id, models.RoomTag.resource_count > 0)
+            .order_by(models.RoomTag.resource_count.desc())
+            .limit(limit)
+            .all()
+        )
+    else:
+        facets = (
+            db.query(models.Tag.name, models.Tag.resource_count)
+            .filter(models.Tag.resource_count > 0)
+            .order_by(models.Tag.resource_count.desc())
+            .limit(limit)
+            .all()
+        )
+
+    return [{"name": name, "count": count} for name, count in facets]
+
+
+# 2b. SEARCH (titles, tags, AI summaries and comments; ranked)
+@router.get("/search")
+def search_resources(
+    q: str,
+    room_slug: Optional[str] = None,
+    limit: int = 20,
+    offset: int = 0,
+    user: models.User = Depends(auth.get_current_user),
+    db: Session = Depends(database.get_db)
+):
+    limit = max(1, min(limit, 100))
+    offset = max(0, offset)
+
+    room_id = None
+    if room_slug:
+        room_id = db.query(models.Room.id).filter(models.Room.slug == room_slug).scalar()
+        if room_id is None:
+            raise HTTPException(404, detail="Room not found")
+
+    # A. Ranked ids from the index (one extra row tells us whether there's a next page)
+    hits, truncated = search.search_ids(db, q, room_id, limit + 1, offset)
+    has_more = len(hits) > limit
+    hits = hits[:limit]
+    if not hits:
+        return {"results": [], "has_more": False, "truncated": truncated}
+
+    # B. Hydrate the page the same way the room listing does
+    rows = (
+        db.query(models.Resource, models.User.full_name, models.Rating.stars)
+        .join(models.User, models.Resource.uploader_id == models.User.id)
+        .outerjoin(
+            models.Rating,
+            (models.Rating.resource_id == models.Resource.id) & (models.Rating.user_id == user.id)
+        )
+        .filter(models.Resource.id.in_([resource_id for resource_id, _, _ in hits]))
+        .all()
+    )
+    cards = {resource.id: _resource_card(resource, full_name, stars) for resource, full_name, stars in rows}
+
+    results = []
+    for resource_id, score, snippet in hits:
+        if resource_id in cards:
+            results.append({**cards[resource_id], "score": score, "snippet": snippet})
+    # truncated: the query matched more than search.MAX_RANKED_MATCHES resources and
+    # only the newest were ranked; a more specific query will find the rest
+    return {"results": results, "has_more": has_more, "truncated": truncated}
+
+
+# Room resources are public like /static, so <img> tags can load them without
+# an auth header. Group uploads are private: only members (and admins) get them.
+@router.get("/resources/{resource_id}/pages/{page}/preview")
+async def get_page_preview(
+    resource_id: int,
+    page: int,
+    request: Request,
+    size: str = "thumb",  # "thumb" or "preview"
+    user: Optional[models.User] = Depends(auth.get_optional_user),
+    db: Session = Depends(database.get_db)
+):
+    # The lookups borrow a threadpool worker briefly; rendering never does (see previews)
+    resource, cache_control = await run_in_threadpool(_preview_access, db, resource_id, user)
+    headers = {"Cache-Control": cache_control}
+
+    # Cheap path: the ETag is known without rendering or touching the cache
+    etag = await run_in_threadpool(previews.locate, resource.file_path, resource.sha256, page, size)
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag, **headers})
+
+    image = await previews.get_preview(resource.file_path, page, size, etag)
+    return Response(image, media_type="image/jpeg", headers={"ETag": etag, **headers})
+
+
+def _preview_access(db: Session, resource_id: int, user: Optional[models.User]):
+    """(file_path/sha256 row, Cache-Control) if this caller may see the resource's pages."""
+    resource = db.query(models.Resource.file_path, models.Resource.sha256, models.Resource.room_id,
+                        models.Resource.group_id)\
+        .filter(models.Resource.id == resource_id).first()
+    if not resource:
+        raise HTTPException(404, detail="Resource not found")
+
+    if resource.room_id is not None:
+        return resource, "public, max-age=86400"
+    if user is None:
+        raise HTTPException(401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    if user.role != models.UserRole.ADMIN and not (
+        resource.group_id is not None and crud.is_group_member(db, resource.group_id, user.id)
+    ):
+        # Same answer as a missing resource, so ids of private uploads can't be probed
+        raise HTTPException(404, detail="Resource not found")
+    return resource, "private, max-age=86400"
+
 
 @router.post("/chat")
 def chat_with_resource(
@@ -155,9 +421,19 @@ def chat_with_resource(
     
 
 @router.post("/quiz/{resource_id}")
-def get_quiz(resource_id: int, user: models.User = Depends(auth.get_current_user)):
+def get_quiz(
+    resource_id: int,
+    user: models.User = Depends(auth.get_current_user),
+    db: Session = Depends(database.get_db)
+):
+    resource = db.query(models.Resource.file_path, models.Resource.sha256).filter(
+        models.Resource.id == resource_id
+    ).first()
+    if not resource:
+        raise HTTPException(status_code=404, detail="Resource not found")
+
     try:
-        quiz = ai_services.generate_quiz(resource_id)
+        quiz = ai_services.generate_quiz(resource_id, resource.file_path, resource.sha256)
         return {"quiz": quiz}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -169,6 +445,9 @@ def add_comment(
     user: models.User = Depends(auth.get_current_user),
     db: Session = Depends(database.get_db)
 ):
+    if not counters.add_comment(db, comment_data.resource_id):
+        raise HTTPException(404, detail="Resource not found")
+
     new_comment = models.Comment(
         content=comment_data.content,
         user_id=user.id,
@@ -180,31 +459,75 @@ def add_comment(
     return {"msg": "Comment added!"}
 
 @router.get("/comments/{resource_id}")
-def get_comments(resource_id: int, db: Session = Depends(database.get_db)):
+def get_comments(
+    resource_id: int,
+    request: Request,
+    cursor: Optional[str] = None,  # next_cursor from the previous page
+    limit: int = 20,
+    db: Session = Depends(database.get_db)
+):
+    limit = max(1, min(limit, 100))
+
+    etag = http_cache.etag(db, f"comments:{resource_id}", request.url.query)
+    if http_cache.is_fresh(request, etag):
+        return http_cache.not_modified(etag)
+    Comment = models.Comment
+
+    query = (
+        db.query(Comment, models.User.full_name)
+        .join(models.User, Comment.user_id == models.User.id)
+        .filter(Comment.resource_id == resource_id)
+    )
+
+    # Keyset paging: continue strictly after the last comment of the previous page
+    if cursor:
+        # (every sort key is DESC, so "after" is a plain row-value comparison the index can seek)
+        verified, created_at, last_id = _decode_comment_cursor(cursor)
+        query = query.filter(
+            tuple_(Comment.is_verified, Comment.created_at, Comment.id) < tuple_(verified, created_at, last_id)
+        )
+
     results = (
-        db.query(models.Comment, models.User.full_name)
-        .join(models.User, models.Comment.user_id == models.User.id)
-        .filter(models.Comment.resource_id == resource_id)
-        
+        query
         # --- THE SORTING MAGIC ---
         # 1. Verified comments FIRST (True > False)
-        # 2. Then Newest comments (created_at DESC)
-        .order_by(models.Comment.is_verified.desc(), models.Comment.created_at.desc())
+        # 2. Then Newest comments (created_at DESC); id breaks ties so pages never overlap
+        .order_by(Comment.is_verified.desc(), Comment.created_at.desc(), Comment.id.desc())
         # -------------------------
-        
+        .limit(limit + 1)
         .all()
     )
-    
-    return [
-        {
-            "id": c.id,
-            "text": c.content,
-            "user": user_name,
-            "is_verified": c.is_verified,
-            "created_at": c.created_at
-        }
-        for c, user_name in results
-    ]
+
+    has_more = len(results) > limit
+    results = results[:limit]
+    last = results[-1][0] if results else None
+
+    return http_cache.json_response({
+        "comments": [
+            {
+                "id": c.id,
+                "text": c.content,
+                "user": user_name,
+                "is_verified": c.is_verified,
+                "created_at": c.created_at
+            }
+            for c, user_name in results
+        ],
+        "next_cursor": _encode_comment_cursor(last) if has_more else None,
+    }, etag)
+
+
+def _encode_comment_cursor(comment: models.Comment) -> str:
+    raw = f"{int(comment.is_verified)}|{comment.created_at.isoformat()}|{comment.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_comment_cursor(cursor: str):
+    try:
+        verified, created_at, last_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return bool(int(verified)), datetime.fromisoformat(created_at), int(last_id)
+    except ValueError:
+        raise HTTPException(400, detail="Invalid cursor")
 
 
 @router.get("/me", response_model=UserProfileResponse)
@@ -217,25 +540,15 @@ def get_my_profile(
         models.Resource.uploader_id == user.id
     ).order_by(models.Resource.created_at.desc()).all()
     
-    # 2. Calculate "Karma" (Total STARS received on MY notes)
-    total_karma = 0
-    for resource in my_uploads:
-        # Get sum of STARS for this specific resource
-        # FIX: Changed from models.Vote.value to models.Rating.stars
-        score = db.query(func.sum(models.Rating.stars)).filter(
-            models.Rating.resource_id == resource.id
-        ).scalar() 
-        
-        if score:
-            total_karma += score
-
-    # 3. Return the formatted profile
+    # 2. Return the formatted profile
     return {
         "id": user.id,
         "full_name": user.full_name,
         "email": user.email,
         "role": getattr(user, "role", "student"),
-        "karma_score": total_karma,
+        # Total STARS received on my notes (maintained counter). Read fresh:
+        # the cached current user may predate the latest ratings.
+        "karma_score": db.query(models.User.karma).filter(models.User.id == user.id).scalar(),
         "uploads": [
             {
                 "id": res.id,
@@ -256,6 +569,10 @@ def rate_resource(
     if not (1 <= rate_data.stars <= 5): # <--- FIX: Use .stars from schema
         raise HTTPException(status_code=400, detail="Rating must be between 1 and 5")
 
+    resource = db.query(models.Resource).filter(models.Resource.id == rate_data.resource_id).first()
+    if not resource:
+        raise HTTPException(status_code=404, detail="Resource not found")
+
     # 1. Check if interaction row exists
     existing_interaction = db.query(models.Rating).filter(
         models.Rating.user_id == user.id,
@@ -264,33 +581,66 @@ def rate_resource(
 
     if existing_interaction:
         # Update existing row
-        existing_interaction.stars = rate_data.stars # <--- FIX: Use .stars
+        old_stars = existing_interaction.stars
+        existing_interaction.stars = rate_data.stars
     else:
         # Create new row
+        old_stars = 0
         new_interaction = models.Rating(
             user_id=user.id,
             resource_id=rate_data.resource_id,
-            stars=rate_data.stars, # <--- FIX: Use .stars
+            stars=rate_data.stars,
             value=0 
         )
         db.add(new_interaction)
 
+    # 2. Move the stored aggregates in the same transaction as the rating
+    counters.apply_rating(db, resource, old_stars, rate_data.stars)
     db.commit()
-
-    # 2. Calculate New Average Rating
-    stats = db.query(
-        func.avg(models.Rating.stars), # <--- FIX: Use .stars
-        func.count(models.Rating.stars)
-    ).filter(
-        models.Rating.resource_id == rate_data.resource_id,
-        models.Rating.stars > 0 
-    ).first()
-
-    new_average = float(stats[0]) if stats[0] else 0.0 # type: ignore
-    total_ratings = stats[1] if stats[1] else 0 # type: ignore
+    db.refresh(resource)
 
     return {
         "msg": "Rating updated", 
-        "new_average": round(new_average, 1),
-        "total_ratings": total_ratings
-    }
\ No newline at end of file
+        "new_average": round(resource.average_rating, 1),
+        "total_ratings": resource.rating_count
+    }
+
+
+@router.get("/leaderboard")
+def get_leaderboard(
+    room_slug: Optional[str] = None,  # None = global leaderboard
+    limit: int = 10,
+    user: models.User = Depends(auth.get_current_user),
+    db: Session = Depends(database.get_db)
+):
+    limit = max(1, min(limit, 100))
+
+    if room_slug is None:
+        # Served straight off the users.karma index
+        rows = db.query(models.User.id, models.User.full_name, models.User.karma)\
+            .filter(models.User.karma > 0)\
+            .order_by(models.User.karma.desc())\
+            .limit(limit)\
+            .all()
+    else:
+        room = db.query(models.Room).filter(models.Room.slug == room_slug).first()
+        if not room:
+            raise HTTPException(404, detail="Room not found")
+
+        # Served off the (room_id, karma) index
+        rows = db.query(models.User.id, models.User.full_name, models.RoomKarma.karma)\
+            .join(models.User, models.RoomKarma.user_id == models.User.id)\
+            .filter(models.RoomKarma.room_id == room.id, models.RoomKarma.karma > 0)\
+            .order_by(models.RoomKarma.karma.desc())\
+            .limit(limit)\
+            .all()
+
+    return [
+        {
+            "rank": position,
+            "user_id": user_id,
+            "full_name": full_name,
+            "karma": karma
+        }
+        for position, (user_id, full_name, karma) in enumerate(rows, start=1)
+    ]
@@ -1,7 +1,6 @@
 import getpass
 import os
 import json
-from langchain_community.document_loaders import PyPDFLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_community.embeddings.fastembed import FastEmbedEmbeddings
 from langchain_chroma import Chroma
@@ -9,37 +8,136 @@ from langchain_google_genai import ChatGoogleGenerativeAI
 from dotenv import load_dotenv
 import random
 import re
+import threading
+from typing import Optional
+from backend.services import chunking, embed_service, page_text, vector_index
+from backend.services.vector_index import CHROMA_PATH, IndexSpec
 
 load_dotenv()
 
-if "GOOGLE_API_KEY" not in os.environ:
+# "google" = Gemini + FastEmbed (default)
+# "fake"   = offline stand-ins with canned answers (benchmarks, local dev)
+AI_BACKEND = os.getenv("AI_BACKEND", "google")
+
+if AI_BACKEND != "fake" and "GOOGLE_API_KEY" not in os.environ:
     os.environ["GOOGLE_API_KEY"] = getpass.getpass("Enter your Google AI API key: ")
 
 
 # 2. Configuration
-CHROMA_PATH = "chroma_db"  # Folder where vector data will be saved locally
+# Settings for the NEXT index build. The live index keeps the settings it was
+# built with (see vector_index); changing these takes effect via `python reindex.py`.
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "1000"))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "100"))
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "BAAI/bge-small-en-v1.5")
+CHUNKING = os.getenv("CHUNKING", "layout")  # "layout" or "recursive" (see chunking)
+
+# Path of a shared embed_server.py socket. Set, workers don't load a model of their own.
+EMBED_SOCKET = os.getenv("EMBED_SOCKET")
+
+
+class FakeLLM:
+    """
+    Drop-in for llm.invoke(): no network, instant, and answers every prompt
+    type we send (summary, chat, quiz) with something our parsers accept.
+    """
+
+    QUIZ = json.dumps([
+        {
+            "question": f"Sample question {i}?",
+            "options": [{"id": letter, "text": f"Option {letter}"} for letter in "ABCD"],
+            "answer": "A"
+        }
+        for i in range(1, 6)
+    ])
+
+    class _Reply:
+        def __init__(self, content: str):
+            self.content = content
+
+    def invoke(self, prompt: str):
+        if "multiple-choice questions" in prompt:
+            return self._Reply(self.QUIZ)
+        return self._Reply("This is a generated answer. It is based on the document. It is for testing.")
+
+
+def _load_embeddings(model_name: str):
+    if EMBED_SOCKET:
+        # The model lives in the embedding server; this only holds a connection
+        return embed_service.EmbeddingClient(EMBED_SOCKET, model_name)
+    # We use FastEmbed (runs locally, no API cost, very fast)
+    return FastEmbedEmbeddings(model_name=model_name)
+
+
+if AI_BACKEND == "fake":
+    from langchain_core.embeddings import DeterministicFakeEmbedding
+
+    llm = FakeLLM()
+    embedding_model = (
+        embed_service.EmbeddingClient(EMBED_SOCKET, EMBEDDING_MODEL) if EMBED_SOCKET
+        else DeterministicFakeEmbedding(size=384)
+    )
+else:
+    # Initialize the Gemini Model (The "Brain")
+    llm = ChatGoogleGenerativeAI(
+        model="gemma-3-27b-it",  
+        temperature=0.3
+    )
+
+    # Initialize Embeddings (The "Translator" - Text to Numbers)
+    embedding_model = _load_embeddings(EMBEDDING_MODEL)
+
+_embedding_models = {EMBEDDING_MODEL: embedding_model}
+_embedding_lock = threading.Lock()
+
+
+def get_embeddings(model_name: str):
+    """The embedder for an index. Only differs from embedding_model around a re-index that changes models."""
+    if AI_BACKEND == "fake" and not EMBED_SOCKET:
+        return embedding_model
+    with _embedding_lock:
+        if model_name not in _embedding_models:
+            _embedding_models[model_name] = _load_embeddings(model_name)
+        return _embedding_models[model_name]
 
-# Initialize the Gemini Model (The "Brain")
-llm = ChatGoogleGenerativeAI(
-    model="gemma-3-27b-it",  
-    temperature=0.3
-)
 
-# Initialize Embeddings (The "Translator" - Text to Numbers)
-# We use FastEmbed (runs locally, no API cost, very fast)
-embedding_model = FastEmbedEmbeddings(model_name="BAAI/bge-small-en-v1.5")
+def get_vector_store(spec: Optional[IndexSpec] = None) -> Chroma:
+    # The live collection unless a specific one (e.g. one being built) is asked for
+    spec = spec or vector_index.active()
+    return Chroma(
+        collection_name=spec.collection,
+        persist_directory=CHROMA_PATH,
+        embedding_function=get_embeddings(spec.embedding_model)
+    )
 
-def process_document(file_path: str, resource_id: int):
+def process_document(file_path: str, resource_id: int, sha256: Optional[str] = None):
     """
     Reads a PDF, stores it in Vector DB (for chat), and returns a summary.
     """
     print(f"🧠 AI Processing started for: {file_path}")
 
-    # A. Load PDF Text
-    loader = PyPDFLoader(file_path)
-    docs = loader.load()
-    
+    # One spec for both steps: if reindex.py switches the live index in between,
+    # the chunks still go where their chunking and embedding settings belong
+    # (its catch-up pass re-indexes this resource into the new collection)
+    spec = vector_index.active()
+    docs = load_pages(file_path, sha256)
+    summary = summarize(docs)
+    index_chunks(split_chunks(docs, resource_id, spec), spec)
+
+    print(f"✅ AI Processing complete. Summary: {summary}")
+    return summary
+
+
+# The stages of process_document, also used separately by batch ingestion
+# (which summarizes files in parallel and writes their chunks in one go)
+
+def load_pages(file_path: str, sha256: Optional[str] = None) -> list:
+    # A. Load PDF Text (one Document per page), parsed only the first time (see page_text)
+    return page_text.load_pages(file_path, sha256)
+
+
+def summarize(docs: list) -> str:
     # We take a subset of text to avoid token limits for the summary
+    docs = chunking.strip_repeated_lines(docs)
     clean_text = []
     pages_read_count = 0
     
@@ -78,28 +176,49 @@ def process_document(file_path: str, resource_id: int):
     
     # Invoke Gemini
     ai_response = llm.invoke(summary_prompt)
-    summary = ai_response.content
+    return ai_response.content
 
+
+def split_chunks(docs: list, resource_id: int, spec: Optional[IndexSpec] = None) -> list:
     # C. Prepare for Chat (RAG)
     # 1. Split text into chunks (AI can't read whole books at once)
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
-    chunks = text_splitter.split_documents(docs)
+    spec = spec or vector_index.active()
+    if spec.chunking == "layout":
+        # Without the headers/footers repeated on every page, sized to the page layout
+        chunks = chunking.layout_chunks(chunking.strip_repeated_lines(docs), spec.chunk_size, spec.chunk_overlap)
+    else:
+        text_splitter = RecursiveCharacterTextSplitter(chunk_size=spec.chunk_size, chunk_overlap=spec.chunk_overlap)
+        chunks = text_splitter.split_documents(docs)
 
     # 2. Add metadata (Critical: This tags every chunk with the Resource ID)
     # So when we search later, we only search THIS file.
     for chunk in chunks:
         chunk.metadata["resource_id"] = resource_id
+    return chunks
+
 
+def index_chunks(chunks: list, spec: Optional[IndexSpec] = None):
     # 3. Store in ChromaDB (The Vector Database)
     # This creates a persistent database folder on your disk
-    vector_store = Chroma(
-        persist_directory=CHROMA_PATH,
-        embedding_function=embedding_model
-    )
+    if not chunks:
+        return
+    vector_store = get_vector_store(spec)
+    # Replace, never append: indexing a resource twice (retries, a re-index
+    # catching up with fresh uploads) must not duplicate its chunks
+    resource_ids = sorted({chunk.metadata["resource_id"] for chunk in chunks})
+    vector_store.delete(where={"resource_id": {"$in": resource_ids}})
     vector_store.add_documents(chunks)
-    
-    print(f"✅ AI Processing complete. Summary: {summary}")
-    return summary
+
+
+def delete_chunks(resource_ids: list, spec: Optional[IndexSpec] = None):
+    # Drops every chunk of these resources: from spec, or else from the live
+    # collection and the one reindex.py is building (which goes live next)
+    if not resource_ids:
+        return
+    specs = [spec] if spec else [vector_index.active(), vector_index.building()]
+    for target in specs:
+        if target is not None:
+            get_vector_store(target).delete(where={"resource_id": {"$in": list(resource_ids)}})
 
 
 
@@ -107,10 +226,7 @@ def chat_with_document(resource_id: int, question: str, history: list = []):
     print(f"💬 Chatting with Resource {resource_id}: {question}")
     
     # 1. Connect to the existing Vector Database
-    vector_store = Chroma(
-        persist_directory=CHROMA_PATH,
-        embedding_function=embedding_model
-    )
+    vector_store = get_vector_store()
     
     history_text = ""
     for msg in history:
@@ -160,31 +276,34 @@ def chat_with_document(resource_id: int, question: str, history: list = []):
     response = llm.invoke(chat_prompt)
     return response.content
 
-def generate_quiz(resource_id: int):
+QUIZ_PASSAGES = 5
+QUIZ_MIN_PAGE_CHARS = 200  # skip title pages, blank pages, figure-only pages
+
+
+def generate_quiz(resource_id: int, file_path: str, sha256: Optional[str] = None):
     print(f"📝 Generating Quiz for Resource {resource_id}")
     
-    # 1. Get Context
-    vector_store = Chroma(
-        persist_directory=CHROMA_PATH,
-        embedding_function=embedding_model
-    )
-    
-    results = vector_store.similarity_search(
-        "summary main concepts definitions core ideas facts importance syllabus", 
-        k=20,  # <--- Grab a huge bucket of text
-        filter={"resource_id": resource_id} # type: ignore
-    )
-    
-    num_chunks_to_use = min(5, len(results)) # Safety check if PDF is small
-    selected_docs = random.sample(results, num_chunks_to_use)
-    
-    raw_text = "\n\n".join([doc.page_content for doc in selected_docs])
-    # Remove excessive newlines and multiple spaces
-    context_text = re.sub(r'\s+', ' ', raw_text).strip()
+    # 1. Get Context: random pages from the page text sidecar, minus the
+    # headers/footers (course codes etc.) repeated on every page
+    pages = chunking.strip_repeated_lines(load_pages(file_path, sha256))
+    passages = []
+    for page in random.sample(pages, len(pages)):
+        text = re.sub(r'\s+', ' ', page.page_content).strip()
+        if len(text) < QUIZ_MIN_PAGE_CHARS:
+            continue
+        # A chunk-sized window somewhere on the page
+        start = random.randint(0, max(len(text) - CHUNK_SIZE, 0))
+        passages.append(text[start:start + CHUNK_SIZE])
+        if len(passages) == QUIZ_PASSAGES:
+            break
+
+    if not passages:
+        raise ValueError("This document has no text to build a quiz from.")
+    context_text = " ".join(passages)
     
     print(context_text)
     
-    print(f"🎲 Selected {num_chunks_to_use} random chunks for context.")
+    print(f"🎲 Selected {len(passages)} random passages for context.")
     
     quiz_prompt = f"""
     You are an expert teacher creating a quiz. 
@@ -1,23 +1,26 @@
 import time
+from typing import Optional
 from authlib.jose import jwt
 from fastapi import HTTPException
 from backend.services.crud import get_user_by_id
 from backend.services.models import User
+from backend.services import user_cache
+from backend.services.passwords import pwd_context
 from sqlalchemy.orm import Session
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, OAuth2PasswordBearer
 from backend.services.database import get_db
-from passlib.context import CryptContext
 
 SECRET_KEY = "supersecret"  
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
-pwd_hash = CryptContext(schemes=["bcrypt"], deprecated="auto")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login", auto_error=False)
 
 def create_token(user: User, expires_in: int = 3600):
     header = {"alg": "HS256"}
     payload = {
         "sub": user.id,
         "email": user.email,
+        "name": user.full_name,
         "role": user.role.value,
         "iat": int(time.time()),
         "exp": int(time.time()) + expires_in
@@ -33,8 +36,11 @@ def verify_token(token: str):
     except Exception:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    payload = verify_token(token)
+def get_token_claims(token: str = Depends(oauth2_scheme)):
+    # Cached per request by FastAPI, so the JWT is only verified once
+    return verify_token(token)
+
+def get_current_user(payload: dict = Depends(get_token_claims), db: Session = Depends(get_db)):
     if payload is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -50,6 +56,11 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    # Most requests are served from the identity cache (no DB round trip)
+    user = user_cache.get(db, int(user_id))
+    if user is not None:
+        return user
+
     user = get_user_by_id(db, int(user_id))
     if user is None:
         raise HTTPException(
@@ -57,10 +68,18 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
             detail="User not found"
         )
 
+    user_cache.put(user)
     return user
 
+def get_optional_user(token: Optional[str] = Depends(optional_oauth2_scheme), db: Session = Depends(get_db)):
+    # For routes that are public for some content and not for other: None when no token was sent
+    if not token:
+        return None
+    return get_current_user(verify_token(token), db)
+
+# Synchronous versions for scripts; request handlers use the bounded pool in passwords.py
 def hash_password(password: str):
-    return pwd_hash.hash(password)
+    return pwd_context.hash(password)
 
 def verify_password(password: str, hashed_password: str):
-    return pwd_hash.verify(password, hashed_password)
\ No newline at end of file
+    return pwd_context.verify(password, hashed_password)
\ No newline at end of file
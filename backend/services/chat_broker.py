@@ -0,0 +1,105 @@
+import abc
+import asyncio
+import threading
+from typing import Dict, Optional, Set
+
+# How many undelivered messages a single socket may have queued before we
+# treat it as a slow consumer and disconnect it (it resyncs via since_id).
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+class Subscription:
+    """
+    One connected socket's inbox. Lives on the event loop that created it;
+    deliver() may be called from any thread.
+    """
+
+    def __init__(self, group_id: int, maxsize: int = SUBSCRIBER_QUEUE_SIZE):
+        self.group_id = group_id
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.overflowed = False
+
+    def deliver(self, message: dict):
+        self.loop.call_soon_threadsafe(self._put, message)
+
+    def _put(self, message: dict):
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Backpressure: drop the consumer rather than buffer without bound
+            # or stall everyone else in the group behind it.
+            self.overflowed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+    async def get(self) -> Optional[dict]:
+        """Next message, or None once this subscriber has been cut off."""
+        return await self.queue.get()
+
+
+class ChatBroker(abc.ABC):
+    """
+    Fans group chat messages out to every connected socket of that group.
+    The in-process broker only reaches sockets in this worker; multi-worker
+    deployments plug in a shared implementation with set_broker().
+    """
+
+    @abc.abstractmethod
+    def subscribe(self, group_id: int) -> Subscription:
+        ...
+
+    @abc.abstractmethod
+    def unsubscribe(self, subscription: Subscription):
+        ...
+
+    @abc.abstractmethod
+    def publish(self, group_id: int, message: dict):
+        """Thread-safe: called from sync route handlers and the event loop alike."""
+        ...
+
+
+class InProcessBroker(ChatBroker):
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._groups: Dict[int, Set[Subscription]] = {}
+
+    def subscribe(self, group_id: int) -> Subscription:
+        subscription = Subscription(group_id)
+        with self._lock:
+            self._groups.setdefault(group_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscribers = self._groups.get(subscription.group_id)
+            if subscribers is None:
+                return
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._groups[subscription.group_id]
+
+    def publish(self, group_id: int, message: dict):
+        with self._lock:
+            subscribers = list(self._groups.get(group_id, ()))
+        for subscription in subscribers:
+            subscription.deliver(message)
+
+    def subscriber_count(self, group_id: int) -> int:
+        with self._lock:
+            return len(self._groups.get(group_id, ()))
+
+
+_broker: ChatBroker = InProcessBroker()
+
+
+def get_broker() -> ChatBroker:
+    return _broker
+
+
+def set_broker(broker: ChatBroker):
+    global _broker
+    _broker = broker
@@ -0,0 +1,86 @@
+"""
+Page cleanup and layout-aware chunking.
+
+University PDFs carry the same header (course code, department, university)
+and footer (page number) on every page. Split naively, those lines end up in
+every chunk: they cost embedding time and index space, and they make
+unrelated chunks look alike to the retriever. strip_repeated_lines() drops
+them before anything else reads the pages.
+
+layout_chunks() then sizes chunks from the pages themselves. A page that
+fits in about one chunk (slides, short handouts) stays one chunk instead of
+being cut into a full chunk plus a scrap. Longer pages are cut into equal
+parts on paragraph, line, then sentence breaks, instead of chunk_size pieces
+with a short tail.
+"""
+import math
+import re
+from collections import Counter
+from typing import List
+
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+EDGE_LINES = 3  # headers/footers are looked for in this many lines at each end of a page
+MIN_PAGES = 3  # fewer pages than this and nothing counts as "repeated"
+MIN_SHARE = 0.5  # a line must repeat on at least this share of pages
+PAGE_CHUNK_SLACK = 1.5  # a page up to chunk_size * this stays one chunk
+MIN_CHUNK_CHARS = 50  # drop pages that are (nearly) empty once cleaned
+
+_DIGITS = re.compile(r"\d+")
+_SPACE = re.compile(r"\s+")
+
+
+def _signature(line: str) -> str:
+    # "Page 3 of 20" and "Page 4 of 20" are the same footer
+    return _SPACE.sub(" ", _DIGITS.sub("#", line)).strip().lower()
+
+
+def _edge_indices(count: int, edge_lines: int):
+    return set(range(min(edge_lines, count))) | set(range(max(count - edge_lines, 0), count))
+
+
+def strip_repeated_lines(docs: List[Document], edge_lines: int = EDGE_LINES,
+                         min_share: float = MIN_SHARE) -> List[Document]:
+    """Copies of docs without the header/footer lines that repeat across pages."""
+    if len(docs) < MIN_PAGES:
+        return docs
+
+    page_lines = [doc.page_content.splitlines() for doc in docs]
+    seen = Counter()
+    for lines in page_lines:
+        seen.update({_signature(lines[i]) for i in _edge_indices(len(lines), edge_lines)})
+    threshold = max(MIN_PAGES, min_share * len(docs))
+    repeated = {signature for signature, count in seen.items() if signature and count >= threshold}
+    if not repeated:
+        return docs
+
+    cleaned = []
+    for doc, lines in zip(docs, page_lines):
+        edges = _edge_indices(len(lines), edge_lines)
+        kept = [line for i, line in enumerate(lines) if i not in edges or _signature(line) not in repeated]
+        cleaned.append(Document(page_content="\n".join(kept).strip(), metadata=doc.metadata))
+    return cleaned
+
+
+def layout_chunks(docs: List[Document], chunk_size: int, chunk_overlap: int) -> List[Document]:
+    chunks = []
+    seen = set()  # identical text twice in one document (repeated slides) is embedded once
+    for doc in docs:
+        text = doc.page_content.strip()
+        if len(text) < MIN_CHUNK_CHARS or text in seen:
+            continue
+        seen.add(text)
+
+        if len(text) <= chunk_size * PAGE_CHUNK_SLACK:
+            chunks.append(Document(page_content=text, metadata=dict(doc.metadata)))
+            continue
+
+        parts = math.ceil(len(text) / chunk_size)
+        splitter = RecursiveCharacterTextSplitter(
+            chunk_size=math.ceil(len(text) / parts) + chunk_overlap,
+            chunk_overlap=chunk_overlap,
+            separators=["\n\n", "\n", ". ", " ", ""],
+        )
+        chunks.extend(splitter.split_documents([doc]))
+    return chunks
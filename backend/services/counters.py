@@ -0,0 +1,334 @@
+from datetime import date
+from typing import Dict, List, Optional
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from backend.services import models
+
+MAX_TAGS = 20
+TAG_MAX_LENGTH = 50
+
+
+def apply_rating(db: Session, resource: models.Resource, old_stars: int, new_stars: int):
+    """
+    Keeps Resource.rating_sum / rating_count and the uploader's karma in step
+    with a Rating write. old_stars is 0 when the user is rating this resource
+    for the first time.
+    Runs as UPDATE ... SET x = x + ? so concurrent raters don't lose writes.
+    Caller commits (same transaction as the Rating row).
+    """
+    delta = new_stars - max(old_stars, 0)
+    added = 1 if old_stars <= 0 < new_stars else 0
+    db.query(models.Resource).filter(models.Resource.id == resource.id).update(
+        {
+            models.Resource.rating_sum: models.Resource.rating_sum + delta,
+            models.Resource.rating_count: models.Resource.rating_count + added,
+        },
+        synchronize_session=False,
+    )
+    adjust_karma(db, resource.uploader_id, resource.room_id, delta)
+
+
+def add_resource(db: Session, resource: models.Resource):
+    """
+    Counts a new upload towards its day's rollup and links it to its
+    normalized tags (parsed from resource.tags).
+    Call after the resource has been flushed; caller commits.
+    """
+    bump_daily(db, resource.created_at.date(), uploads=1)
+
+    ids = tag_ids(db, parse_tags(resource.tags))
+    if ids:
+        db.execute(insert(models.resource_tags), [
+            {"resource_id": resource.id, "tag_id": tag_id} for tag_id in ids.values()
+        ])
+        for tag_id in ids.values():
+            bump_tag(db, tag_id, resource.room_id, 1)
+
+
+def remove_resource(db: Session, resource: models.Resource):
+    """
+    Takes a resource's stars back out of its uploader's karma, its upload
+    out of the daily rollup and its tags out of the tag counts.
+    Call before deleting the resource (the ratings cascade with it).
+    """
+    adjust_karma(db, resource.uploader_id, resource.room_id, -resource.rating_sum)
+    bump_daily(db, resource.created_at.date(), uploads=-1)
+
+    linked = db.execute(
+        select(models.resource_tags.c.tag_id).where(models.resource_tags.c.resource_id == resource.id)
+    ).scalars().all()
+    db.execute(delete(models.resource_tags).where(models.resource_tags.c.resource_id == resource.id))
+    for tag_id in linked:
+        bump_tag(db, tag_id, resource.room_id, -1)
+
+
+def add_comment(db: Session, resource_id: int) -> bool:
+    """
+    Counts a new comment on its resource. Returns False if the resource
+    doesn't exist. Caller commits (same transaction as the Comment row).
+    """
+    return bool(db.query(models.Resource).filter(models.Resource.id == resource_id).update(
+        {models.Resource.comment_count: models.Resource.comment_count + 1},
+        synchronize_session=False,
+    ))
+
+
+def remove_comment(db: Session, resource_id: int):
+    db.query(models.Resource).filter(models.Resource.id == resource_id).update(
+        {models.Resource.comment_count: models.Resource.comment_count - 1},
+        synchronize_session=False,
+    )
+
+
+def parse_tags(raw: Optional[str]) -> List[str]:
+    """
+    "Notes, exam,notes ,  Past  Papers" -> ["notes", "exam", "past papers"]
+    Lowercased, whitespace collapsed, de-duplicated, order kept.
+    """
+    names = []
+    for part in (raw or "").split(","):
+        name = " ".join(part.lower().split())[:TAG_MAX_LENGTH]
+        if name and name not in names:
+            names.append(name)
+    return names[:MAX_TAGS]
+
+
+def tag_ids(db: Session, names: List[str]) -> Dict[str, int]:
+    """Ids for the given (already normalized) tag names, creating missing tags."""
+    if not names:
+        return {}
+    ids = dict(db.query(models.Tag.name, models.Tag.id).filter(models.Tag.name.in_(names)).all())
+    missing = [name for name in names if name not in ids]
+    if missing:
+        new_tags = [models.Tag(name=name) for name in missing]
+        db.add_all(new_tags)
+        db.flush()
+        ids.update((tag.name, tag.id) for tag in new_tags)
+    return ids
+
+
+def _add_to_row(db: Session, model, keys: dict, column: str, delta: int):
+    """
+    INSERT the row with column = delta, or add delta to the existing row, in
+    one statement (ON CONFLICT DO UPDATE). An UPDATE followed by an INSERT
+    when nothing matched lets two writers both insert the same new key.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        stmt = postgresql.insert(model.__table__)
+    elif dialect == "sqlite":
+        stmt = sqlite.insert(model.__table__)
+    else:
+        raise NotImplementedError(f"No upsert for the {dialect} dialect")
+
+    stmt = stmt.values(**keys, **{column: delta})
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=list(keys),
+        set_={column: model.__table__.c[column] + stmt.excluded[column]},
+    ))
+
+
+def bump_tag(db: Session, tag_id: int, room_id: Optional[int], delta: int):
+    # Facets are public, so group-shared resources don't count
+    if room_id is None or not delta:
+        return
+
+    db.query(models.Tag).filter(models.Tag.id == tag_id).update(
+        {models.Tag.resource_count: models.Tag.resource_count + delta},
+        synchronize_session=False,
+    )
+
+    _add_to_row(db, models.RoomTag, {"room_id": room_id, "tag_id": tag_id}, "resource_count", delta)
+
+
+def bump_daily(db: Session, day: date, uploads: int = 0):
+    _add_to_row(db, models.DailyStat, {"day": day}, "uploads", uploads)
+
+
+def adjust_karma(db: Session, user_id: int, room_id: Optional[int], delta: int):
+    if not delta:
+        return
+
+    db.query(models.User).filter(models.User.id == user_id).update(
+        {models.User.karma: models.User.karma + delta},
+        synchronize_session=False,
+    )
+
+    # Group resources have no room, so they only count towards global karma
+    if room_id is None:
+        return
+
+    _add_to_row(db, models.RoomKarma, {"user_id": user_id, "room_id": room_id}, "karma", delta)
+
+
+# --- Backfill / repair ---
+
+def repair_rating_aggregates(db: Session) -> int:
+    """
+    Recomputes rating_sum / rating_count for every resource from the ratings
+    table. Returns the number of resources whose stored values were wrong.
+    """
+    actual = {
+        resource_id: (int(total or 0), count)
+        for resource_id, total, count in db.query(
+            models.Rating.resource_id,
+            func.sum(models.Rating.stars),
+            func.count(models.Rating.stars),
+        )
+        .filter(models.Rating.stars > 0)
+        .group_by(models.Rating.resource_id)
+    }
+
+    fixed = 0
+    for resource in db.query(models.Resource).yield_per(1000):
+        total, count = actual.get(resource.id, (0, 0))
+        if resource.rating_sum != total or resource.rating_count != count:
+            resource.rating_sum = total
+            resource.rating_count = count
+            fixed += 1
+
+    db.commit()
+    return fixed
+
+
+def repair_karma(db: Session) -> int:
+    """
+    Recomputes User.karma and the room_karma table from the (already repaired)
+    resource rating sums. Returns the number of users whose karma was wrong.
+    """
+    actual = dict(
+        db.query(models.Resource.uploader_id, func.sum(models.Resource.rating_sum))
+        .group_by(models.Resource.uploader_id)
+        .all()
+    )
+
+    fixed = 0
+    for user in db.query(models.User).yield_per(1000):
+        karma = int(actual.get(user.id) or 0)
+        if user.karma != karma:
+            user.karma = karma
+            fixed += 1
+
+    # Room karma is cheap to rebuild wholesale
+    db.query(models.RoomKarma).delete(synchronize_session=False)
+    per_room = (
+        db.query(models.Resource.uploader_id, models.Resource.room_id, func.sum(models.Resource.rating_sum))
+        .filter(models.Resource.room_id.isnot(None))
+        .group_by(models.Resource.uploader_id, models.Resource.room_id)
+        .having(func.sum(models.Resource.rating_sum) != 0)
+        .all()
+    )
+    db.add_all(
+        models.RoomKarma(user_id=user_id, room_id=room_id, karma=int(total))
+        for user_id, room_id, total in per_room
+    )
+
+    db.commit()
+    return fixed
+
+
+def repair_comment_counts(db: Session) -> int:
+    """
+    Recomputes Resource.comment_count from the comments table.
+    Returns the number of resources whose count was wrong.
+    """
+    actual = dict(
+        db.query(models.Comment.resource_id, func.count())
+        .group_by(models.Comment.resource_id)
+        .all()
+    )
+
+    fixed = 0
+    for resource in db.query(models.Resource).yield_per(1000):
+        count = actual.get(resource.id, 0)
+        if resource.comment_count != count:
+            resource.comment_count = count
+            fixed += 1
+
+    db.commit()
+    return fixed
+
+
+def repair_member_counts(db: Session) -> int:
+    """
+    Recomputes StudyGroup.member_count from group_members.
+    Returns the number of groups whose count was wrong.
+    """
+    actual = dict(
+        db.query(models.group_members.c.group_id, func.count())
+        .group_by(models.group_members.c.group_id)
+        .all()
+    )
+
+    fixed = 0
+    for group in db.query(models.StudyGroup).yield_per(1000):
+        count = actual.get(group.id, 0)
+        if group.member_count != count:
+            group.member_count = count
+            fixed += 1
+
+    db.commit()
+    return fixed
+
+
+def repair_daily_stats(db: Session) -> int:
+    """
+    Rebuilds the daily_stats rollups from resource timestamps.
+    Returns the number of days written.
+    """
+    per_day = (
+        db.query(func.date(models.Resource.created_at), func.count(models.Resource.id))
+        .group_by(func.date(models.Resource.created_at))
+        .all()
+    )
+
+    db.query(models.DailyStat).delete(synchronize_session=False)
+    db.add_all(
+        models.DailyStat(day=date.fromisoformat(str(day)), uploads=count)
+        for day, count in per_day
+    )
+
+    db.commit()
+    return len(per_day)
+
+
+def recount_tags(db) -> int:
+    """
+    Rebuilds Tag.resource_count and room_tags from resource_tags. Takes a
+    Session or a Connection (the tags migration runs it too).
+    Returns the number of (room, tag) pairs written.
+    """
+    rt, r = models.resource_tags, models.Resource.__table__
+    per_room = db.execute(
+        select(r.c.room_id, rt.c.tag_id, func.count())
+        .select_from(rt.join(r, r.c.id == rt.c.resource_id))
+        .where(r.c.room_id.isnot(None))
+        .group_by(r.c.room_id, rt.c.tag_id)
+    ).all()
+
+    totals: Dict[int, int] = {}
+    for _, tag_id, count in per_room:
+        totals[tag_id] = totals.get(tag_id, 0) + count
+
+    db.execute(update(models.Tag.__table__).values(resource_count=0))
+    for tag_id, count in totals.items():
+        db.execute(update(models.Tag.__table__).where(models.Tag.id == tag_id).values(resource_count=count))
+
+    db.execute(delete(models.RoomTag.__table__))
+    if per_room:
+        db.execute(insert(models.RoomTag.__table__), [
+            {"room_id": room_id, "tag_id": tag_id, "resource_count": count}
+            for room_id, tag_id, count in per_room
+        ])
+    return len(per_room)
+
+
+def repair_tag_counts(db: Session) -> int:
+    """
+    Recomputes tag counts (global and per room) from resource_tags.
+    Returns the number of (room, tag) pairs written.
+    """
+    pairs = recount_tags(db)
+    db.commit()
+    return pairs
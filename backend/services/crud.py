@@ -1,5 +1,7 @@
+from sqlalchemy import exists
 from sqlalchemy.orm import Session
-from backend.services.models import User
+from backend.services.models import User, StudyGroup, group_members
+from backend.services import user_cache
 from typing import List, Optional
 
 
@@ -20,12 +22,30 @@ def update_user(db: Session, user: User, **kwargs) -> User:
     for key, value in kwargs.items():
         setattr(user, key, value)
     db.commit()
+    user_cache.invalidate(user.id)
     db.refresh(user)
     return user
 
 def delete_user(db: Session, user: User):
     db.delete(user)
     db.commit()
+    user_cache.invalidate(user.id)
 
 def list_users(db: Session) -> List[User]:
-    return db.query(User).all()
\ No newline at end of file
+    return db.query(User).all()
+
+def is_group_member(db: Session, group_id: int, user_id: int) -> bool:
+    # Primary-key lookup on group_members instead of loading group.members
+    return db.query(
+        exists().where(
+            group_members.c.group_id == group_id,
+            group_members.c.user_id == user_id
+        )
+    ).scalar()
+
+def add_group_member(db: Session, group: StudyGroup, user_id: int):
+    db.execute(group_members.insert().values(group_id=group.id, user_id=user_id))
+    db.query(StudyGroup).filter(StudyGroup.id == group.id).update(
+        {StudyGroup.member_count: StudyGroup.member_count + 1},
+        synchronize_session=False
+    )
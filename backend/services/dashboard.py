@@ -0,0 +1,196 @@
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+from sqlalchemy import delete, func, insert, select, table, text
+from sqlalchemy.orm import Session
+from backend.services import database, models
+
+# How long a snapshot is served before a background rebuild is kicked off
+SNAPSHOT_TTL_SECONDS = float(os.getenv("DASHBOARD_SNAPSHOT_TTL_SECONDS", "60"))
+TREND_DAYS = 7
+
+# Tables the dashboard shows totals for. Their row counts live in site_totals,
+# bumped by triggers (migration 9), so a rebuild reads four primary-key rows
+# instead of running count(*) over each table.
+COUNTED_TABLES = ("resources", "study_groups", "messages", "ratings")
+
+_lock = threading.Lock()
+_snapshot: Optional[dict] = None
+_built_at = 0.0
+_refreshing = False
+
+
+def get_snapshot() -> dict:
+    """
+    Returns the cached dashboard. Only the very first request builds it inline;
+    after that a stale snapshot is served while one background thread rebuilds it.
+    """
+    global _refreshing
+
+    if _snapshot is None:
+        with _lock:
+            if _snapshot is None:
+                _refresh()
+        return _snapshot  # type: ignore
+
+    if time.monotonic() - _built_at > SNAPSHOT_TTL_SECONDS:
+        with _lock:
+            if not _refreshing:
+                _refreshing = True
+                threading.Thread(target=_refresh_in_background, daemon=True).start()
+
+    return _snapshot
+
+
+def _refresh_in_background():
+    global _refreshing
+    try:
+        _refresh()
+    except Exception as e:
+        print(f"Dashboard refresh failed: {e}")
+    finally:
+        _refreshing = False
+
+
+def _refresh():
+    global _snapshot, _built_at
+    db = database.SessionLocal()
+    try:
+        _snapshot = build_snapshot(db)
+        _built_at = time.monotonic()
+    finally:
+        db.close()
+
+
+def _trigger_ddl() -> list:
+    ddl = []
+    for name in COUNTED_TABLES:
+        ddl.append(
+            f"CREATE TRIGGER IF NOT EXISTS site_totals_{name}_insert AFTER INSERT ON {name} BEGIN\n"
+            f"INSERT INTO site_totals(name, total) VALUES ('{name}', 1) "
+            f"ON CONFLICT(name) DO UPDATE SET total = total + 1;\nEND"
+        )
+        ddl.append(
+            f"CREATE TRIGGER IF NOT EXISTS site_totals_{name}_delete AFTER DELETE ON {name} BEGIN\n"
+            f"UPDATE site_totals SET total = total - 1 WHERE name = '{name}';\nEND"
+        )
+    return ddl
+
+
+def create_triggers(conn):
+    for ddl in _trigger_ddl():
+        conn.execute(text(ddl))
+
+
+def recount_totals(db) -> int:
+    """
+    Rebuilds site_totals from the tables themselves. Takes a Session or a
+    Connection (the site totals migration runs it too). Returns the number
+    of totals that were wrong.
+    """
+    stored = dict(db.execute(select(models.SiteTotal.name, models.SiteTotal.total)).all())
+    actual = {name: db.execute(select(func.count()).select_from(table(name))).scalar() for name in COUNTED_TABLES}
+
+    db.execute(delete(models.SiteTotal.__table__))
+    db.execute(insert(models.SiteTotal.__table__), [
+        {"name": name, "total": total} for name, total in actual.items()
+    ])
+    return sum(stored.get(name) != total for name, total in actual.items())
+
+
+def totals(db: Session) -> Dict[str, int]:
+    # Without the triggers (not SQLite) the stored totals aren't kept up, so count
+    if db.get_bind().dialect.name != "sqlite":
+        return {name: db.execute(select(func.count()).select_from(table(name))).scalar() for name in COUNTED_TABLES}
+    stored = dict(
+        db.query(models.SiteTotal.name, models.SiteTotal.total)
+        .filter(models.SiteTotal.name.in_(COUNTED_TABLES))
+        .all()
+    )
+    return {name: stored.get(name, 0) for name in COUNTED_TABLES}
+
+
+def build_snapshot(db: Session) -> dict:
+    # --- 1. METRICS ---
+    # Total Counts (maintained on write, see COUNTED_TABLES)
+    counts = totals(db)
+    total_resources = counts["resources"]
+    total_groups = counts["study_groups"]
+
+    # Active Users (Logged in within last 24 hours)
+    yesterday = datetime.now(timezone.utc) - timedelta(hours=24)
+    active_users = db.query(models.User).filter(
+        models.User.last_login >= yesterday
+    ).count()
+
+    # Engagement Score (Messages + Ratings)
+    engagement_score = counts["messages"] + counts["ratings"]
+
+    # --- 2. CHAMPION RESOURCE (Highest Rated) ---
+    # Walks the average-rating index; no aggregation over the ratings table
+    popular = db.query(
+        models.Resource,
+        models.User.full_name
+    ).join(models.User, models.Resource.uploader_id == models.User.id)\
+     .filter(models.Resource.rating_count > 0)\
+     .order_by(models.Resource.average_rating.desc())\
+     .first()
+
+    if popular:
+        resource, uploader_name = popular
+        popular_data = {
+            "title": resource.title,
+            "uploader": uploader_name,
+            "rating": round(resource.average_rating, 1), # e.g., 4.8
+            "id": resource.id
+        }
+    else:
+        popular_data = None
+
+    # --- 3. GRAPH DATA: Upload Trends (Last 7 Days) ---
+    # Read from the daily rollups (primary key range), zero-filling quiet days
+    today = datetime.now(timezone.utc).date()
+    first_day = today - timedelta(days=TREND_DAYS - 1)
+    per_day = dict(
+        db.query(models.DailyStat.day, models.DailyStat.uploads)
+        .filter(models.DailyStat.day >= first_day)
+        .all()
+    )
+    days = [first_day + timedelta(days=i) for i in range(TREND_DAYS)]
+
+    # Prepare arrays for Chart.js
+    trend_labels = [str(day) for day in days]
+    trend_data = [per_day.get(day, 0) for day in days]
+
+    # --- 4. RECENT ACTIVITY FEED ---
+    recent_uploads = db.query(models.Resource.title, models.Resource.created_at, models.User.full_name)\
+        .join(models.User, models.Resource.uploader_id == models.User.id)\
+        .order_by(models.Resource.created_at.desc())\
+        .limit(5)\
+        .all()
+
+    formatted_recents = [
+        {
+            "title": title,
+            "user": uploader_name,
+            "time": created_at.strftime("%H:%M")
+        }
+        for title, created_at, uploader_name in recent_uploads
+    ]
+
+    return {
+        "metrics": {
+            "active_users": active_users,
+            "resources": total_resources,
+            "groups": total_groups,
+            "engagement": engagement_score
+        },
+        "popular_resource": popular_data,
+        "chart": {
+            "labels": trend_labels,
+            "data": trend_data
+        },
+        "recent_activity": formatted_recents
+    }
@@ -0,0 +1,273 @@
+"""
+One embedding model shared by every uvicorn worker.
+
+Without it each worker imports ai_services and loads its own FastEmbed model
+and ONNX runtime: N workers, N copies, and no batching across requests.
+embed_server.py runs serve() in a separate process on a Unix socket. When
+EMBED_SOCKET is set, ai_services uses EmbeddingClient (a drop-in for
+embedding_model) instead of loading a model.
+
+The server micro-batches: the first request starts a batch, which then takes
+more requests for up to EMBED_MAX_WAIT_MS or until it holds EMBED_MAX_BATCH
+texts. Requests that arrive while a batch is running wait for the next one,
+so batches grow with load by themselves.
+
+Wire format, both ways: frames of a 4-byte little-endian length and a body.
+    request:  {"model": ..., "kind": "documents" | "query", "texts": [...]}
+    response: {"count": n, "dim": d} then n * d float32s, or {"error": ...}
+"""
+import array
+import asyncio
+import json
+import os
+import socket
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Tuple
+
+from langchain_core.embeddings import Embeddings
+
+EMBED_MAX_BATCH = int(os.getenv("EMBED_MAX_BATCH", "64"))  # texts per model call
+EMBED_MAX_WAIT_MS = float(os.getenv("EMBED_MAX_WAIT_MS", "5"))  # how long a batch waits to fill up
+EMBED_TIMEOUT_SECONDS = float(os.getenv("EMBED_TIMEOUT_SECONDS", "120"))
+
+_LENGTH = struct.Struct("<I")
+
+
+# --- Client side (in each worker) ---
+
+def _recv_exactly(sock: socket.socket, size: int) -> bytes:
+    data = bytearray()
+    while len(data) < size:
+        part = sock.recv(size - len(data))
+        if not part:
+            raise ConnectionError("embedding server closed the connection")
+        data += part
+    return bytes(data)
+
+
+def _recv_frame(sock: socket.socket) -> bytes:
+    (size,) = _LENGTH.unpack(_recv_exactly(sock, _LENGTH.size))
+    return _recv_exactly(sock, size)
+
+
+def _send_frame(sock: socket.socket, body: bytes):
+    sock.sendall(_LENGTH.pack(len(body)) + body)
+
+
+class EmbeddingClient(Embeddings):
+    """Embeddings computed by embed_server.py. One connection per thread, reopened after errors."""
+
+    def __init__(self, socket_path: str, model_name: str):
+        self.socket_path = socket_path
+        self.model_name = model_name
+        self._local = threading.local()
+
+    def _connection(self) -> socket.socket:
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(EMBED_TIMEOUT_SECONDS)
+            try:
+                sock.connect(self.socket_path)
+            except OSError as e:
+                sock.close()
+                raise ConnectionError(
+                    f"No embedding server at {self.socket_path} (start it with `python embed_server.py`)"
+                ) from e
+            self._local.sock = sock
+        return sock
+
+    def _close(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            sock.close()
+            self._local.sock = None
+
+    def _embed(self, kind: str, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        request = json.dumps({"model": self.model_name, "kind": kind, "texts": texts}).encode()
+        # One retry on a fresh connection: the server may have restarted since the last call
+        for attempt in range(2):
+            sock = self._connection()
+            try:
+                _send_frame(sock, request)
+                header = json.loads(_recv_frame(sock))
+                if "error" in header:
+                    raise RuntimeError(f"Embedding server: {header['error']}")
+                values = array.array("f")
+                values.frombytes(_recv_frame(sock))
+                break
+            except (ConnectionError, BrokenPipeError):
+                self._close()
+                if attempt:
+                    raise
+            except Exception:
+                self._close()  # the stream may be mid-frame
+                raise
+
+        dim = header["dim"]
+        return [values[i * dim:(i + 1) * dim].tolist() for i in range(header["count"])]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed("documents", texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed("query", [text])[0]
+
+
+# --- Server side (embed_server.py) ---
+
+def _load_model(model_name: str) -> Embeddings:
+    if os.getenv("AI_BACKEND", "google") == "fake":
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+        return DeterministicFakeEmbedding(size=384)
+    from langchain_community.embeddings.fastembed import FastEmbedEmbeddings
+    return FastEmbedEmbeddings(model_name=model_name)
+
+
+def _embed_queries(model: Embeddings, texts: List[str]) -> List[List[float]]:
+    # FastEmbed's query_embed takes a whole list; embed_query only takes one
+    inner = getattr(model, "model", None)
+    if hasattr(inner, "query_embed"):
+        return [vector.tolist() for vector in inner.query_embed(texts, batch_size=model.batch_size)]
+    return [model.embed_query(text) for text in texts]
+
+
+class _Batcher:
+    """Queue and batching loop for one (model, kind)."""
+
+    def __init__(self, server: "EmbedServer", model_name: str, kind: str):
+        self.server = server
+        self.model_name = model_name
+        self.kind = kind
+        self.queue: asyncio.Queue = asyncio.Queue()
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((texts, future))
+        return await future
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            size = len(batch[0][0])
+            deadline = loop.time() + self.server.max_wait
+            while size < self.server.max_batch:
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), deadline - loop.time())
+                except asyncio.TimeoutError:
+                    break
+                batch.append(item)
+                size += len(item[0])
+
+            texts = [text for request_texts, _ in batch for text in request_texts]
+            try:
+                vectors = await loop.run_in_executor(self.server.executor, self.server.compute,
+                                                     self.model_name, self.kind, texts)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            start = 0
+            for request_texts, future in batch:
+                if not future.done():  # the client may have gone away
+                    future.set_result(vectors[start:start + len(request_texts)])
+                start += len(request_texts)
+            self.server.record(len(batch), len(texts))
+
+
+class EmbedServer:
+    def __init__(self, socket_path: str, max_batch: int = EMBED_MAX_BATCH, max_wait_ms: float = EMBED_MAX_WAIT_MS):
+        self.socket_path = socket_path
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        # One thread runs the model; ONNX runtime parallelises inside each call
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embed")
+        self.models: Dict[str, Embeddings] = {}
+        self.batchers: Dict[Tuple[str, str], _Batcher] = {}
+        self.stats = {"requests": 0, "batches": 0, "texts": 0}
+
+    def compute(self, model_name: str, kind: str, texts: List[str]) -> List[List[float]]:
+        # Runs on the executor thread, so models load there too (never on the event loop)
+        if model_name not in self.models:
+            print(f"📦 Loading {model_name}...")
+            self.models[model_name] = _load_model(model_name)
+        model = self.models[model_name]
+        return model.embed_documents(texts) if kind == "documents" else _embed_queries(model, texts)
+
+    def record(self, requests: int, texts: int):
+        self.stats["requests"] += requests
+        self.stats["batches"] += 1
+        self.stats["texts"] += texts
+
+    def _batcher(self, model_name: str, kind: str) -> _Batcher:
+        key = (model_name, kind)
+        if key not in self.batchers:
+            self.batchers[key] = _Batcher(self, model_name, kind)
+            asyncio.get_running_loop().create_task(self.batchers[key].run())
+        return self.batchers[key]
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    (size,) = _LENGTH.unpack(await reader.readexactly(_LENGTH.size))
+                    request = json.loads(await reader.readexactly(size))
+                except asyncio.IncompleteReadError:
+                    return  # client disconnected
+
+                try:
+                    if request.get("kind") not in ("documents", "query"):
+                        raise ValueError(f"unknown kind {request.get('kind')!r}")
+                    vectors = await self._batcher(request["model"], request["kind"]).embed(request["texts"])
+                    dim = len(vectors[0]) if vectors else 0
+                    header = {"count": len(vectors), "dim": dim}
+                    body = array.array("f", (value for vector in vectors for value in vector)).tobytes()
+                    frames = [json.dumps(header).encode(), body]
+                except Exception as e:
+                    frames = [json.dumps({"error": str(e)}).encode()]
+
+                for frame in frames:
+                    writer.write(_LENGTH.pack(len(frame)) + frame)
+                await writer.drain()
+        except (ConnectionError, ValueError) as e:
+            print(f"⚠️  Dropping embedding client: {e}")
+        finally:
+            writer.close()
+
+    async def _report(self, every: float):
+        last = dict(self.stats)
+        while True:
+            await asyncio.sleep(every)
+            s = self.stats
+            batches = s["batches"] - last["batches"]
+            if batches:
+                print(f"  {s['requests'] - last['requests']} requests in {batches} batches "
+                      f"(avg {(s['texts'] - last['texts']) / batches:.1f} texts/batch)")
+            last = dict(s)
+
+    async def serve(self, preload: Iterable[str] = (), report_every: float = 60.0):
+        loop = asyncio.get_running_loop()
+        for model_name in preload:
+            await loop.run_in_executor(self.executor, self.compute, model_name, "documents", ["warm up"])
+
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)  # left over from a previous run
+        server = await asyncio.start_unix_server(self._handle, path=self.socket_path)
+        os.chmod(self.socket_path, 0o660)
+        print(f"🧮 Embedding server on {self.socket_path} "
+              f"(max batch {self.max_batch}, max wait {self.max_wait * 1000:.0f} ms)")
+        if report_every:
+            loop.create_task(self._report(report_every))
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
@@ -0,0 +1,102 @@
+"""
+Conditional GET for list endpoints.
+
+Every list the frontend polls has a row in list_versions ("room:3",
+"comments:42", "messages:7", "groups") whose version is bumped by triggers
+on the underlying tables, so ORM writes, raw SQL and bulk imports all
+invalidate it without the routers having to remember. A list's ETag hashes
+that version with whatever else shapes the response (query string, user),
+so checking If-None-Match costs one primary-key lookup and an unchanged
+poll is answered 304 before the payload query runs. The triggers are
+created by migration 7; on other databases etag() returns None and every
+request gets a full response.
+
+Payloads are rendered with orjson directly (json_response), skipping
+FastAPI's jsonable_encoder pass over every row.
+"""
+import hashlib
+from typing import Optional
+from fastapi import Request
+from fastapi.responses import ORJSONResponse, Response
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from backend.services import models
+
+# Clients may reuse a response only after revalidating it
+CACHE_CONTROL = "private, no-cache"
+
+# table -> [(list key expression, condition)]; ROW is replaced by new/old
+_WATCHED = {
+    "resources": [
+        ("'room:' || ROW.room_id", "ROW.room_id IS NOT NULL"),
+        ("'group_resources:' || ROW.group_id", "ROW.group_id IS NOT NULL"),
+    ],
+    "comments": [("'comments:' || ROW.resource_id", "1")],
+    "messages": [("'messages:' || ROW.group_id", "1")],
+    "study_groups": [("'groups'", "1")],
+    "group_members": [("'groups'", "1")],  # is_member flips for the joining user
+}
+
+
+def _bump(key: str, condition: str) -> str:
+    return (
+        f"INSERT INTO list_versions(key, version) SELECT {key}, 1 WHERE {condition} "
+        f"ON CONFLICT(key) DO UPDATE SET version = version + 1;"
+    )
+
+
+def _trigger_ddl() -> list:
+    ddl = []
+    for table, lists in _WATCHED.items():
+        for event, rows in (("INSERT", ["new"]), ("UPDATE", ["old", "new"]), ("DELETE", ["old"])):
+            # An update that moves a row (e.g. to another room) changes both lists
+            body = "\n".join(
+                _bump(key.replace("ROW", row), condition.replace("ROW", row))
+                for key, condition in lists for row in rows
+            )
+            ddl.append(
+                f"CREATE TRIGGER IF NOT EXISTS list_versions_{table}_{event.lower()} "
+                f"AFTER {event} ON {table} BEGIN\n{body}\nEND"
+            )
+    return ddl
+
+
+def create_triggers(conn: Connection):
+    for ddl in _trigger_ddl():
+        conn.execute(text(ddl))
+
+
+def etag(db: Session, key: str, *vary) -> Optional[str]:
+    """
+    Weak ETag for list `key` as seen with `vary` (query string, user id...).
+    Weak because the same JSON may go out gzipped or not.
+    """
+    if db.get_bind().dialect.name != "sqlite":
+        return None
+    version = db.query(models.ListVersion.version).filter(models.ListVersion.key == key).scalar() or 0
+    digest = hashlib.sha1(repr((key, version) + vary).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def is_fresh(request: Request, etag: Optional[str]) -> bool:
+    """True if the client's If-None-Match already names this version."""
+    header = request.headers.get("if-none-match")
+    if etag is None or not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Weak comparison: W/"x" and "x" are the same representation
+    wanted = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == wanted for candidate in header.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+
+def json_response(payload, etag: Optional[str]) -> ORJSONResponse:
+    headers = {"Cache-Control": CACHE_CONTROL}
+    if etag:
+        headers["ETag"] = etag
+    return ORJSONResponse(payload, headers=headers)
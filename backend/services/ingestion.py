@@ -0,0 +1,188 @@
+"""
+Background ingestion for batch uploads.
+
+Every file in a batch is parsed, summarized and chunked on a shared thread
+pool, so the LLM round trips for the summaries overlap instead of
+queueing. Finished files' chunks are buffered and written to the vector
+store EMBED_BATCH_CHUNKS at a time: the embedding model sees big batches
+and Chroma takes one write per flush rather than one per file. A
+resource's summary is saved only once its chunks are indexed, so anything
+shown as done can already be chatted with.
+
+Progress lives on the IngestBatch row, so any worker can answer a poll.
+The work itself runs in the process that accepted the upload; if that
+process dies, its unfinished resources stay "Pending...".
+"""
+import json
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from backend.services import ai_services, counters, database, models, storage, vector_index
+
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "4"))
+EMBED_BATCH_CHUNKS = int(os.getenv("EMBED_BATCH_CHUNKS", "512"))
+MAX_BATCH_FILES = int(os.getenv("MAX_BATCH_FILES", "50"))
+
+PENDING_SUMMARY = "Pending..."
+FAILED_SUMMARY = "Summary generation failed."
+
+_executor = ThreadPoolExecutor(max_workers=INGEST_WORKERS, thread_name_prefix="ingest")
+_index_lock = threading.Lock()  # one vector store write at a time
+
+
+class _BatchRun:
+    """In-memory side of a batch: files still being prepared + chunks waiting to be indexed."""
+
+    def __init__(self, batch_id: str, files: int):
+        self.batch_id = batch_id
+        # Chunked and indexed with the same spec even if the live index switches mid-batch
+        self.spec = vector_index.active()
+        self.remaining = files
+        self.buffered: List[Tuple[int, str, list]] = []  # (resource_id, summary, chunks)
+        self.buffered_chunks = 0
+        self.lock = threading.Lock()
+
+    def done(self, entry: Optional[Tuple[int, str, list]]) -> list:
+        """
+        Records a finished file (None if it failed). Returns the entries to
+        index now: a full buffer, or whatever is left after the last file.
+        """
+        with self.lock:
+            self.remaining -= 1
+            if entry is not None:
+                self.buffered.append(entry)
+                self.buffered_chunks += len(entry[2])
+            if self.buffered and (self.buffered_chunks >= EMBED_BATCH_CHUNKS or self.remaining == 0):
+                ready, self.buffered, self.buffered_chunks = self.buffered, [], 0
+                return ready
+            return []
+
+
+def create_batch(db: Session, user: models.User, room_id: Optional[int], group_id: Optional[int],
+                 tags: str, files: List[Tuple[str, storage.StoredFile]]) -> models.IngestBatch:
+    """
+    Creates a Resource per (title, stored file) plus the batch row, all in one
+    transaction, then queues every file on the ingestion pool and returns.
+    """
+    resources = [
+        models.Resource(
+            title=title,
+            file_path=stored.path,
+            sha256=stored.sha256,
+            tags=tags,
+            uploader_id=user.id,
+            room_id=room_id,
+            group_id=group_id,
+            ai_summary=PENDING_SUMMARY,
+        )
+        for title, stored in files
+    ]
+    db.add_all(resources)
+    db.flush()
+    for resource in resources:
+        counters.add_resource(db, resource)
+
+    # Read before commit(), which would expire every row
+    work = [(r.id, r.file_path, r.sha256) for r in resources]
+    batch = models.IngestBatch(
+        id=uuid.uuid4().hex,
+        user_id=user.id,
+        resource_ids=json.dumps([resource_id for resource_id, _, _ in work]),
+        total=len(work),
+    )
+    db.add(batch)
+    db.commit()
+
+    run = _BatchRun(batch.id, len(work))
+    for resource_id, file_path, sha256 in work:
+        _executor.submit(_ingest_file, run, resource_id, file_path, sha256)
+    return batch
+
+
+def _ingest_file(run: _BatchRun, resource_id: int, file_path: str, sha256: str):
+    try:
+        docs = ai_services.load_pages(file_path, sha256)
+        entry = (resource_id, ai_services.summarize(docs), ai_services.split_chunks(docs, resource_id, run.spec))
+    except Exception as e:
+        print(f"AI Error ({file_path}): {e}")
+        _record(run.batch_id, failed=[resource_id])
+        entry = None
+
+    ready = run.done(entry)
+    if ready:
+        _flush(run, ready)
+
+
+def _flush(run: _BatchRun, ready: list):
+    batch_id = run.batch_id
+    chunks = [chunk for _, _, file_chunks in ready for chunk in file_chunks]
+    try:
+        with _index_lock:
+            ai_services.index_chunks(chunks, run.spec)
+    except Exception as e:
+        print(f"AI Error (indexing {len(chunks)} chunks): {e}")
+        _record(batch_id, failed=[resource_id for resource_id, _, _ in ready])
+        return
+    _record(batch_id, summaries={resource_id: summary for resource_id, summary, _ in ready})
+
+
+def _record(batch_id: str, summaries: Optional[Dict[int, str]] = None, failed: List[int] = ()):
+    """Saves finished resources' summaries and moves the batch counters, in one transaction."""
+    summaries = summaries or {}
+    Batch = models.IngestBatch
+    db = database.SessionLocal()
+    try:
+        for resource_id, summary in summaries.items():
+            db.query(models.Resource).filter(models.Resource.id == resource_id).update(
+                {models.Resource.ai_summary: summary}, synchronize_session=False
+            )
+        if failed:
+            db.query(models.Resource).filter(models.Resource.id.in_(failed)).update(
+                {models.Resource.ai_summary: FAILED_SUMMARY}, synchronize_session=False
+            )
+
+        db.query(Batch).filter(Batch.id == batch_id).update(
+            {Batch.processed: Batch.processed + len(summaries), Batch.failed: Batch.failed + len(failed)},
+            synchronize_session=False,
+        )
+        db.query(Batch).filter(
+            Batch.id == batch_id,
+            Batch.finished_at.is_(None),
+            Batch.processed + Batch.failed >= Batch.total
+        ).update({Batch.finished_at: datetime.now(timezone.utc)}, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def progress(db: Session, batch: models.IngestBatch) -> dict:
+    ids = json.loads(batch.resource_ids)
+    rows = {
+        id: (title, summary)
+        for id, title, summary in db.query(
+            models.Resource.id, models.Resource.title, models.Resource.ai_summary
+        ).filter(models.Resource.id.in_(ids))
+    }
+
+    def status(summary: str) -> str:
+        if summary == PENDING_SUMMARY:
+            return "pending"
+        return "failed" if summary == FAILED_SUMMARY else "done"
+
+    return {
+        "batch_id": batch.id,
+        "total": batch.total,
+        "processed": batch.processed,
+        "failed": batch.failed,
+        "pending": batch.total - batch.processed - batch.failed,
+        "finished": batch.finished_at is not None,
+        "resources": [
+            {"id": id, "title": rows[id][0], "status": status(rows[id][1])} if id in rows
+            else {"id": id, "title": None, "status": "deleted"}
+            for id in ids
+        ],
+    }
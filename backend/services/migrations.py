@@ -0,0 +1,221 @@
+"""
+Schema migrations.
+
+create_all() only creates tables that don't exist yet, so any change to an
+existing table (new columns, new indexes) is a numbered step here. Applied
+steps are recorded in schema_migrations and each runs once per database,
+inside its own transaction. Steps are also written to be re-runnable
+(IF NOT EXISTS / column checks), so a crash or two workers starting at the
+same time can't leave a database half-migrated.
+"""
+from datetime import datetime, timezone
+from sqlalchemy import Column, DateTime, Integer, String, Table, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.schema import CreateIndex
+from backend.services.database import Base
+from backend.services import models  # noqa: F401  (registers every table on Base.metadata)
+from backend.services import counters, dashboard, http_cache, search
+
+schema_migrations = Table(
+    "schema_migrations",
+    Base.metadata,
+    Column("version", Integer, primary_key=True),
+    Column("name", String),
+    Column("applied_at", DateTime),
+)
+
+
+def _add_column(conn: Connection, table: str, column: str, ddl: str):
+    existing = {c["name"] for c in inspect(conn).get_columns(table)}
+    if column not in existing:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+
+
+def _create_index(conn: Connection, name: str):
+    # DDL comes from the Index declared in models.py, so expression indexes
+    # stay identical to the expressions the queries use
+    for table in Base.metadata.tables.values():
+        for index in table.indexes:
+            if index.name == name:
+                conn.execute(CreateIndex(index, if_not_exists=True))
+                return
+    raise ValueError(f"No index named {name} in models")
+
+
+def _backfill_counters(conn: Connection):
+    # Recomputes the counters kept on write from their source rows, so an
+    # existing database starts from its real numbers rather than the column
+    # DEFAULT 0 (which every later write would then add to)
+    conn.execute(text(
+        "UPDATE resources SET "
+        "rating_sum = COALESCE((SELECT sum(stars) FROM ratings "
+        "WHERE ratings.resource_id = resources.id AND stars > 0), 0), "
+        "rating_count = (SELECT count(*) FROM ratings WHERE ratings.resource_id = resources.id AND stars > 0)"
+    ))
+    conn.execute(text(
+        "UPDATE users SET karma = "
+        "COALESCE((SELECT sum(rating_sum) FROM resources WHERE resources.uploader_id = users.id), 0)"
+    ))
+    conn.execute(text("DELETE FROM room_karma"))
+    conn.execute(text(
+        "INSERT INTO room_karma (user_id, room_id, karma) "
+        "SELECT uploader_id, room_id, sum(rating_sum) FROM resources WHERE room_id IS NOT NULL "
+        "GROUP BY uploader_id, room_id HAVING sum(rating_sum) != 0"
+    ))
+    conn.execute(text(
+        "UPDATE study_groups SET member_count = "
+        "(SELECT count(*) FROM group_members WHERE group_members.group_id = study_groups.id)"
+    ))
+    conn.execute(text("DELETE FROM daily_stats"))
+    conn.execute(text(
+        "INSERT INTO daily_stats (day, uploads) "
+        "SELECT date(created_at), count(*) FROM resources GROUP BY date(created_at)"
+    ))
+
+
+def _0001_counter_columns(conn: Connection):
+    # Denormalized counters (ratings, karma, group members) + their indexes
+    _add_column(conn, "resources", "rating_sum", "INTEGER NOT NULL DEFAULT 0")
+    _add_column(conn, "resources", "rating_count", "INTEGER NOT NULL DEFAULT 0")
+    _add_column(conn, "users", "karma", "INTEGER NOT NULL DEFAULT 0")
+    _add_column(conn, "study_groups", "member_count", "INTEGER NOT NULL DEFAULT 0")
+    _backfill_counters(conn)
+
+    _create_index(conn, "ix_resources_average_rating")
+    _create_index(conn, "ix_resources_room_average_rating")
+    _create_index(conn, "ix_users_karma")
+    _create_index(conn, "ix_study_groups_name_lower")
+    _create_index(conn, "ix_messages_group_id_id")
+
+
+def _0002_hot_path_indexes(conn: Connection):
+    _create_index(conn, "ix_resources_room_id_created_at")
+    _create_index(conn, "ix_resources_group_id_created_at")
+    _create_index(conn, "ix_resources_uploader_id_created_at")
+    _create_index(conn, "ix_resources_created_at")
+    _create_index(conn, "ix_ratings_resource_id")
+    _create_index(conn, "ix_comments_resource_id_is_verified_created_at")
+    _create_index(conn, "ix_users_last_login")
+    _create_index(conn, "ix_group_members_group_id")
+
+
+def _0003_resource_sha256(conn: Connection):
+    _add_column(conn, "resources", "sha256", "VARCHAR(64)")
+    _create_index(conn, "ix_resources_sha256")
+
+
+def _0004_resource_search(conn: Connection):
+    # FTS5 is SQLite-only; other databases use search.py's LIKE fallback
+    if conn.dialect.name != "sqlite":
+        return
+    search.create_fts(conn)
+    search.rebuild_fts(conn)
+
+
+def _0005_normalized_tags(conn: Connection):
+    # Parse every existing Resource.tags string into tags / resource_tags, then count
+    tags = models.Tag.__table__
+    resources = models.Resource.__table__
+    links = models.resource_tags
+
+    ids = dict(conn.execute(select(tags.c.name, tags.c.id)).all())
+    already_linked = set(conn.execute(select(links.c.resource_id).distinct()).scalars())
+
+    pending = []
+    for resource_id, raw in conn.execute(select(resources.c.id, resources.c.tags)).all():
+        if resource_id in already_linked:
+            continue
+        names = counters.parse_tags(raw)
+        for name in names:
+            if name not in ids:
+                ids[name] = conn.execute(tags.insert().values(name=name)).inserted_primary_key[0]
+        pending.extend({"resource_id": resource_id, "tag_id": ids[name]} for name in names)
+
+        if len(pending) >= 10000:
+            conn.execute(links.insert(), pending)
+            pending = []
+    if pending:
+        conn.execute(links.insert(), pending)
+
+    counters.recount_tags(conn)
+
+
+def _0006_comment_counts(conn: Connection):
+    _add_column(conn, "resources", "comment_count", "INTEGER NOT NULL DEFAULT 0")
+    conn.execute(text(
+        "UPDATE resources SET comment_count = "
+        "(SELECT count(*) FROM comments WHERE comments.resource_id = resources.id)"
+    ))
+
+
+def _0007_list_versions(conn: Connection):
+    # Triggers are SQLite syntax; elsewhere list endpoints just skip conditional GET
+    if conn.dialect.name != "sqlite":
+        return
+    http_cache.create_triggers(conn)
+
+
+def _0008_recount_counters(conn: Connection):
+    # Databases that ran step 1 before it backfilled have counters that
+    # started from 0; recompute them once
+    _backfill_counters(conn)
+
+
+def _0009_site_totals(conn: Connection):
+    # Same as step 7: the triggers are SQLite syntax, and elsewhere the
+    # dashboard counts the tables itself. Counted in the same transaction
+    # the triggers are created in, so no write falls between the two.
+    if conn.dialect.name != "sqlite":
+        return
+    dashboard.create_triggers(conn)
+    dashboard.recount_totals(conn)
+
+
+# (version, name, step) -- append only, never renumber
+MIGRATIONS = [
+    (1, "counter columns", _0001_counter_columns),
+    (2, "hot path indexes", _0002_hot_path_indexes),
+    (3, "resource content hash", _0003_resource_sha256),
+    (4, "resource full-text search", _0004_resource_search),
+    (5, "normalized tags", _0005_normalized_tags),
+    (6, "comment counts", _0006_comment_counts),
+    (7, "list versions", _0007_list_versions),
+    (8, "recount counters", _0008_recount_counters),
+    (9, "site totals", _0009_site_totals),
+]
+
+
+def run_migrations(engine: Engine) -> list:
+    """
+    Brings a database up to date: creates missing tables, then applies any
+    pending steps in order. Returns the names of the steps applied.
+    """
+    Base.metadata.create_all(bind=engine)
+
+    with engine.connect() as conn:
+        applied = set(conn.execute(select(schema_migrations.c.version)).scalars())
+
+    done = []
+    for version, name, step in MIGRATIONS:
+        if version in applied:
+            continue
+        try:
+            with engine.begin() as conn:
+                step(conn)
+                conn.execute(schema_migrations.insert().values(
+                    version=version, name=name, applied_at=datetime.now(timezone.utc)
+                ))
+        except IntegrityError:
+            # Another process recorded this step first; its DDL was idempotent anyway
+            continue
+        print(f"Applied migration {version}: {name}")
+        done.append(name)
+
+    return done
+
+
+if __name__ == "__main__":
+    from backend.services.database import engine
+    applied = run_migrations(engine)
+    print(f"{len(applied)} migration(s) applied." if applied else "Database is up to date.")
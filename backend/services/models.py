@@ -1,7 +1,8 @@
 import enum
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, Boolean, DateTime, Enum as SAEnum
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, Boolean, Date, DateTime, Float, Index, case, cast, func, literal, Enum as SAEnum
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import relationship, Mapped, mapped_column, DeclarativeBase
-from datetime import datetime, timezone
+from datetime import date, datetime, timezone
 from backend.services.database import Base
 from typing import List, Optional
 from sqlalchemy import Table
@@ -11,7 +12,9 @@ group_members = Table(
     "group_members",
     Base.metadata,
     Column("user_id", Integer, ForeignKey("users.id"), primary_key=True),
-    Column("group_id", Integer, ForeignKey("study_groups.id"), primary_key=True)
+    Column("group_id", Integer, ForeignKey("study_groups.id"), primary_key=True),
+    # The PK leads with user_id; member listings look up by group
+    Index("ix_group_members_group_id", "group_id")
 )
 
 class UserRole(str, enum.Enum):
@@ -36,7 +39,10 @@ class User(Base):
     tokens: Mapped[List["Token"]] = relationship(back_populates="user")
     joined_groups: Mapped[List["StudyGroup"]] = relationship(secondary=group_members, back_populates="members")
     
-    last_login: Mapped[datetime] = mapped_column(default=lambda: datetime.now(timezone.utc))
+    last_login: Mapped[datetime] = mapped_column(default=lambda: datetime.now(timezone.utc), index=True)
+
+    # Total stars received on this user's uploads, kept in sync by counters.apply_rating()
+    karma: Mapped[int] = mapped_column(Integer, default=0, server_default="0", index=True)
 
 # Active Login Tokens
 class Token(Base):
@@ -59,6 +65,18 @@ class Room(Base):
 
     resources: Mapped[List["Resource"]] = relationship(back_populates="room")
 
+# Per-room karma, so room leaderboards are an index range scan
+class RoomKarma(Base):
+    __tablename__ = "room_karma"
+
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), primary_key=True)
+    room_id: Mapped[int] = mapped_column(ForeignKey("rooms.id"), primary_key=True)
+    karma: Mapped[int] = mapped_column(Integer, default=0)
+
+    user: Mapped["User"] = relationship()
+
+    __table_args__ = (Index("ix_room_karma_room_karma", "room_id", "karma"),)
+
 # Resources 
 class Resource(Base):
     __tablename__ = "resources"
@@ -66,9 +84,17 @@ class Resource(Base):
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     title: Mapped[str] = mapped_column(String)
     file_path: Mapped[str] = mapped_column(String)
+    # SHA-256 of the stored file (see storage.save_upload); file_path is derived from it
+    sha256: Mapped[Optional[str]] = mapped_column(String(64), nullable=True, index=True)
     tags: Mapped[str] = mapped_column(String)
     ai_summary: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     created_at: Mapped[datetime] = mapped_column(default=lambda: datetime.now(timezone.utc))
+
+    # Denormalized rating aggregates, kept in sync by counters.apply_rating()
+    rating_sum: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    rating_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    # Kept in sync by counters.add_comment() / remove_comment()
+    comment_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
     
     uploader_id: Mapped[int] = mapped_column(ForeignKey("users.id"))
     room_id: Mapped[int] = mapped_column(ForeignKey("rooms.id"), nullable=True)
@@ -81,6 +107,65 @@ class Resource(Base):
     group: Mapped["StudyGroup"] = relationship(back_populates="resources")
     group_id: Mapped[Optional[int]] = mapped_column(ForeignKey("study_groups.id"), nullable=True)
 
+    @hybrid_property
+    def average_rating(self) -> float:
+        if not self.rating_count:
+            return 0.0
+        return self.rating_sum / self.rating_count
+
+    @average_rating.inplace.expression
+    @classmethod
+    def _average_rating_expression(cls):
+        # Must stay textually identical to the indexed expression below. The
+        # constants are rendered into the SQL: sent as parameters ("> ?",
+        # "ELSE ?") the query no longer matches the index and SQLite sorts
+        return case(
+            (cls.rating_count > literal(0, literal_execute=True), cast(cls.rating_sum, Float) / cls.rating_count),
+            else_=literal(0.0, literal_execute=True),
+        )
+
+# "Top rated" orderings (global champion + per-room) read straight off these
+Index("ix_resources_average_rating", Resource.average_rating)
+Index("ix_resources_room_average_rating", Resource.room_id, Resource.average_rating)
+
+# Newest-first listings: room, group, "my uploads" and the global activity feed
+Index("ix_resources_room_id_created_at", Resource.room_id, Resource.created_at)
+Index("ix_resources_group_id_created_at", Resource.group_id, Resource.created_at)
+Index("ix_resources_uploader_id_created_at", Resource.uploader_id, Resource.created_at)
+Index("ix_resources_created_at", Resource.created_at)
+
+# Tags. Resource.tags keeps the string as typed (for display and search);
+# these rows are what tag filters and facets read.
+resource_tags = Table(
+    "resource_tags",
+    Base.metadata,
+    Column("resource_id", Integer, ForeignKey("resources.id"), primary_key=True),
+    Column("tag_id", Integer, ForeignKey("tags.id"), primary_key=True),
+    # The PK leads with resource_id; tag-filtered listings look up by tag
+    Index("ix_resource_tags_tag_id_resource_id", "tag_id", "resource_id")
+)
+
+class Tag(Base):
+    __tablename__ = "tags"
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    name: Mapped[str] = mapped_column(String(50), unique=True)  # normalized, see counters.parse_tags()
+
+    # Room resources carrying this tag, kept in sync by counters.add_resource() / remove_resource()
+    resource_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0", index=True)
+
+# Per-room tag counts, so a room's facets are an index range scan
+class RoomTag(Base):
+    __tablename__ = "room_tags"
+
+    room_id: Mapped[int] = mapped_column(ForeignKey("rooms.id"), primary_key=True)
+    tag_id: Mapped[int] = mapped_column(ForeignKey("tags.id"), primary_key=True)
+    resource_count: Mapped[int] = mapped_column(Integer, default=0)
+
+    tag: Mapped["Tag"] = relationship()
+
+    __table_args__ = (Index("ix_room_tags_room_count", "room_id", "resource_count"),)
+
 # Comments 
 class Comment(Base):
     __tablename__ = "comments"
@@ -96,6 +181,10 @@ class Comment(Base):
     user: Mapped["User"] = relationship(back_populates="comments")
     resource: Mapped["Resource"] = relationship(back_populates="comments")
 
+    # Matches get_comments' ordering (verified first, then newest; the implicit
+    # trailing rowid breaks ties), so keyset pages are a range scan
+    __table_args__ = (Index("ix_comments_resource_id_is_verified_created_at", "resource_id", "is_verified", "created_at"),)
+
 class Rating(Base):
     __tablename__ = "ratings"
 
@@ -110,6 +199,9 @@ class Rating(Base):
     # Relationships
     user: Mapped["User"] = relationship(back_populates="ratings")
     resource: Mapped["Resource"] = relationship(back_populates="ratings")
+
+    # The PK leads with user_id; per-resource lookups (cascades, repairs) need this
+    __table_args__ = (Index("ix_ratings_resource_id", "resource_id"),)
     
 class StudyGroup(Base):
     __tablename__ = "study_groups"
@@ -119,6 +211,9 @@ class StudyGroup(Base):
     description: Mapped[str] = mapped_column(String)
     created_at: Mapped[datetime] = mapped_column(default=lambda: datetime.now(timezone.utc))
     creator_id: Mapped[int] = mapped_column(ForeignKey("users.id"))
+
+    # Kept in sync on join (see crud.add_group_member), so listings never load members
+    member_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
     
     # Relationships
     creator: Mapped["User"] = relationship("User") 
@@ -126,6 +221,9 @@ class StudyGroup(Base):
     resources: Mapped[List["Resource"]] = relationship(back_populates="group")
     members: Mapped[List["User"]] = relationship(secondary=group_members, back_populates="joined_groups")
 
+# Case-insensitive name ordering + prefix search (range scan on lower(name))
+Index("ix_study_groups_name_lower", func.lower(StudyGroup.name))
+
 class Message(Base):
     __tablename__ = "messages"
     
@@ -137,4 +235,43 @@ class Message(Base):
     group_id: Mapped[int] = mapped_column(ForeignKey("study_groups.id"))
     
     user: Mapped["User"] = relationship("User")
-    group: Mapped["StudyGroup"] = relationship(back_populates="messages")
\ No newline at end of file
+    group: Mapped["StudyGroup"] = relationship(back_populates="messages")
+
+    # Chat history cursors (since_id / before_id) walk this index
+    __table_args__ = (Index("ix_messages_group_id_id", "group_id", "id"),)
+
+# Per-day rollups for the stats dashboard, bumped on write (see counters.bump_daily)
+class DailyStat(Base):
+    __tablename__ = "daily_stats"
+
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    uploads: Mapped[int] = mapped_column(Integer, default=0)
+
+# Change counters for list endpoints (one row per list, e.g. "room:3"), bumped by
+# triggers on every write so a poll can be answered 304 from a PK lookup (see http_cache)
+class ListVersion(Base):
+    __tablename__ = "list_versions"
+
+    key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+# Row counts shown on the stats dashboard (one row per table), kept by
+# triggers on every insert and delete (see dashboard.create_triggers)
+class SiteTotal(Base):
+    __tablename__ = "site_totals"
+
+    name: Mapped[str] = mapped_column(String(32), primary_key=True)
+    total: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+# A multi-file upload being ingested in the background (see ingestion.py)
+class IngestBatch(Base):
+    __tablename__ = "ingest_batches"
+
+    id: Mapped[str] = mapped_column(String(32), primary_key=True)  # uuid4 hex
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"))
+    resource_ids: Mapped[str] = mapped_column(Text)  # JSON list, in upload order
+    total: Mapped[int] = mapped_column(Integer)
+    processed: Mapped[int] = mapped_column(Integer, default=0)
+    failed: Mapped[int] = mapped_column(Integer, default=0)
+    created_at: Mapped[datetime] = mapped_column(default=lambda: datetime.now(timezone.utc))
+    finished_at: Mapped[Optional[datetime]] = mapped_column(nullable=True)
@@ -0,0 +1,146 @@
+"""
+Extracted page text, cached once per PDF.
+
+PDF parsing is the slowest CPU step of ingestion, and summaries, chunking,
+quizzes and re-indexing all need the same text. The first parse writes a
+sidecar keyed by the file's sha256 (so duplicate uploads share one) and
+every later read comes from it.
+
+A sidecar is zstd-compressed JSONL, one frame per page:
+
+    [skippable frame: b"PGIX", version, page count, (count + 1) frame offsets]
+    [zstd frame: {"text": ..., "metadata": {...}}\\n]   x page count
+
+zstd decoders ignore skippable frames, so `zstd -dc file` prints plain JSONL.
+Readers mmap the file and decompress only the pages they ask for.
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+from typing import Iterable, List, Optional
+
+import zstandard
+from langchain_community.document_loaders import PyPDFLoader
+from langchain_core.documents import Document
+
+PAGE_TEXT_DIR = os.getenv("PAGE_TEXT_DIR", "page_text")
+EXTRACT_VERSION = 1  # bump when extraction changes; old sidecars are then ignored
+ZSTD_LEVEL = 6
+
+_SKIPPABLE_MAGIC = 0x184D2A50
+_INDEX_MAGIC = b"PGIX"
+_HEADER = struct.Struct("<4sII")  # index magic, extract version, page count
+
+_local = threading.local()  # zstd (de)compressors aren't thread-safe
+
+
+def _compressor() -> zstandard.ZstdCompressor:
+    if not hasattr(_local, "compressor"):
+        _local.compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+    return _local.compressor
+
+
+def _decompressor() -> zstandard.ZstdDecompressor:
+    if not hasattr(_local, "decompressor"):
+        _local.decompressor = zstandard.ZstdDecompressor()
+    return _local.decompressor
+
+
+def sidecar_path(sha256: str) -> str:
+    return os.path.join(PAGE_TEXT_DIR, sha256[:2], f"{sha256}.v{EXTRACT_VERSION}.jsonl.zst")
+
+
+def file_sha256(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        while chunk := f.read(1024 * 1024):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def write(path: str, docs: List[Document]):
+    frames = [
+        _compressor().compress(
+            (json.dumps({"text": doc.page_content, "metadata": doc.metadata}, ensure_ascii=False) + "\n").encode()
+        )
+        for doc in docs
+    ]
+    index_size = _HEADER.size + 8 * (len(frames) + 1)
+    offsets = [8 + index_size]  # after the skippable frame's own 8-byte header
+    for frame in frames:
+        offsets.append(offsets[-1] + len(frame))
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(struct.pack("<II", _SKIPPABLE_MAGIC, index_size))
+        f.write(_HEADER.pack(_INDEX_MAGIC, EXTRACT_VERSION, len(frames)))
+        f.write(struct.pack(f"<{len(offsets)}Q", *offsets))
+        for frame in frames:
+            f.write(frame)
+    os.replace(tmp_path, path)
+
+
+class PageText:
+    """Random access to one sidecar's pages through mmap."""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, _ = struct.unpack_from("<II", self._map, 0)
+        index_magic, version, count = _HEADER.unpack_from(self._map, 8)
+        if magic != _SKIPPABLE_MAGIC or index_magic != _INDEX_MAGIC or version != EXTRACT_VERSION:
+            self._map.close()
+            raise ValueError(f"Not a page text sidecar: {path}")
+        self._offsets = struct.unpack_from(f"<{count + 1}Q", self._map, 8 + _HEADER.size)
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def page(self, index: int) -> Document:
+        frame = self._map[self._offsets[index]:self._offsets[index + 1]]
+        record = json.loads(_decompressor().decompress(frame))
+        return Document(page_content=record["text"], metadata=record["metadata"])
+
+    def pages(self, indices: Optional[Iterable[int]] = None) -> List[Document]:
+        return [self.page(i) for i in (range(len(self)) if indices is None else indices)]
+
+    def close(self):
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_pages(file_path: str, sha256: Optional[str] = None) -> PageText:
+    """
+    The page text of a PDF, extracting it (once, ever) if there's no sidecar
+    yet. Pass sha256 when it's known to skip hashing the file.
+    """
+    path = sidecar_path(sha256 or file_sha256(file_path))
+    try:
+        return PageText(path)
+    except (FileNotFoundError, ValueError, struct.error):
+        pass
+
+    docs = PyPDFLoader(file_path).load()
+    write(path, docs)
+    return PageText(path)
+
+
+def load_pages(file_path: str, sha256: Optional[str] = None) -> List[Document]:
+    with open_pages(file_path, sha256) as pages:
+        return pages.pages()
+
+
+def discard(sha256: str):
+    try:
+        os.remove(sidecar_path(sha256))
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,110 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+# bcrypt cost. Pinning min/max to the same value makes verify_and_update()
+# hand back a new hash for anything hashed at a different cost, so changing
+# BCRYPT_ROUNDS migrates users transparently as they log in.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+# Password hashing gets its own pool so a login storm can't starve the
+# threadpool every other sync endpoint runs on. Work beyond
+# workers + queue limit is rejected with 503 instead of piling up.
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", str(os.cpu_count() or 2)))
+PASSWORD_QUEUE_LIMIT = int(os.getenv("PASSWORD_QUEUE_LIMIT", "64"))
+
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+
+_executor = ThreadPoolExecutor(max_workers=PASSWORD_WORKERS, thread_name_prefix="bcrypt")
+_lock = threading.Lock()
+_stats = {
+    "submitted": 0,
+    "rejected": 0,
+    "completed": 0,
+    "in_flight": 0,
+    "peak_in_flight": 0,
+    "queue_wait_seconds": 0.0,
+    "work_seconds": 0.0,
+}
+
+
+async def _run(fn, *args):
+    with _lock:
+        if _stats["in_flight"] >= PASSWORD_WORKERS + PASSWORD_QUEUE_LIMIT:
+            _stats["rejected"] += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Too many sign-ins right now, please retry",
+                headers={"Retry-After": "1"},
+            )
+        _stats["submitted"] += 1
+        _stats["in_flight"] += 1
+        _stats["peak_in_flight"] = max(_stats["peak_in_flight"], _stats["in_flight"])
+
+    queued_at = time.perf_counter()
+
+    # The slot is held until bcrypt stops, not until the request does: a client
+    # that disconnects mid-hash must not free room for more work than the limit
+    def work():
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            finished = time.perf_counter()
+            with _lock:
+                _stats["queue_wait_seconds"] += started - queued_at
+                _stats["work_seconds"] += finished - started
+                _stats["completed"] += 1
+                _stats["in_flight"] -= 1
+
+    def release_if_cancelled(future):
+        # Cancelled while still queued (the request went away first): work() never runs
+        if future.cancelled():
+            with _lock:
+                _stats["in_flight"] -= 1
+
+    future = _executor.submit(work)
+    future.add_done_callback(release_if_cancelled)
+    # Cancelling the awaiting request cancels the job too, if it hasn't started
+    return await asyncio.wrap_future(future)
+
+
+async def hash_password(password: str) -> str:
+    return await _run(pwd_context.hash, password)
+
+
+async def verify_and_update(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    (is_valid, new_hash). new_hash is set when the stored hash used an
+    outdated cost and should be replaced.
+    """
+    return await _run(pwd_context.verify_and_update, password, hashed_password)
+
+
+def metrics() -> dict:
+    with _lock:
+        stats = dict(_stats)
+    completed = stats["completed"] or 1
+    return {
+        "workers": PASSWORD_WORKERS,
+        "queue_limit": PASSWORD_QUEUE_LIMIT,
+        "bcrypt_rounds": BCRYPT_ROUNDS,
+        "submitted": stats["submitted"],
+        "rejected": stats["rejected"],
+        "completed": stats["completed"],
+        "in_flight": stats["in_flight"],
+        "peak_in_flight": stats["peak_in_flight"],
+        "avg_queue_wait_ms": round(stats["queue_wait_seconds"] / completed * 1000, 2),
+        "avg_work_ms": round(stats["work_seconds"] / completed * 1000, 2),
+    }
@@ -0,0 +1,184 @@
+"""
+PDF page previews.
+
+Pages are rendered on demand with pdfium (CPU only) and kept in a
+size-bounded disk cache. Each image's name is derived from the file's
+content hash, the page and the size, so the name doubles as a strong ETag
+and a cached image never goes stale. Cache hits bump the file's mtime, and
+when the cache grows past PREVIEW_CACHE_MAX_BYTES the least recently used
+images are evicted.
+
+Renders run on one dedicated thread (pdfium is not thread-safe), and the
+route awaits them on the event loop, so a cold room page full of thumbnails
+queues here instead of holding the threadpool that every sync endpoint
+shares. Past PREVIEW_MAX_PENDING queued renders, misses get a 503. The
+cache lookups (stat, read) are short threadpool calls, so a slow disk never
+stalls the event loop and the WebSockets on it.
+"""
+import asyncio
+import hashlib
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+
+import pypdfium2 as pdfium
+
+PREVIEW_CACHE_DIR = os.getenv("PREVIEW_CACHE_DIR", "preview_cache")
+PREVIEW_CACHE_MAX_BYTES = int(os.getenv("PREVIEW_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+PREVIEW_MAX_PENDING = int(os.getenv("PREVIEW_MAX_PENDING", "64"))  # queued renders before misses get a 503
+
+# name -> target width in pixels
+SIZES = {"thumb": 240, "preview": 1000}
+JPEG_QUALITY = 80
+RENDER_VERSION = "1"  # bump to invalidate every cached image after a rendering change
+
+# pdfium is not thread-safe: every render runs on this one thread (cache hits don't)
+_render_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="preview")
+_pending = 0  # renders queued or running; only touched on the event loop
+_cache_lock = threading.Lock()
+_cache_bytes: Optional[int] = None
+
+
+def _content_key(file_path: str, sha256: Optional[str]) -> str:
+    if sha256:
+        return sha256
+    # Files stored before content hashing: identify them by path + size + mtime
+    stat = os.stat(file_path)
+    return hashlib.sha256(f"{file_path}:{stat.st_size}:{stat.st_mtime_ns}".encode()).hexdigest()
+
+
+def etag_for(file_path: str, sha256: Optional[str], page: int, size: str) -> str:
+    return f'"{_content_key(file_path, sha256)[:32]}-{page}-{size}-v{RENDER_VERSION}"'
+
+
+def _cache_path(etag: str) -> str:
+    name = etag.strip('"')
+    return os.path.join(PREVIEW_CACHE_DIR, name[:2], f"{name}.jpg")
+
+
+def _read_cached(path: str) -> Optional[bytes]:
+    try:
+        with open(path, "rb") as f:
+            image = f.read()
+        os.utime(path)  # LRU bookkeeping
+        return image
+    except FileNotFoundError:
+        return None
+
+
+def locate(file_path: str, sha256: Optional[str], page: int, size: str) -> str:
+    """
+    The image's ETag, after checking the request. Touches the disk (and stats
+    legacy files), so call it from the threadpool.
+    """
+    if size not in SIZES:
+        raise HTTPException(400, detail=f"size must be one of: {', '.join(SIZES)}")
+    if not os.path.exists(file_path):
+        raise HTTPException(404, detail="File not found")
+    return etag_for(file_path, sha256, page, size)
+
+
+async def get_preview(file_path: str, page: int, size: str, etag: str) -> bytes:
+    """
+    JPEG bytes for the image locate() named. Renders on a cache miss. `page`
+    is 1-based. Images are small, so they are returned in memory; eviction
+    can then never pull a file out from under a response.
+    """
+    global _pending
+    path = _cache_path(etag)
+    image = await run_in_threadpool(_read_cached, path)
+    if image is not None:
+        return image
+
+    if _pending >= PREVIEW_MAX_PENDING:
+        raise HTTPException(503, detail="Too many previews rendering, try again shortly", headers={"Retry-After": "2"})
+    _pending += 1
+    try:
+        image = await asyncio.get_running_loop().run_in_executor(
+            _render_executor, _render_and_store, file_path, page, SIZES[size], path
+        )
+    finally:
+        _pending -= 1
+    return image
+
+
+def _render_and_store(file_path: str, page: int, width: int, path: str) -> bytes:
+    # An earlier queued request may have rendered the same image meanwhile
+    image = _read_cached(path)
+    if image is None:
+        image = _render(file_path, page, width)
+        _store(path, image)
+    return image
+
+
+def _render(file_path: str, page: int, width: int) -> bytes:
+    try:
+        pdf = pdfium.PdfDocument(file_path)
+    except pdfium.PdfiumError:
+        raise HTTPException(422, detail="Could not read this PDF")
+    try:
+        if page < 1 or page > len(pdf):
+            raise HTTPException(404, detail=f"Page out of range (document has {len(pdf)} pages)")
+        pdf_page = pdf[page - 1]
+        image = pdf_page.render(scale=width / pdf_page.get_width()).to_pil()
+        pdf_page.close()
+    finally:
+        pdf.close()
+
+    out = io.BytesIO()
+    image.convert("RGB").save(out, "JPEG", quality=JPEG_QUALITY, optimize=True)
+    return out.getvalue()
+
+
+def _store(path: str, image: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(image)
+    os.replace(tmp_path, path)
+    _account(len(image))
+
+
+def _scan() -> list:
+    entries = []
+    for root, _, files in os.walk(PREVIEW_CACHE_DIR):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+    return entries
+
+
+def _account(added: int):
+    global _cache_bytes
+    with _cache_lock:
+        if _cache_bytes is None:
+            # First render since start-up: learn what's already on disk
+            _cache_bytes = sum(size for _, size, _ in _scan())
+        else:
+            _cache_bytes += added
+        if _cache_bytes > PREVIEW_CACHE_MAX_BYTES:
+            _cache_bytes = _evict()
+
+
+def _evict() -> int:
+    """Deletes least recently used images down to 90% of the budget; returns the new total."""
+    entries = sorted(_scan())
+    total = sum(size for _, size, _ in entries)
+    target = PREVIEW_CACHE_MAX_BYTES * 0.9
+    for _, size, path in entries:
+        if total <= target:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except FileNotFoundError:
+            pass
+    return total
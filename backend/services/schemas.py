@@ -64,4 +64,12 @@ class MessageResponse(BaseModel):
     id: int
     user_name: str
     content: str
-    timestamp: datetime
\ No newline at end of file
+    timestamp: datetime
+
+class UploadSessionCreate(BaseModel):
+    title: str
+    room_slug: str
+    tags: str
+    filename: str
+    size: int  # total bytes of the file
+    content_type: str = "application/pdf"  # as the browser reports it (File.type)
@@ -0,0 +1,156 @@
+"""
+Full-text search over room resources.
+
+On SQLite this is an FTS5 table, resources_fts, with one row per resource
+(rowid = resources.id) holding title, tags, ai_summary and the resource's
+comment text. Triggers keep it in step with every write, ORM or bulk, so
+nothing in the routers has to remember to re-index. The table and its
+triggers are created by migration 4. Other databases fall back to a plain
+LIKE scan.
+"""
+import re
+from typing import List, Optional, Tuple
+from sqlalchemy import or_, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from backend.services import models
+
+# bm25 column weights: title, tags, ai_summary, comments
+WEIGHTS = (10.0, 5.0, 2.0, 1.0)
+
+# Scoring every match of a very common word ("notes") costs ~150 ms at 100k
+# resources, so only the newest MAX_RANKED_MATCHES matches (in the searched
+# room, or across rooms) are ranked, and the result says it was truncated.
+# Selective queries never hit the cap.
+MAX_RANKED_MATCHES = 2000
+
+FTS_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS resources_fts USING fts5(
+        title, tags, ai_summary, comments, tokenize = 'porter unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS resources_fts_insert AFTER INSERT ON resources BEGIN
+        INSERT INTO resources_fts(rowid, title, tags, ai_summary, comments)
+        VALUES (new.id, new.title, new.tags, new.ai_summary, '');
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS resources_fts_update AFTER UPDATE OF title, tags, ai_summary ON resources BEGIN
+        UPDATE resources_fts SET title = new.title, tags = new.tags, ai_summary = new.ai_summary
+        WHERE rowid = new.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS resources_fts_delete AFTER DELETE ON resources BEGIN
+        DELETE FROM resources_fts WHERE rowid = old.id;
+    END""",
+    # New comments are appended; edits and deletes rebuild that resource's comment text
+    """CREATE TRIGGER IF NOT EXISTS resources_fts_comment_insert AFTER INSERT ON comments BEGIN
+        UPDATE resources_fts SET comments = trim(comments || ' ' || new.content) WHERE rowid = new.resource_id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS resources_fts_comment_update AFTER UPDATE OF content ON comments BEGIN
+        UPDATE resources_fts SET comments = coalesce(
+            (SELECT group_concat(content, ' ') FROM comments WHERE resource_id = new.resource_id), ''
+        ) WHERE rowid = new.resource_id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS resources_fts_comment_delete AFTER DELETE ON comments BEGIN
+        UPDATE resources_fts SET comments = coalesce(
+            (SELECT group_concat(content, ' ') FROM comments WHERE resource_id = old.resource_id), ''
+        ) WHERE rowid = old.resource_id;
+    END""",
+]
+
+
+def create_fts(conn: Connection):
+    for ddl in FTS_DDL:
+        conn.execute(text(ddl))
+
+
+def rebuild_fts(conn: Connection) -> int:
+    """Re-indexes every resource from scratch. Returns the number of rows indexed."""
+    conn.execute(text("DELETE FROM resources_fts"))
+    conn.execute(text("""
+        INSERT INTO resources_fts(rowid, title, tags, ai_summary, comments)
+        SELECT r.id, r.title, r.tags, r.ai_summary,
+               coalesce((SELECT group_concat(c.content, ' ') FROM comments c WHERE c.resource_id = r.id), '')
+        FROM resources r
+    """))
+    conn.execute(text("INSERT INTO resources_fts(resources_fts) VALUES ('optimize')"))
+    return conn.execute(text("SELECT count(*) FROM resources_fts")).scalar()
+
+
+def to_match_query(q: str) -> Optional[str]:
+    """
+    Turns free text into a safe FTS5 query: every word must match, and the
+    last one is a prefix so results update while typing. FTS syntax in the
+    input (quotes, operators, column filters) is treated as plain words.
+    """
+    words = re.findall(r"\w+", q.lower())
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def search_ids(db: Session, q: str, room_id: Optional[int], limit: int,
+               offset: int) -> Tuple[List[Tuple[int, float, str]], bool]:
+    """
+    ([(resource_id, score, snippet)] best first, truncated). Only room
+    resources are searchable; group uploads stay private to their group.
+    truncated is True when older matches were left out by the ranking cap.
+    """
+    if db.get_bind().dialect.name != "sqlite":
+        return _search_ids_like(db, q, room_id, limit, offset), False
+
+    match = to_match_query(q)
+    if match is None:
+        return [], False
+
+    room_filter = "r.room_id = :room_id" if room_id is not None else "r.room_id IS NOT NULL"
+    params = {"match": match, "room_id": room_id, "limit": limit, "offset": offset, "cap": MAX_RANKED_MATCHES - 1}
+
+    # A. The id of the oldest match that still gets ranked, counted within the
+    # same rooms as the search itself (None: there are fewer matches than the cap)
+    cutoff = db.execute(text(f"""
+        SELECT resources_fts.rowid
+        FROM resources_fts(:match)
+        JOIN resources r ON r.id = resources_fts.rowid
+        WHERE {room_filter}
+        ORDER BY resources_fts.rowid DESC
+        LIMIT 1 OFFSET :cap
+    """), params).scalar()
+
+    # B. Rank the matches from there on
+    rows = db.execute(text(f"""
+        SELECT r.id,
+               bm25(resources_fts, {", ".join(map(str, WEIGHTS))}) AS score,
+               snippet(resources_fts, -1, '', '', '…', 16) AS snippet
+        FROM resources_fts
+        JOIN resources r ON r.id = resources_fts.rowid
+        WHERE resources_fts MATCH :match AND {room_filter}
+          AND resources_fts.rowid >= :cutoff
+        ORDER BY score
+        LIMIT :limit OFFSET :offset
+    """), {**params, "cutoff": cutoff or 0})
+    # bm25 is "lower is better"; flip it so clients see higher = more relevant
+    return [(id, round(-score, 3), snippet) for id, score, snippet in rows], cutoff is not None
+
+
+def _search_ids_like(db: Session, q: str, room_id: Optional[int], limit: int, offset: int):
+    words = re.findall(r"\w+", q)
+    if not words:
+        return []
+    query = db.query(models.Resource.id, models.Resource.ai_summary)
+    for word in words:
+        pattern = f"%{word}%"
+        query = query.filter(or_(
+            models.Resource.title.ilike(pattern),
+            models.Resource.tags.ilike(pattern),
+            models.Resource.ai_summary.ilike(pattern),
+        ))
+    query = query.filter(models.Resource.room_id == room_id) if room_id is not None \
+        else query.filter(models.Resource.room_id.isnot(None))
+    rows = query.order_by(models.Resource.created_at.desc()).offset(offset).limit(limit).all()
+    return [(id, 0.0, (summary or "")[:200]) for id, summary in rows]
+
+
+if __name__ == "__main__":
+    from backend.services.database import engine
+    with engine.begin() as conn:
+        print(f"Indexed {rebuild_fts(conn)} resource(s).")
@@ -0,0 +1,140 @@
+import hashlib
+import os
+import uuid
+from dataclasses import dataclass
+from fastapi import HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
+
+UPLOAD_DIR = "static/uploads"
+
+# Uploads are stored by content: objects/ab/cd/<sha256><ext>. Two users uploading
+# "notes.pdf" no longer overwrite each other, identical files are stored once,
+# and the two shard levels keep any one directory small.
+OBJECTS_DIR = os.path.join(UPLOAD_DIR, "objects")
+TMP_DIR = os.path.join(UPLOAD_DIR, "tmp")
+
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(50 * 1024 * 1024)))
+CHUNK_SIZE = 1024 * 1024
+# Room for the form fields and multipart boundaries around the file itself
+FORM_OVERHEAD_BYTES = 64 * 1024
+
+
+@dataclass
+class StoredFile:
+    path: str       # relative path, also the URL path under /static
+    sha256: str
+    size: int
+
+
+def object_path(sha256: str, ext: str) -> str:
+    return os.path.join(OBJECTS_DIR, sha256[:2], sha256[2:4], f"{sha256}{ext}")
+
+
+def _extension(filename: str) -> str:
+    ext = os.path.splitext(filename or "")[1].lower()
+    return ext if ext.isascii() and ext[1:].isalnum() and len(ext) <= 10 else ""
+
+
+def too_large_message() -> str:
+    return f"File too large (limit is {MAX_UPLOAD_BYTES // (1024 * 1024)} MB)"
+
+
+def exceeds_limit(content_length, files: int = 1) -> bool:
+    """
+    Lets the upload middleware reject a request from its Content-Length header
+    before the multipart body is read. Chunked uploads without one are only
+    caught by save_upload(), after Starlette has spooled the whole body.
+    """
+    try:
+        return content_length is not None and \
+            int(content_length) > files * (MAX_UPLOAD_BYTES + FORM_OVERHEAD_BYTES)
+    except ValueError:
+        return False
+
+
+def _finalize(tmp_path: str, final_path: str):
+    os.makedirs(os.path.dirname(final_path), exist_ok=True)
+    if os.path.exists(final_path):
+        # Same content is already stored
+        os.remove(tmp_path)
+    else:
+        os.replace(tmp_path, final_path)
+
+
+async def save_upload(file: UploadFile) -> StoredFile:
+    """
+    Copies an upload into content-addressed storage in CHUNK_SIZE pieces,
+    hashing as it goes. This is a second copy: by the time the route runs,
+    Starlette has already spooled the whole multipart body to a temporary
+    file, so MAX_UPLOAD_BYTES here only stops an oversized file from being
+    stored (the middleware's Content-Length check is what refuses it before
+    the body is read). Disk I/O runs in the threadpool so the event loop is
+    never blocked on a large file.
+    """
+    os.makedirs(TMP_DIR, exist_ok=True)
+    tmp_path = os.path.join(TMP_DIR, uuid.uuid4().hex)
+    digest = hashlib.sha256()
+    size = 0
+
+    out = await run_in_threadpool(open, tmp_path, "wb")
+    try:
+        while chunk := await file.read(CHUNK_SIZE):
+            size += len(chunk)
+            if size > MAX_UPLOAD_BYTES:
+                raise HTTPException(413, detail=too_large_message())
+            digest.update(chunk)
+            await run_in_threadpool(out.write, chunk)
+    except BaseException:
+        out.close()
+        os.remove(tmp_path)
+        raise
+    await run_in_threadpool(out.close)
+
+    if size == 0:
+        os.remove(tmp_path)
+        raise HTTPException(400, detail="Empty file")
+
+    sha256 = digest.hexdigest()
+    final_path = object_path(sha256, _extension(file.filename))
+    await run_in_threadpool(_finalize, tmp_path, final_path)
+    return StoredFile(path=final_path.replace(os.sep, "/"), sha256=sha256, size=size)
+
+
+def store_local_file(src_path: str, filename: str) -> StoredFile:
+    """
+    Hashes a file that is already on local disk (e.g. an assembled resumable
+    upload) and moves it into content-addressed storage. Blocking; call it
+    from the threadpool.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    with open(src_path, "rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            size += len(chunk)
+            digest.update(chunk)
+
+    sha256 = digest.hexdigest()
+    final_path = object_path(sha256, _extension(filename))
+    _finalize(src_path, final_path)
+    return StoredFile(path=final_path.replace(os.sep, "/"), sha256=sha256, size=size)
+
+
+def copy_local_file(src_path: str, filename: str) -> StoredFile:
+    """
+    Like store_local_file(), but leaves the source where it is (bulk imports
+    read from archives the app doesn't own). Hashes while copying. Blocking.
+    """
+    os.makedirs(TMP_DIR, exist_ok=True)
+    tmp_path = os.path.join(TMP_DIR, uuid.uuid4().hex)
+    digest = hashlib.sha256()
+    size = 0
+    with open(src_path, "rb") as src, open(tmp_path, "wb") as out:
+        while chunk := src.read(CHUNK_SIZE):
+            size += len(chunk)
+            digest.update(chunk)
+            out.write(chunk)
+
+    sha256 = digest.hexdigest()
+    final_path = object_path(sha256, _extension(filename))
+    _finalize(tmp_path, final_path)
+    return StoredFile(path=final_path.replace(os.sep, "/"), sha256=sha256, size=size)
@@ -0,0 +1,234 @@
+"""
+Resumable uploads.
+
+A session is a directory under UPLOAD_SESSION_DIR holding meta.json and the
+bytes received so far (data.part). Chunks are fixed-size and appended in
+order, so the number of complete chunks on disk is the resume point; a chunk
+cut off mid-write is simply truncated away and sent again. Sessions nobody has
+touched for UPLOAD_SESSION_TTL_HOURS are deleted.
+
+Only PDFs are accepted: the first chunk must start with the PDF signature,
+and the assembled file is checked again before it is handed over. Writes to
+a session hold an OS file lock on it, so chunks stay in order even when
+several worker processes serve the same upload.
+
+The directory is deliberately outside static/, so half-finished uploads are
+never served.
+"""
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from fastapi import HTTPException
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+UPLOAD_SESSION_DIR = os.getenv("UPLOAD_SESSION_DIR", "upload_sessions")
+UPLOAD_SESSION_TTL_HOURS = float(os.getenv("UPLOAD_SESSION_TTL_HOURS", "24"))
+RESUMABLE_MAX_BYTES = int(os.getenv("RESUMABLE_MAX_BYTES", str(512 * 1024 * 1024)))
+CHUNK_SIZE = 8 * 1024 * 1024
+
+GC_INTERVAL_SECONDS = 600
+PDF_SIGNATURE = b"%PDF-"
+
+_lock = threading.Lock()
+_last_gc = 0.0
+
+
+def _session_dir(upload_id: str) -> str:
+    # ids are uuid4 hex; anything else can't name a session (and can't escape the dir)
+    if len(upload_id) != 32 or not all(c in "0123456789abcdef" for c in upload_id):
+        raise HTTPException(404, detail="Upload session not found")
+    return os.path.join(UPLOAD_SESSION_DIR, upload_id)
+
+
+def _data_path(upload_id: str) -> str:
+    return os.path.join(_session_dir(upload_id), "data.part")
+
+
+@contextmanager
+def _session_lock(upload_id: str):
+    # Across processes (uvicorn workers), not just threads: an exclusive lock on
+    # the session's lock file, released when it is closed
+    try:
+        f = open(os.path.join(_session_dir(upload_id), "lock"), "a+b")
+    except FileNotFoundError:
+        # Finalized or garbage-collected in the meantime
+        raise HTTPException(404, detail="Upload session not found")
+    try:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        yield
+    finally:
+        f.close()
+
+
+def _check_signature(head: bytes):
+    if not head.startswith(PDF_SIGNATURE):
+        raise HTTPException(400, detail="Only PDF files are allowed")
+
+
+def create(user_id: int, filename: str, size: int, fields: dict) -> dict:
+    """
+    Starts a session. `fields` is whatever the finalize step needs later
+    (title, room, tags) and is stored alongside the upload.
+    """
+    if size <= 0:
+        raise HTTPException(400, detail="Empty file")
+    if size > RESUMABLE_MAX_BYTES:
+        raise HTTPException(413, detail=f"File too large (limit is {RESUMABLE_MAX_BYTES // (1024 * 1024)} MB)")
+
+    collect_garbage()
+
+    upload_id = uuid.uuid4().hex
+    session_dir = _session_dir(upload_id)
+    os.makedirs(session_dir)
+    meta = {
+        "upload_id": upload_id,
+        "user_id": user_id,
+        "filename": filename,
+        "size": size,
+        "chunk_size": CHUNK_SIZE,
+        "fields": fields,
+        "created_at": time.time(),
+    }
+    with open(os.path.join(session_dir, "meta.json"), "w") as f:
+        json.dump(meta, f)
+    open(_data_path(upload_id), "wb").close()
+    return meta
+
+
+def load(upload_id: str, user_id: int) -> dict:
+    try:
+        with open(os.path.join(_session_dir(upload_id), "meta.json")) as f:
+            meta = json.load(f)
+    except FileNotFoundError:
+        raise HTTPException(404, detail="Upload session not found")
+    if meta["user_id"] != user_id:
+        raise HTTPException(404, detail="Upload session not found")
+    return meta
+
+
+def offset(meta: dict) -> int:
+    """Bytes safely received: whole chunks only, unless the upload is complete."""
+    try:
+        received = os.path.getsize(_data_path(meta["upload_id"]))
+    except FileNotFoundError:
+        # Finalized or garbage-collected in the meantime
+        raise HTTPException(404, detail="Upload session not found")
+    if received >= meta["size"]:
+        return meta["size"]
+    return received - received % meta["chunk_size"]
+
+
+def status(meta: dict) -> dict:
+    received = offset(meta)
+    return {
+        "upload_id": meta["upload_id"],
+        "size": meta["size"],
+        "chunk_size": meta["chunk_size"],
+        "offset": received,
+        "next_chunk": received // meta["chunk_size"],
+        "complete": received == meta["size"],
+    }
+
+
+def expected_length(meta: dict, index: int) -> int:
+    start = index * meta["chunk_size"]
+    if index < 0 or start >= meta["size"]:
+        raise HTTPException(400, detail="Chunk index out of range")
+    return min(meta["chunk_size"], meta["size"] - start)
+
+
+def write_chunk(meta: dict, index: int, data: bytes) -> dict:
+    """
+    Appends chunk `index`. Re-sending a chunk that is already stored is a
+    no-op, so clients can retry blindly; skipping ahead is a 409 carrying the
+    offset to resume from.
+    """
+    if len(data) != expected_length(meta, index):
+        raise HTTPException(400, detail=f"Chunk {index} must be {expected_length(meta, index)} bytes")
+    if index == 0:
+        _check_signature(data)
+
+    path = _data_path(meta["upload_id"])
+    with _session_lock(meta["upload_id"]):
+        received = offset(meta)
+        start = index * meta["chunk_size"]
+        if start < received:
+            return status(meta)
+        if start > received:
+            raise HTTPException(409, detail={"msg": "Chunk out of order", **status(meta)})
+
+        with open(path, "r+b") as f:
+            f.truncate(received)  # drop any half-written chunk from a dropped connection
+            f.seek(received)
+            f.write(data)
+    return status(meta)
+
+
+def assemble(meta: dict) -> str:
+    """
+    Path of the complete file, detached from the session (which is removed).
+    The caller moves it into storage.
+    """
+    with _session_lock(meta["upload_id"]):
+        if offset(meta) != meta["size"]:
+            raise HTTPException(409, detail={"msg": "Upload incomplete", **status(meta)})
+        with open(_data_path(meta["upload_id"]), "rb") as f:
+            head = f.read(len(PDF_SIGNATURE))
+        if not head.startswith(PDF_SIGNATURE):
+            discard(meta)
+            _check_signature(head)
+
+        finished = os.path.join(UPLOAD_SESSION_DIR, f"{meta['upload_id']}.complete")
+        os.replace(_data_path(meta["upload_id"]), finished)
+    # After the lock file is closed (Windows can't delete an open file)
+    shutil.rmtree(_session_dir(meta["upload_id"]), ignore_errors=True)
+    return finished
+
+
+def discard(meta: dict):
+    shutil.rmtree(_session_dir(meta["upload_id"]), ignore_errors=True)
+
+
+def collect_garbage(force: bool = False) -> int:
+    """
+    Deletes sessions whose data hasn't changed in UPLOAD_SESSION_TTL_HOURS.
+    Runs at most every GC_INTERVAL_SECONDS unless forced. Returns how many were removed.
+    """
+    global _last_gc
+    now = time.time()
+    with _lock:
+        if not force and now - _last_gc < GC_INTERVAL_SECONDS:
+            return 0
+        _last_gc = now
+
+    if not os.path.isdir(UPLOAD_SESSION_DIR):
+        return 0
+
+    cutoff = now - UPLOAD_SESSION_TTL_HOURS * 3600
+    removed = 0
+    for entry in os.scandir(UPLOAD_SESSION_DIR):
+        # A session's data.part is touched on every chunk
+        data_path = os.path.join(entry.path, "data.part") if entry.is_dir() else entry.path
+        try:
+            touched = os.path.getmtime(data_path if os.path.exists(data_path) else entry.path)
+        except FileNotFoundError:
+            continue  # finalized while we were looking
+        if touched < cutoff:
+            if entry.is_dir():
+                shutil.rmtree(entry.path, ignore_errors=True)
+            else:
+                os.remove(entry.path)
+            removed += 1
+    return removed
@@ -0,0 +1,50 @@
+import os
+import threading
+from typing import Optional
+from cachetools import TTLCache
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.session import make_transient_to_detached
+from backend.services.models import User
+
+# Bounded LRU with a TTL. Entries are column snapshots of a User keyed by id
+# (the token's "sub"). Updates/deletes through crud invalidate immediately in
+# this process; the TTL bounds staleness across workers.
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+USER_CACHE_TTL_SECONDS = int(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+
+_lock = threading.Lock()
+_cache: TTLCache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL_SECONDS)
+
+_COLUMNS = [attr.key for attr in inspect(User).column_attrs]
+
+
+def get(db: Session, user_id: int) -> Optional[User]:
+    """
+    Returns the cached user attached to this session, without a SELECT,
+    or None on a miss.
+    """
+    with _lock:
+        snapshot = _cache.get(user_id)
+    if snapshot is None:
+        return None
+
+    user = User(**snapshot)
+    make_transient_to_detached(user)
+    return db.merge(user, load=False)
+
+
+def put(user: User):
+    snapshot = {key: getattr(user, key) for key in _COLUMNS}
+    with _lock:
+        _cache[user.id] = snapshot
+
+
+def invalidate(user_id: int):
+    with _lock:
+        _cache.pop(user_id, None)
+
+
+def clear():
+    with _lock:
+        _cache.clear()
@@ -0,0 +1,86 @@
+"""
+Which Chroma collection is live.
+
+Chunks live in versioned collections (resources_v1, resources_v2, ...). Each
+one records the chunking and embedding settings it was built with, and
+CHROMA_PATH/active_index.json names the live one. reindex.py builds the
+next version next to it while the old one keeps serving, then swaps the
+pointer with one atomic rename. Every worker notices the new pointer on its
+next read; there is nothing to restart.
+
+Before the first re-index there is no pointer file, and the collection that
+process_document has always written to ("langchain") is treated as version 0.
+"""
+import json
+import os
+import threading
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+CHROMA_PATH = "chroma_db"  # Folder where vector data will be saved locally
+INDEX_FILE = os.path.join(CHROMA_PATH, "active_index.json")
+
+
+@dataclass(frozen=True)
+class IndexSpec:
+    collection: str
+    embedding_model: str
+    chunk_size: int
+    chunk_overlap: int
+    chunking: str = "recursive"  # or "layout" (see chunking)
+    version: int = 0
+
+
+LEGACY = IndexSpec(
+    collection="langchain",
+    embedding_model="BAAI/bge-small-en-v1.5",
+    chunk_size=1000,
+    chunk_overlap=100,
+)
+
+_lock = threading.Lock()
+_cached = (None, None)  # (file signature, state)
+
+
+def load_state() -> dict:
+    """
+    {"active": {...}, "building": {... + "last_resource_id"} or None, "retired": [collection, ...]}
+    Re-read only when the file changes, so callers can ask on every request.
+    """
+    global _cached
+    try:
+        stat = os.stat(INDEX_FILE)
+        signature = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+    except FileNotFoundError:
+        return {"active": asdict(LEGACY), "building": None, "retired": []}
+
+    with _lock:
+        if _cached[0] != signature:
+            with open(INDEX_FILE) as f:
+                _cached = (signature, json.load(f))
+        return _cached[1]
+
+
+def save_state(state: dict):
+    # Write-then-rename, so readers see the old pointer or the new one, never half of either
+    os.makedirs(CHROMA_PATH, exist_ok=True)
+    tmp_path = f"{INDEX_FILE}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, INDEX_FILE)
+
+
+def _spec(entry: dict) -> IndexSpec:
+    # Fields added since an entry was written take their defaults
+    return IndexSpec(**{field: entry[field] for field in IndexSpec.__dataclass_fields__ if field in entry})
+
+
+def active() -> IndexSpec:
+    return _spec(load_state()["active"])
+
+
+def building() -> Optional[IndexSpec]:
+    entry = load_state()["building"]
+    return _spec(entry) if entry else None
@@ -0,0 +1,227 @@
+"""
+End-to-end in-process API benchmark.
+
+Builds a synthetic database (backend/populatedb.py) in a scratch directory,
+starts backend.main.app in-process with the fake LLM/embedder
+(AI_BACKEND=fake), and drives the important routes through TestClient.
+Per endpoint it reports p50/p95/p99 latency, throughput and SQL statements
+per request, and writes a JSON baseline that later runs can be compared
+against (for CI trending).
+
+Usage:
+    python benchmarks/api_benchmark.py --users 2000 --resources 20000 --ratings 100000 \
+        --output bench_baseline.json
+    python benchmarks/api_benchmark.py ... --compare bench_baseline.json --tolerance 0.25
+
+Requests are issued sequentially, so throughput is single-client
+requests/second; it is meant for regression tracking, not capacity planning.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except Exception:
+        return None
+
+
+def run(args):
+    # Everything the app writes (DB, uploads, chroma_db) lands in a scratch dir,
+    # and the app must be configured before it is imported.
+    workdir = tempfile.mkdtemp(prefix="unimind-bench-")
+    os.chdir(workdir)
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/bench.db"
+    os.environ["AI_BACKEND"] = "fake"
+    sys.path.insert(0, ROOT)
+
+    from sqlalchemy import event
+    from backend import populatedb
+    from backend.services import database, models
+
+    print(f"Building synthetic database in {workdir}...")
+    populatedb.populate(
+        users=args.users, resources=args.resources, ratings=args.ratings, comments=args.comments,
+        groups=args.groups, messages=args.messages, pdfs=1, pdf_pages=args.pdf_pages, seed=args.seed,
+    )
+
+    from fastapi.testclient import TestClient
+    from backend.main import app
+
+    statements = {"count": 0}
+    event.listen(database.engine, "before_cursor_execute",
+                 lambda *_: statements.__setitem__("count", statements["count"] + 1))
+
+    client = TestClient(app)
+    db = database.SessionLocal()
+    user = db.query(models.User).order_by(models.User.id).first()
+    group = db.query(models.StudyGroup).order_by(models.StudyGroup.id).first()
+    resource = db.query(models.Resource).filter(models.Resource.room_id.isnot(None)).first()
+    room_slug = resource.room.slug
+    fixture = db.query(models.Resource.file_path).filter(models.Resource.file_path.like("%.pdf")).first()[0]
+    db.close()
+
+    login = client.post("/auth/login", data={"username": user.email, "password": "password123"})
+    login.raise_for_status()
+    headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+    if group is not None:
+        client.post(f"/groups/{group.id}/join", headers=headers)
+
+    with open(fixture, "rb") as f:
+        pdf_bytes = f.read()
+
+    # A processed upload gives chat/quiz something in the vector store
+    upload = client.post("/student/upload", headers=headers,
+                         data={"title": "Bench notes", "room_slug": room_slug, "tags": "bench"},
+                         files={"file": ("bench.pdf", pdf_bytes, "application/pdf")})
+    upload.raise_for_status()
+    processed_id = upload.json()["resource_id"]
+
+    # An unchanged poll: the client already holds the current listing
+    listing_etag = client.get(f"/student/room/{room_slug}/resources", headers=headers).headers.get("etag", "")
+
+    heavy = max(3, args.requests // 10)
+    group_path = f"/groups/{group.id}" if group is not None else None
+    scenarios = [
+        ("login", heavy, lambda i: client.post(
+            "/auth/login", data={"username": user.email, "password": "password123"})),
+        ("room_listing", args.requests, lambda i: client.get(
+            f"/student/room/{room_slug}/resources", headers=headers)),
+        ("room_listing_304", args.requests, lambda i: client.get(
+            f"/student/room/{room_slug}/resources", headers={**headers, "If-None-Match": listing_etag})),
+        ("comments", args.requests, lambda i: client.get(f"/student/comments/{resource.id}")),
+        ("rate", args.requests, lambda i: client.post(
+            "/student/rate", headers=headers, json={"resource_id": resource.id, "stars": 1 + i % 5})),
+        ("group_list", args.requests, lambda i: client.get("/groups/all", headers=headers)),
+        ("stats_dashboard", args.requests, lambda i: client.get("/stats/dashboard", headers=headers)),
+        ("upload", heavy, lambda i: client.post(
+            "/student/upload", headers=headers,
+            data={"title": f"Bench upload {i}", "room_slug": room_slug, "tags": "bench"},
+            files={"file": ("bench.pdf", pdf_bytes, "application/pdf")})),
+        ("chat", heavy, lambda i: client.post(
+            "/student/chat", headers=headers,
+            json={"resource_id": processed_id, "question": "What is entropy?", "history": []})),
+        ("quiz", heavy, lambda i: client.post(f"/student/quiz/{processed_id}", headers=headers)),
+    ]
+    if group_path:
+        scenarios.insert(5, ("group_messages", args.requests, lambda i: client.get(f"{group_path}/messages")))
+
+    # The AI pipeline prints a lot; keep the report readable
+    devnull = open(os.devnull, "w")
+    results = {}
+    for name, iterations, call in scenarios:
+        real_stdout = sys.stdout
+        sys.stdout = devnull
+        try:
+            for i in range(min(3, iterations)):  # warm-up
+                call(i)
+
+            latencies, queries, errors = [], [], 0
+            started = time.perf_counter()
+            for i in range(iterations):
+                before = statements["count"]
+                t0 = time.perf_counter()
+                response = call(i)
+                latencies.append(time.perf_counter() - t0)
+                queries.append(statements["count"] - before)
+                if response.status_code >= 400:
+                    errors += 1
+            elapsed = time.perf_counter() - started
+        finally:
+            sys.stdout = real_stdout
+
+        results[name] = {
+            "requests": iterations,
+            "errors": errors,
+            "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+            "mean_ms": round(statistics.mean(latencies) * 1000, 2),
+            "throughput_rps": round(iterations / elapsed, 1),
+            "queries_per_request": round(statistics.mean(queries), 1),
+        }
+        print(f"  {name:<16} p50 {results[name]['p50_ms']:>8.1f} ms  p95 {results[name]['p95_ms']:>8.1f} ms  "
+              f"p99 {results[name]['p99_ms']:>8.1f} ms  {results[name]['throughput_rps']:>7.1f} req/s  "
+              f"{results[name]['queries_per_request']:>5.1f} SQL/req  {errors} err")
+
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "dataset": {
+                "users": args.users, "resources": args.resources, "ratings": args.ratings,
+                "comments": args.comments, "groups": args.groups, "messages": args.messages,
+                "seed": args.seed,
+            },
+        },
+        "endpoints": results,
+    }
+
+
+def compare(current, baseline_path, tolerance):
+    """Prints p95 / query-count deltas; returns the number of regressions."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)["endpoints"]
+
+    regressions = 0
+    print(f"\nAgainst {baseline_path} (tolerance {tolerance:.0%}):")
+    for name, now in current["endpoints"].items():
+        before = baseline.get(name)
+        if before is None:
+            print(f"  {name:<16} (new)")
+            continue
+        change = (now["p95_ms"] - before["p95_ms"]) / before["p95_ms"] if before["p95_ms"] else 0.0
+        more_queries = now["queries_per_request"] > before["queries_per_request"]
+        regressed = change > tolerance or more_queries
+        regressions += regressed
+        print(f"  {name:<16} p95 {before['p95_ms']:>8.1f} -> {now['p95_ms']:>8.1f} ms ({change:+.0%})  "
+              f"SQL/req {before['queries_per_request']} -> {now['queries_per_request']}"
+              f"{'   REGRESSION' if regressed else ''}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="In-process API benchmark")
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--resources", type=int, default=5000)
+    parser.add_argument("--ratings", type=int, default=20000)
+    parser.add_argument("--comments", type=int, default=5000)
+    parser.add_argument("--groups", type=int, default=200)
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--pdf-pages", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--requests", type=int, default=100, help="iterations per cheap endpoint")
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p95 slowdown before failing")
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output) if args.output else None
+    baseline = os.path.abspath(args.compare) if args.compare else None
+
+    report = run(args)
+    if output:
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote {output}")
+    if baseline:
+        sys.exit(1 if compare(report, baseline, args.tolerance) else 0)
@@ -0,0 +1,53 @@
+"""
+Logins/second against bcrypt cost on this machine.
+
+For each cost, measures one verify's latency and the sustained verify
+throughput with --threads workers (bcrypt releases the GIL, so this is what
+the passwords.py pool can do with PASSWORD_WORKERS=threads). Use it to pick
+BCRYPT_ROUNDS and PASSWORD_WORKERS for the hardware you deploy on.
+
+Usage:
+    python benchmarks/bcrypt_cost.py --rounds 10 11 12 13 --seconds 5
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from passlib.hash import bcrypt
+
+
+def verify_loop(hashed: str, deadline: float) -> int:
+    done = 0
+    while time.perf_counter() < deadline:
+        bcrypt.verify("correct horse battery staple", hashed)
+        done += 1
+    return done
+
+
+def measure(rounds: int, threads: int, seconds: float):
+    hashed = bcrypt.using(rounds=rounds).hash("correct horse battery staple")
+
+    started = time.perf_counter()
+    bcrypt.verify("correct horse battery staple", hashed)
+    single_ms = (time.perf_counter() - started) * 1000
+
+    deadline = time.perf_counter() + seconds
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        counts = list(pool.map(lambda _: verify_loop(hashed, deadline), range(threads)))
+
+    return single_ms, sum(counts) / seconds
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="bcrypt cost vs login throughput")
+    parser.add_argument("--rounds", type=int, nargs="+", default=[10, 11, 12, 13])
+    parser.add_argument("--threads", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--seconds", type=float, default=5)
+    args = parser.parse_args()
+
+    print(f"{args.threads} thread(s), {args.seconds:.0f}s per cost\n")
+    print(f"{'rounds':>6} {'verify ms':>10} {'logins/s':>10}")
+    for rounds in args.rounds:
+        single_ms, per_second = measure(rounds, args.threads, args.seconds)
+        print(f"{rounds:>6} {single_ms:>10.1f} {per_second:>10.1f}")
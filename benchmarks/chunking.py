@@ -0,0 +1,125 @@
+"""
+Recursive vs layout chunking: chunk count, index size and embedding time.
+
+Generates a fixture corpus of lecture notes, handouts and slide decks
+(backend/populatedb.py; every page has a course-code header and a page-number
+footer, like the real uploads), chunks it both ways with the same chunk size
+and overlap, embeds the chunks and writes them to a scratch Chroma database.
+Chroma allocates its files in blocks, so the on-disk size moves in steps;
+"payload" (vector bytes + chunk text) is the size that scales with the data.
+Use it to check a CHUNKING / CHUNK_SIZE change before running reindex.py.
+
+Usage:
+    python benchmarks/chunking.py --docs 30 --chunk-size 1000 --chunk-overlap 100
+    python benchmarks/chunking.py --docs 30 --embedder fake   # no model needed; embed times are then meaningless
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LAYOUTS = [("notes", 40), ("handout", 12), ("slides", 6)]  # (kind, lines per page)
+
+
+def dir_size(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(dirpath, name)) for dirpath, _, names in os.walk(path) for name in names)
+
+
+def build_corpus(workdir: str, docs: int, seed: int):
+    from backend import populatedb
+    from backend.services import ai_services
+
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(docs):
+        kind, lines = LAYOUTS[i % len(LAYOUTS)]
+        path = os.path.join(workdir, f"{kind}_{i}.pdf")
+        populatedb.write_fixture_pdf(path, f"Course {i}", rng.randint(6, 30), rng, lines_per_page=lines)
+        corpus.append(ai_services.load_pages(path))
+    return corpus
+
+
+def measure(corpus, spec, embedder, workdir: str) -> dict:
+    import chromadb
+    from backend.services import ai_services
+
+    chunks = []
+    for resource_id, pages in enumerate(corpus, start=1):
+        chunks.extend(ai_services.split_chunks(pages, resource_id, spec))
+    texts = [chunk.page_content for chunk in chunks]
+
+    started = time.perf_counter()
+    vectors = embedder.embed_documents(texts)
+    embed_seconds = time.perf_counter() - started
+
+    path = os.path.join(workdir, spec.collection)
+    collection = chromadb.PersistentClient(path=path).get_or_create_collection(spec.collection)
+    for start in range(0, len(chunks), 1000):
+        end = start + 1000
+        collection.add(
+            ids=[str(i) for i in range(start, min(end, len(chunks)))],
+            embeddings=vectors[start:end],
+            documents=texts[start:end],
+            metadatas=[chunk.metadata for chunk in chunks[start:end]],
+        )
+
+    return {
+        "chunks": len(chunks),
+        "chars": sum(len(text) for text in texts),
+        "payload_bytes": sum(len(v) * 4 for v in vectors) + sum(len(text.encode()) for text in texts),
+        "index_bytes": dir_size(path),
+        "embed_seconds": embed_seconds,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare recursive and layout chunking on fixture PDFs")
+    parser.add_argument("--docs", type=int, default=30)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=100)
+    parser.add_argument("--embedder", choices=["fastembed", "fake"], default="fastembed")
+    parser.add_argument("--model", default="BAAI/bge-small-en-v1.5")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="chunking_bench_")
+    os.chdir(workdir)
+    os.environ["AI_BACKEND"] = "fake"  # the LLM isn't used; the embedder is picked below
+    os.environ["PAGE_TEXT_DIR"] = os.path.join(workdir, "page_text")
+    sys.path.insert(0, ROOT)
+
+    from backend.services.vector_index import IndexSpec
+
+    if args.embedder == "fastembed":
+        from langchain_community.embeddings.fastembed import FastEmbedEmbeddings
+        embedder = FastEmbedEmbeddings(model_name=args.model)
+    else:
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+        embedder = DeterministicFakeEmbedding(size=384)
+
+    corpus = build_corpus(workdir, args.docs, args.seed)
+    print(f"{len(corpus)} PDFs, {sum(len(pages) for pages in corpus)} pages "
+          f"({', '.join(kind for kind, _ in LAYOUTS)}), chunk_size={args.chunk_size}, "
+          f"chunk_overlap={args.chunk_overlap}, embedder={args.embedder}\n")
+
+    results = {}
+    for chunking in ("recursive", "layout"):
+        spec = IndexSpec(
+            collection=f"bench_{chunking}", embedding_model=args.model,
+            chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap, chunking=chunking,
+        )
+        results[chunking] = measure(corpus, spec, embedder, workdir)
+
+    print(f"{'chunking':>10} {'chunks':>8} {'chars':>10} {'payload KB':>11} {'on-disk KB':>11} {'embed s':>9}")
+    for chunking, r in results.items():
+        print(f"{chunking:>10} {r['chunks']:>8} {r['chars']:>10} {r['payload_bytes'] / 1024:>11.0f} "
+              f"{r['index_bytes'] / 1024:>11.0f} {r['embed_seconds']:>9.2f}")
+    before, after = results["recursive"], results["layout"]
+    change = {key: (after[key] - before[key]) / before[key] * 100 if before[key] else 0.0 for key in before}
+    print(f"{'change':>10} {change['chunks']:>+7.1f}% {change['chars']:>+9.1f}% {change['payload_bytes']:>+10.1f}% "
+          f"{change['index_bytes']:>+10.1f}% {change['embed_seconds']:>+8.1f}%")
+    print(f"\nScratch files: {workdir}")
@@ -0,0 +1,112 @@
+"""
+WebSocket fan-out load test for group chat.
+
+Connects N clients to one study group over /groups/{id}/ws, has one of them
+send messages, and measures how long each message takes to reach every
+other socket.
+
+Usage (against a running server):
+    fastapi run backend/main.py   # or: uvicorn backend.main:app
+    python benchmarks/ws_fanout.py --clients 500 --messages 20
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import uuid
+
+import httpx
+import websockets
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def login(http: httpx.AsyncClient) -> str:
+    # Throwaway account + group so repeated runs don't collide
+    email = f"ws-bench-{uuid.uuid4().hex[:8]}@example.com"
+    await http.post("/auth/register", json={
+        "email": email, "password": "bench", "full_name": "WS Bench", "role": "student"
+    })
+    res = await http.post("/auth/login", data={"username": email, "password": "bench"})
+    res.raise_for_status()
+    return res.json()["access_token"]
+
+
+async def receiver(ws, expected: int, arrivals: dict, ready: asyncio.Event):
+    ready.set()
+    seen = 0
+    while seen < expected:
+        message = json.loads(await ws.recv())
+        arrivals.setdefault(message["content"], []).append(time.perf_counter())
+        seen += 1
+
+
+async def run(base_url: str, clients: int, messages: int, interval: float):
+    async with httpx.AsyncClient(base_url=base_url, timeout=30) as http:
+        token = await login(http)
+        headers = {"Authorization": f"Bearer {token}"}
+        res = await http.post("/groups/create", headers=headers, json={
+            "name": f"ws-bench-{uuid.uuid4().hex[:8]}", "description": "fan-out benchmark"
+        })
+        res.raise_for_status()
+        group_id = res.json()["id"]
+
+    ws_url = base_url.replace("http", "ws", 1) + f"/groups/{group_id}/ws?token={token}"
+
+    print(f"Connecting {clients} clients to group {group_id}...")
+    started = time.perf_counter()
+    sockets = []
+    for batch_start in range(0, clients, 50):
+        batch = min(50, clients - batch_start)
+        sockets += await asyncio.gather(*(websockets.connect(ws_url, max_queue=None) for _ in range(batch)))
+    print(f"Connected in {time.perf_counter() - started:.2f}s")
+
+    arrivals: dict = {}
+    ready_events = [asyncio.Event() for _ in sockets]
+    tasks = [
+        asyncio.create_task(receiver(ws, messages, arrivals, ready))
+        for ws, ready in zip(sockets, ready_events)
+    ]
+    await asyncio.gather(*(event.wait() for event in ready_events))
+
+    sent_at = {}
+    sender = sockets[0]
+    for i in range(messages):
+        content = f"bench-{i}"
+        sent_at[content] = time.perf_counter()
+        await sender.send(json.dumps({"content": content}))
+        await asyncio.sleep(interval)
+
+    await asyncio.wait_for(asyncio.gather(*tasks), timeout=60)
+
+    latencies = []   # every delivery
+    fanout = []      # time until the LAST socket had the message
+    for content, sent in sent_at.items():
+        times = [t - sent for t in arrivals.get(content, [])]
+        latencies += times
+        fanout.append(max(times))
+
+    for ws in sockets:
+        await ws.close()
+
+    ms = lambda seconds: f"{seconds * 1000:.1f} ms"
+    print(f"\n{clients} clients x {messages} messages = {len(latencies)} deliveries")
+    print(f"delivery latency  p50 {ms(percentile(latencies, 50))}  p95 {ms(percentile(latencies, 95))}"
+          f"  p99 {ms(percentile(latencies, 99))}  max {ms(max(latencies))}")
+    print(f"full fan-out      p50 {ms(percentile(fanout, 50))}  p95 {ms(percentile(fanout, 95))}"
+          f"  mean {ms(statistics.mean(fanout))}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Group chat WebSocket fan-out load test")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--messages", type=int, default=20)
+    parser.add_argument("--interval", type=float, default=0.05, help="seconds between sends")
+    args = parser.parse_args()
+    asyncio.run(run(args.url, args.clients, args.messages, args.interval))
@@ -0,0 +1,32 @@
+import argparse
+import asyncio
+import os
+from dotenv import load_dotenv
+from backend.services import embed_service
+
+# Shared embedding server: one FastEmbed model for every uvicorn worker on
+# this machine, with micro-batching across their requests.
+#
+#   python embed_server.py --socket /run/unimind/embed.sock --preload BAAI/bge-small-en-v1.5
+#   EMBED_SOCKET=/run/unimind/embed.sock uvicorn backend.main:app --workers 8
+#
+# Workers started without EMBED_SOCKET load their own model as before.
+
+if __name__ == "__main__":
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Serve embeddings to the app workers over a Unix socket")
+    parser.add_argument("--socket", default=os.getenv("EMBED_SOCKET", "embed.sock"))
+    parser.add_argument("--max-batch", type=int, default=embed_service.EMBED_MAX_BATCH,
+                        help="most texts per model call")
+    parser.add_argument("--max-wait-ms", type=float, default=embed_service.EMBED_MAX_WAIT_MS,
+                        help="how long a batch waits for more requests")
+    parser.add_argument("--preload", action="append", default=[], metavar="MODEL",
+                        help="load a model before accepting connections (repeatable)")
+    parser.add_argument("--report-every", type=float, default=60.0, help="seconds between batching stats (0: never)")
+    args = parser.parse_args()
+
+    server = embed_service.EmbedServer(args.socket, max_batch=args.max_batch, max_wait_ms=args.max_wait_ms)
+    try:
+        asyncio.run(server.serve(preload=args.preload, report_every=args.report_every))
+    except KeyboardInterrupt:
+        print("Embedding server stopped.")
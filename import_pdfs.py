@@ -0,0 +1,260 @@
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from backend.services.database import engine, SessionLocal
+from backend.services.migrations import run_migrations
+from backend.services import ai_services, counters, ingestion, models, storage, vector_index
+
+# Offline bulk import of PDFs already on disk (e.g. past-year papers for a new
+# deployment), without going through HTTP.
+#
+#   python import_pdfs.py /srv/archive --uploader admin@uni.edu --workers 8
+#
+# The first folder level under the root picks the room: a folder named after a
+# room's slug or name ("cs", "Computer Science"), or anything mapped with
+# --map "CS Papers=cs". Deeper folders become tags (cs/2021/midterm/x.pdf is
+# tagged "2021, midterm"). Worker processes copy, hash, parse, summarize and
+# chunk each file; this process writes the rows and the vectors in batches.
+#
+# Every finished file is appended to the checkpoint file, so re-running the
+# same command after a crash carries on where it stopped. Files whose content
+# is already in the database (by sha256) are skipped as duplicates.
+
+CHECKPOINT_FILE = "import_checkpoint.jsonl"
+REPORT_EVERY_SECONDS = 10
+
+
+def find_pdfs(root: str, room_for_folder: dict, default_room: str = None):
+    """[(absolute path, room slug, tags)] in a stable order, plus the folders nobody mapped."""
+    found, unmapped = [], set()
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        parts = os.path.relpath(dirpath, root).split(os.sep)
+        parts = [] if parts == ["."] else parts
+        slug = room_for_folder.get(parts[0].lower()) if parts else default_room
+        for name in sorted(filenames):
+            if not name.lower().endswith(".pdf"):
+                continue
+            if slug is None:
+                unmapped.add(parts[0] if parts else ".")
+                continue
+            found.append((os.path.abspath(os.path.join(dirpath, name)), slug, ", ".join(parts[1:])))
+    return found, sorted(unmapped)
+
+
+def load_checkpoint(path: str, retry_failed: bool) -> set:
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path) as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # torn last line from a crash
+            if entry["status"] != "failed" or not retry_failed:
+                done.add(entry["path"])
+    return done
+
+
+# --- Worker side (runs in the pool) ---
+
+_known_hashes = frozenset()
+_spec = None
+
+
+def _init_worker(known_hashes, spec):
+    global _known_hashes, _spec
+    _known_hashes = known_hashes
+    _spec = spec  # the parent indexes with this same spec
+    engine.dispose(close=False)  # don't share the parent's DB connections
+
+
+def _prepare(item):
+    path, slug, tags = item
+    try:
+        stored = storage.copy_local_file(path, os.path.basename(path))
+        if stored.sha256 in _known_hashes:
+            return {"path": path, "status": "duplicate", "sha256": stored.sha256}
+
+        docs = ai_services.load_pages(stored.path, stored.sha256)
+        # resource_id is unknown until the parent inserts the row; it fills it in
+        chunks = ai_services.split_chunks(docs, None, _spec)
+        return {
+            "path": path, "status": "ready", "slug": slug, "tags": tags, "stored": stored,
+            "summary": ai_services.summarize(docs), "chunks": chunks, "pages": len(docs),
+        }
+    except Exception as e:
+        return {"path": path, "status": "failed", "error": str(e)}
+
+
+# --- Parent side ---
+
+class Importer:
+    def __init__(self, db, uploader, room_ids, checkpoint):
+        self.db = db
+        # One spec for the whole run, so chunks are never indexed into a collection
+        # built with other settings (reindex.py may switch the live one meanwhile)
+        self.spec = vector_index.active()
+        self.uploader = uploader
+        self.room_ids = room_ids
+        self.checkpoint = checkpoint
+        self.known = set(h for (h,) in db.query(models.Resource.sha256).filter(models.Resource.sha256.isnot(None)))
+        self.pending = []  # ready results waiting for the next flush
+        self.pending_chunks = 0
+        self.stats = {"imported": 0, "duplicate": 0, "failed": 0, "pages": 0, "chunks": 0, "bytes": 0}
+
+    def handle(self, result):
+        if result["status"] == "ready" and result["stored"].sha256 in self.known:
+            result = {"path": result["path"], "status": "duplicate", "sha256": result["stored"].sha256}
+
+        if result["status"] != "ready":
+            if result["status"] == "failed":
+                print(f"  ❌ {result['path']}: {result['error']}")
+            self.stats[result["status"]] += 1
+            self._checkpoint([result])
+            return
+
+        self.known.add(result["stored"].sha256)  # same file twice in one run
+        self.pending.append(result)
+        self.pending_chunks += len(result["chunks"])
+        if self.pending_chunks >= ingestion.EMBED_BATCH_CHUNKS:
+            self.flush()
+
+    def flush(self):
+        """Rows, then vectors, then commit, then checkpoint: a crash anywhere redoes the whole flush."""
+        if not self.pending:
+            return
+        resources = []
+        for result in self.pending:
+            stem = os.path.splitext(os.path.basename(result["path"]))[0]
+            resource = models.Resource(
+                title=stem.replace("_", " ").strip() or "Untitled",
+                file_path=result["stored"].path,
+                sha256=result["stored"].sha256,
+                tags=result["tags"],
+                uploader_id=self.uploader.id,
+                room_id=self.room_ids[result["slug"]],
+                ai_summary=result["summary"],
+            )
+            self.db.add(resource)
+            resources.append(resource)
+        self.db.flush()
+
+        ids = [r.id for r in resources]  # before commit() expires them
+        chunks = []
+        for resource, result in zip(resources, self.pending):
+            counters.add_resource(self.db, resource)
+            for chunk in result["chunks"]:
+                chunk.metadata["resource_id"] = resource.id
+            chunks.extend(result["chunks"])
+
+        try:
+            # index_chunks replaces any vectors under these ids, so ids a crashed
+            # run never committed can be reused safely
+            ai_services.index_chunks(chunks, self.spec)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+
+        for result in self.pending:
+            self.stats["imported"] += 1
+            self.stats["pages"] += result["pages"]
+            self.stats["chunks"] += len(result["chunks"])
+            self.stats["bytes"] += result["stored"].size
+        self._checkpoint([
+            {"path": result["path"], "status": "imported", "sha256": result["stored"].sha256, "resource_id": id}
+            for id, result in zip(ids, self.pending)
+        ])
+        self.pending, self.pending_chunks = [], 0
+
+    def _checkpoint(self, entries):
+        with open(self.checkpoint, "a") as f:
+            for entry in entries:
+                f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def report(self, started, total):
+        elapsed = max(time.perf_counter() - started, 1e-9)
+        s = self.stats
+        done = s["imported"] + s["duplicate"] + s["failed"]
+        print(f"  {done}/{total} files  imported {s['imported']}  duplicate {s['duplicate']}  failed {s['failed']}  "
+              f"{s['pages'] / elapsed:.1f} pages/s  {s['chunks'] / elapsed:.1f} chunks/s  "
+              f"{s['bytes'] / elapsed / (1024 * 1024):.1f} MB/s")
+
+
+def import_directory(root, uploader_email, mappings=None, default_room=None, workers=None,
+                     checkpoint=CHECKPOINT_FILE, retry_failed=False):
+    run_migrations(engine)
+    db = SessionLocal()
+    try:
+        uploader = db.query(models.User).filter(models.User.email == uploader_email).first()
+        if not uploader:
+            raise SystemExit(f"No user with email {uploader_email}")
+
+        rooms = db.query(models.Room).all()
+        room_ids = {room.slug: room.id for room in rooms}
+        room_for_folder = {}
+        for room in rooms:
+            room_for_folder[room.slug.lower()] = room.slug
+            room_for_folder[room.name.lower()] = room.slug
+        for folder, slug in (mappings or {}).items():
+            if slug not in room_ids:
+                raise SystemExit(f"--map {folder}={slug}: no room with slug {slug}")
+            room_for_folder[folder.lower()] = slug
+        if default_room is not None and default_room not in room_ids:
+            raise SystemExit(f"--default-room: no room with slug {default_room}")
+
+        files, unmapped = find_pdfs(root, room_for_folder, default_room)
+        for folder in unmapped:
+            hint = "--default-room <slug>" if folder == "." else f'--map "{folder}=<slug>"'
+            print(f"⚠️  Skipping PDFs with no room in: {folder} (use {hint})")
+
+        done = load_checkpoint(checkpoint, retry_failed)
+        todo = [item for item in files if item[0] not in done]
+        print(f"📚 {len(files)} PDF(s) found, {len(files) - len(todo)} already in {checkpoint}, {len(todo)} to import.")
+        if not todo:
+            return
+
+        importer = Importer(db, uploader, room_ids, checkpoint)
+        started = last_report = time.perf_counter()
+        with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(frozenset(importer.known), importer.spec)) as pool:
+            for result in pool.imap_unordered(_prepare, todo):
+                importer.handle(result)
+                if time.perf_counter() - last_report >= REPORT_EVERY_SECONDS:
+                    importer.report(started, len(todo))
+                    last_report = time.perf_counter()
+        importer.flush()
+        importer.report(started, len(todo))
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import a directory tree of PDFs into the study rooms")
+    parser.add_argument("root", help="directory whose first-level folders are rooms")
+    parser.add_argument("--uploader", required=True, help="email of the user the resources are credited to")
+    parser.add_argument("--map", action="append", default=[], metavar="FOLDER=SLUG",
+                        help="map a first-level folder to a room slug (repeatable)")
+    parser.add_argument("--default-room", help="room slug for PDFs directly under root")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--checkpoint", default=CHECKPOINT_FILE)
+    parser.add_argument("--retry-failed", action="store_true", help="retry files the checkpoint records as failed")
+    args = parser.parse_args()
+
+    mappings = {}
+    for entry in args.map:
+        folder, sep, slug = entry.partition("=")
+        if not sep:
+            parser.error(f"--map expects FOLDER=SLUG, got {entry!r}")
+        mappings[folder.strip()] = slug.strip()
+
+    import_directory(
+        args.root, args.uploader, mappings=mappings, default_room=args.default_room, workers=args.workers,
+        checkpoint=args.checkpoint, retry_failed=args.retry_failed,
+    )
+    print("Import complete.")
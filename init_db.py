@@ -1,9 +1,10 @@
 from backend.services.database import engine, SessionLocal, get_db
 from backend.services.models import Base, Room
+from backend.services.migrations import run_migrations
 
-# Create tables
+# Create tables / apply pending schema migrations
 print("Creating database tables...")
-Base.metadata.create_all(bind=engine)
+run_migrations(engine)
 
 def seed_rooms():
     db = SessionLocal()
@@ -0,0 +1,169 @@
+import argparse
+import os
+import time
+from dataclasses import asdict
+from langchain_chroma import Chroma
+from sqlalchemy import func
+from backend.services.database import engine, SessionLocal
+from backend.services.migrations import run_migrations
+from backend.services import ai_services, models, vector_index
+from backend.services.vector_index import CHROMA_PATH, IndexSpec
+
+# Zero-downtime re-index (blue/green) after changing CHUNK_SIZE, CHUNK_OVERLAP,
+# CHUNKING or EMBEDDING_MODEL (see ai_services).
+#
+#   CHUNK_SIZE=800 python reindex.py --batch-size 20 --pause 0.5
+#
+# 1. Builds a new collection (resources_v<N>) from the stored PDFs, oldest
+#    resource first, while chat and quiz keep using the live one. Progress is
+#    recorded after every batch, so an interrupted build resumes when the same
+#    command is run again.
+# 2. Swaps the live pointer (chroma_db/active_index.json) in one rename.
+# 3. Catches up on resources uploaded to the old collection during the build.
+# 4. After --grace seconds (requests already holding the old collection
+#    finish), drops the old collection unless --keep-old.
+
+
+def plan(settings: dict, force: bool):
+    """The spec to build and the resource id it has got up to (resuming a matching build)."""
+    state = vector_index.load_state()
+    building = vector_index.building()
+    if building and all(getattr(building, key) == value for key, value in settings.items()):
+        last_id = state["building"]["last_resource_id"]
+        print(f"↩️  Resuming {building.collection} after resource {last_id}.")
+        return building, last_id
+
+    active = vector_index.active()
+    if not force and all(getattr(active, key) == value for key, value in settings.items()):
+        return None, 0
+
+    if building:
+        print(f"🗑️  Dropping abandoned build {building.collection} (different settings).")
+        drop_collection(building.collection)
+
+    version = max(active.version, building.version if building else 0) + 1
+    spec = IndexSpec(collection=f"resources_v{version}", version=version, **settings)
+    vector_index.save_state({**state, "building": {**asdict(spec), "last_resource_id": 0}})
+    return spec, 0
+
+
+def build(spec: IndexSpec, last_id: int, batch_size: int, pause: float, label: str) -> int:
+    """Indexes every resource after last_id into spec's collection. Returns the last id done."""
+    with SessionLocal() as db:
+        total = db.query(func.count(models.Resource.id)).filter(models.Resource.id > last_id).scalar()
+    print(f"📚 {label}: {total} resource(s) into {spec.collection} "
+          f"(chunk_size={spec.chunk_size}, chunk_overlap={spec.chunk_overlap}, chunking={spec.chunking}, "
+          f"model={spec.embedding_model})")
+
+    done = chunk_count = 0
+    started = time.perf_counter()
+    while True:
+        # A fresh session per batch, so uploads that land mid-build are seen
+        with SessionLocal() as db:
+            rows = (
+                db.query(models.Resource.id, models.Resource.file_path, models.Resource.sha256)
+                .filter(models.Resource.id > last_id)
+                .order_by(models.Resource.id)
+                .limit(batch_size)
+                .all()
+            )
+        if not rows:
+            return last_id
+
+        chunks = []
+        for resource_id, file_path, sha256 in rows:
+            try:
+                # Page text comes from the sidecars, so no PDF is parsed again
+                docs = ai_services.load_pages(file_path, sha256)
+                chunks.extend(ai_services.split_chunks(docs, resource_id, spec))
+            except Exception as e:
+                print(f"  ⚠️  Skipping resource {resource_id} ({file_path}): {e}")
+        ai_services.index_chunks(chunks, spec)
+
+        # A resource deleted after this batch was read had its chunks deleted
+        # before they were written here; drop them again
+        ids = [resource_id for resource_id, _, _ in rows]
+        with SessionLocal() as db:
+            alive = {i for (i,) in db.query(models.Resource.id).filter(models.Resource.id.in_(ids))}
+        ai_services.delete_chunks([i for i in ids if i not in alive], spec)
+
+        last_id = rows[-1][0]
+        state = vector_index.load_state()
+        if state["building"]:
+            vector_index.save_state({**state, "building": {**state["building"], "last_resource_id": last_id}})
+
+        done += len(rows)
+        chunk_count += len(chunks)
+        elapsed = max(time.perf_counter() - started, 1e-9)
+        rate = done / elapsed
+        eta = max(total - done, 0) / rate
+        print(f"  {done}/{total} resources  {rate:.1f} res/s  {chunk_count / elapsed:.1f} chunks/s  ETA {eta:.0f}s")
+        if pause:
+            time.sleep(pause)
+
+
+def switch(spec: IndexSpec):
+    state = vector_index.load_state()
+    retired = state["retired"] + [state["active"]["collection"]]
+    vector_index.save_state({"active": asdict(spec), "building": None, "retired": retired})
+    print(f"🔀 {spec.collection} is live.")
+
+
+def drop_collection(name: str):
+    Chroma(collection_name=name, persist_directory=CHROMA_PATH).delete_collection()
+
+
+def collect_garbage():
+    state = vector_index.load_state()
+    for name in state["retired"]:
+        print(f"🗑️  Dropping {name}.")
+        drop_collection(name)
+    vector_index.save_state({**state, "retired": []})
+
+
+def reindex(chunk_size, chunk_overlap, embedding_model, chunking="layout", batch_size=20, pause=0.0, grace=60.0,
+            keep_old=False, force=False):
+    run_migrations(engine)
+    settings = {
+        "embedding_model": embedding_model, "chunk_size": chunk_size, "chunk_overlap": chunk_overlap,
+        "chunking": chunking,
+    }
+
+    spec, last_id = plan(settings, force)
+    if spec is None:
+        print("The live index already uses these settings (use --force to rebuild anyway).")
+        return
+
+    last_id = build(spec, last_id, batch_size, pause, "Building")
+    switch(spec)
+    build(spec, last_id, batch_size, pause, "Catching up")
+
+    if keep_old:
+        print("Keeping the old collection; the next re-index drops it.")
+        return
+    print(f"⏳ Waiting {grace:.0f}s for requests on the old collection to finish...")
+    time.sleep(grace)
+    collect_garbage()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the vector index without downtime")
+    parser.add_argument("--chunk-size", type=int, default=ai_services.CHUNK_SIZE)
+    parser.add_argument("--chunk-overlap", type=int, default=ai_services.CHUNK_OVERLAP)
+    parser.add_argument("--embedding-model", default=ai_services.EMBEDDING_MODEL)
+    parser.add_argument("--chunking", choices=["layout", "recursive"], default=ai_services.CHUNKING)
+    parser.add_argument("--batch-size", type=int, default=20, help="resources per vector store write")
+    parser.add_argument("--pause", type=float, default=0.0, help="seconds to sleep between batches (throttling)")
+    parser.add_argument("--nice", type=int, default=10, help="CPU niceness, so live traffic wins")
+    parser.add_argument("--grace", type=float, default=60.0, help="seconds before dropping the old collection")
+    parser.add_argument("--keep-old", action="store_true")
+    parser.add_argument("--force", action="store_true", help="rebuild even if the settings are unchanged")
+    args = parser.parse_args()
+
+    if args.nice:
+        os.nice(args.nice)
+    reindex(
+        args.chunk_size, args.chunk_overlap, args.embedding_model, chunking=args.chunking, batch_size=args.batch_size,
+        pause=args.pause, grace=args.grace, keep_old=args.keep_old, force=args.force,
+    )
+    print("Re-index complete.")
@@ -0,0 +1,45 @@
+from backend.services.database import engine, SessionLocal
+from backend.services.migrations import run_migrations
+from backend.services import counters, dashboard
+
+# Backfill / repair for the denormalized counters stored on our tables.
+# Safe to run any time: it recomputes everything from the source rows.
+
+def repair():
+    run_migrations(engine)
+    db = SessionLocal()
+    try:
+        print("Recomputing resource rating aggregates...")
+        fixed = counters.repair_rating_aggregates(db)
+        print(f"Fixed {fixed} resource(s).")
+
+        print("Recomputing user karma...")
+        fixed = counters.repair_karma(db)
+        print(f"Fixed {fixed} user(s).")
+
+        print("Recomputing resource comment counts...")
+        fixed = counters.repair_comment_counts(db)
+        print(f"Fixed {fixed} resource(s).")
+
+        print("Recomputing study group member counts...")
+        fixed = counters.repair_member_counts(db)
+        print(f"Fixed {fixed} group(s).")
+
+        print("Recomputing tag counts...")
+        pairs = counters.repair_tag_counts(db)
+        print(f"Wrote {pairs} room/tag count(s).")
+
+        print("Rebuilding daily upload rollups...")
+        days = counters.repair_daily_stats(db)
+        print(f"Wrote {days} day(s).")
+
+        print("Recounting dashboard totals...")
+        fixed = dashboard.recount_totals(db)
+        db.commit()
+        print(f"Fixed {fixed} total(s).")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    repair()
+    print("Counter repair complete.")
@@ -0,0 +1,59 @@
+"""
+The app under test, shared by every test module.
+
+backend.services.database builds its engine from DATABASE_URL at import
+time, so the scratch database and working directory are set up once per
+session, before anything imports the app. Modules seed their own users and
+rows and must not assume ids.
+"""
+import os
+import sys
+
+import pytest
+
+# Add Project Root to System Path
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+PDF = b"%PDF-1.4\n1 0 obj<<>>endobj\ntrailer<<>>\n%%EOF"
+
+
+@pytest.fixture(scope="session")
+def client(tmp_path_factory):
+    workdir = tmp_path_factory.mktemp("app")
+    with pytest.MonkeyPatch.context() as mp:
+        mp.chdir(workdir)
+        mp.setenv("DATABASE_URL", f"sqlite:///{workdir}/test.db")
+        mp.setenv("AI_BACKEND", "fake")
+        mp.setenv("BCRYPT_ROUNDS", "4")
+
+        from fastapi.testclient import TestClient
+        from backend.main import app
+
+        with TestClient(app) as test_client:
+            yield test_client
+
+
+@pytest.fixture
+def db(client):
+    from backend.services import database
+
+    session = database.SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def login(client, email: str, role: str = "student") -> dict:
+    client.post("/auth/register", json={"email": email, "password": "pw", "full_name": email, "role": role})
+    token = client.post("/auth/login", data={"username": email, "password": "pw"}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def upload(client, headers: dict, title: str, room_slug: str = "cs", tags: str = "notes",
+           content: bytes = PDF) -> int:
+    response = client.post("/student/upload", headers=headers, data={"title": title, "room_slug": room_slug, "tags": tags},
+                           files={"file": (f"{title}.pdf", content, "application/pdf")})
+    assert response.status_code == 200, response.text
+    return response.json()["resource_id"]
@@ -0,0 +1,70 @@
+"""
+Group chat fan-out: every subscriber of a group gets its messages, and a
+subscriber that stops reading is cut off instead of buffering without bound.
+
+Usage:
+    python -m pytest tests/test_chat_broker.py
+"""
+import asyncio
+import threading
+
+from backend.services.chat_broker import SUBSCRIBER_QUEUE_SIZE, InProcessBroker, Subscription
+
+
+async def _drain(subscription: Subscription) -> list:
+    await asyncio.sleep(0)  # let call_soon_threadsafe deliveries run
+    received = []
+    while not subscription.queue.empty():
+        received.append(await subscription.get())
+    return received
+
+
+def test_publish_reaches_only_the_group():
+    async def scenario():
+        broker = InProcessBroker()
+        first, second, elsewhere = broker.subscribe(1), broker.subscribe(1), broker.subscribe(2)
+        assert broker.subscriber_count(1) == 2
+
+        broker.publish(1, {"id": 1})
+        # publish() is also called from the threadpool (sync routes)
+        thread = threading.Thread(target=broker.publish, args=(1, {"id": 2}))
+        thread.start()
+        thread.join()
+
+        assert await _drain(first) == [{"id": 1}, {"id": 2}]
+        assert await _drain(second) == [{"id": 1}, {"id": 2}]
+        assert await _drain(elsewhere) == []
+
+        broker.unsubscribe(first)
+        broker.publish(1, {"id": 3})
+        assert await _drain(first) == []
+        assert broker.subscriber_count(1) == 1
+
+        broker.unsubscribe(second)
+        broker.unsubscribe(second)  # twice is harmless
+        assert broker.subscriber_count(1) == 0
+
+    asyncio.run(scenario())
+
+
+def test_slow_consumer_is_cut_off():
+    async def scenario():
+        broker = InProcessBroker()
+        slow, fast = broker.subscribe(1), broker.subscribe(1)
+
+        # One message more than the slow socket's queue holds; the fast one keeps up
+        for i in range(SUBSCRIBER_QUEUE_SIZE + 1):
+            broker.publish(1, {"id": i})
+            assert await _drain(fast) == [{"id": i}]
+
+        # Its backlog is dropped and replaced by the end-of-stream marker...
+        assert slow.overflowed
+        assert await slow.get() is None
+        assert slow.queue.empty()
+
+        # ...and nothing more is queued for it; the others are unaffected
+        broker.publish(1, {"id": "next"})
+        assert await _drain(slow) == []
+        assert await _drain(fast) == [{"id": "next"}]
+
+    asyncio.run(scenario())
@@ -0,0 +1,58 @@
+"""
+Header/footer removal in chunking.strip_repeated_lines().
+
+Usage:
+    python -m pytest tests/test_chunking.py
+"""
+from langchain_core.documents import Document
+
+from backend.services.chunking import strip_repeated_lines
+
+
+def _pages(bodies, header="CS101 Data Structures", footer="Page {n} of {total}"):
+    total = len(bodies)
+    return [
+        Document(page_content=f"{header}\n{body}\n{footer.format(n=n, total=total)}", metadata={"page": n - 1})
+        for n, body in enumerate(bodies, start=1)
+    ]
+
+
+def test_strips_repeated_header_and_numbered_footer():
+    docs = _pages(["Stacks and queues", "Linked lists", "Binary trees", "Hash tables"])
+    cleaned = strip_repeated_lines(docs)
+
+    assert [doc.page_content for doc in cleaned] == ["Stacks and queues", "Linked lists", "Binary trees", "Hash tables"]
+    assert [doc.metadata for doc in cleaned] == [doc.metadata for doc in docs]
+    # The input pages are left as they were
+    assert docs[0].page_content.startswith("CS101")
+
+
+def test_keeps_repeated_lines_in_the_body():
+    body = "intro\nDefinition\nTheorem\nProof\nmore\nand more\nend"
+    docs = _pages([body.replace("intro", f"intro {i}") for i in range(4)])
+    cleaned = strip_repeated_lines(docs, edge_lines=1)
+
+    # "Definition" etc. repeat on every page but sit outside the edge lines
+    assert all("Definition\nTheorem\nProof" in doc.page_content for doc in cleaned)
+    assert not any("CS101" in doc.page_content or "Page" in doc.page_content for doc in cleaned)
+
+
+def test_lines_on_too_few_pages_are_kept():
+    docs = _pages(["a", "b", "c", "d", "e", "f"])
+    docs[0].page_content = "Chapter 1\n" + docs[0].page_content
+    docs[1].page_content = "Chapter 1\n" + docs[1].page_content
+    cleaned = strip_repeated_lines(docs)
+
+    # 2 of 6 pages is below min_share
+    assert cleaned[0].page_content == "Chapter 1\na"
+    assert cleaned[2].page_content == "c"
+
+
+def test_short_documents_are_returned_unchanged():
+    docs = _pages(["only", "two"])
+    assert strip_repeated_lines(docs) is docs
+
+
+def test_documents_without_repeats_are_returned_unchanged():
+    docs = [Document(page_content=f"page {word}", metadata={}) for word in ("one", "two", "three")]
+    assert strip_repeated_lines(docs) is docs
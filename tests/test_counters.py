@@ -0,0 +1,99 @@
+"""
+Stored counters against the rows they summarize.
+
+Ratings, comments and admin removals each move a handful of denormalized
+counters (resource rating sum/count and comment count, uploader karma
+overall and per room, tag counts overall and per room). After every step
+each counter is recomputed from the source tables and compared.
+
+Usage:
+    python -m pytest tests/test_counters.py
+"""
+import pytest
+from sqlalchemy import func, select
+
+from conftest import login, upload
+
+TAG = "counters-tag"
+
+
+@pytest.fixture(scope="module")
+def people(client):
+    return {
+        "alice": login(client, "counters-alice@example.com"),
+        "bob": login(client, "counters-bob@example.com"),
+        "carol": login(client, "counters-carol@example.com"),
+        "admin": login(client, "counters-admin@example.com", role="admin"),
+    }
+
+
+def _assert_consistent(db, user_id: int):
+    from backend.services import models
+
+    db.expire_all()
+    for resource in db.query(models.Resource).filter(models.Resource.uploader_id == user_id):
+        stars = db.query(func.coalesce(func.sum(models.Rating.stars), 0), func.count(models.Rating.stars))\
+            .filter(models.Rating.resource_id == resource.id, models.Rating.stars > 0).one()
+        assert (resource.rating_sum, resource.rating_count) == tuple(stars), resource.title
+        comments = db.query(func.count()).filter(models.Comment.resource_id == resource.id).scalar()
+        assert resource.comment_count == comments, resource.title
+
+    karma = db.query(func.coalesce(func.sum(models.Resource.rating_sum), 0))\
+        .filter(models.Resource.uploader_id == user_id).scalar()
+    assert db.get(models.User, user_id).karma == karma
+
+    per_room = dict(
+        db.query(models.Resource.room_id, func.sum(models.Resource.rating_sum))
+        .filter(models.Resource.uploader_id == user_id, models.Resource.room_id.isnot(None))
+        .group_by(models.Resource.room_id)
+    )
+    stored = dict(db.query(models.RoomKarma.room_id, models.RoomKarma.karma).filter(models.RoomKarma.user_id == user_id))
+    assert {room: karma for room, karma in stored.items() if karma} == {room: k for room, k in per_room.items() if k}
+
+    tag = db.query(models.Tag).filter(models.Tag.name == TAG).one()
+    rt, r = models.resource_tags, models.Resource.__table__
+    tagged = dict(db.execute(
+        select(r.c.room_id, func.count())
+        .select_from(rt.join(r, r.c.id == rt.c.resource_id))
+        .where(rt.c.tag_id == tag.id, r.c.room_id.isnot(None))
+        .group_by(r.c.room_id)
+    ).all())
+    assert tag.resource_count == sum(tagged.values())
+    stored = dict(db.query(models.RoomTag.room_id, models.RoomTag.resource_count).filter(models.RoomTag.tag_id == tag.id))
+    assert {room: count for room, count in stored.items() if count} == tagged
+
+
+def test_ratings_comments_and_removals_keep_counters_in_step(client, db, people):
+    alice, bob, carol, admin = people["alice"], people["bob"], people["carol"], people["admin"]
+    alice_id = client.get("/student/me", headers=alice).json()["id"]
+    kept = upload(client, alice, "Counters kept", tags=TAG)
+    removed = upload(client, alice, "Counters removed", room_slug="science", tags=TAG)
+    _assert_consistent(db, alice_id)
+
+    # First ratings, then a changed rating (old_stars > 0)
+    client.post("/student/rate", headers=bob, json={"resource_id": kept, "stars": 4})
+    response = client.post("/student/rate", headers=carol, json={"resource_id": kept, "stars": 5}).json()
+    assert (response["new_average"], response["total_ratings"]) == (4.5, 2)
+    response = client.post("/student/rate", headers=bob, json={"resource_id": kept, "stars": 2}).json()
+    assert (response["new_average"], response["total_ratings"]) == (3.5, 2)
+    client.post("/student/rate", headers=bob, json={"resource_id": removed, "stars": 3})
+    _assert_consistent(db, alice_id)
+    assert client.get("/student/me", headers=alice).json()["karma_score"] == 10
+
+    for i in range(3):
+        client.post("/student/comment", headers=bob, json={"resource_id": kept, "content": f"Counters {i}"})
+    comment_ids = [c["id"] for c in client.get(f"/student/comments/{kept}", headers=bob).json()["comments"]]
+    _assert_consistent(db, alice_id)
+
+    assert client.delete(f"/admin/delete-comment/{comment_ids[0]}", headers=admin).status_code == 200
+    _assert_consistent(db, alice_id)
+
+    # Takes its 3 stars out of alice's karma (overall and in "science") and its tag out of the counts
+    assert client.delete(f"/admin/delete-resource/{removed}", headers=admin).status_code == 200
+    _assert_consistent(db, alice_id)
+    assert client.get("/student/me", headers=alice).json()["karma_score"] == 7
+
+
+def test_admin_removals_are_admin_only(client, people):
+    assert client.delete("/admin/delete-comment/1", headers=people["bob"]).status_code == 403
+    assert client.delete("/admin/delete-resource/1", headers=people["bob"]).status_code == 403
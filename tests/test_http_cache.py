@@ -0,0 +1,83 @@
+"""
+Conditional GET on the polled lists: an unchanged list answers 304, and a
+write to it (through any route) changes its ETag.
+
+Usage:
+    python -m pytest tests/test_http_cache.py
+"""
+import pytest
+
+from conftest import login, upload
+
+
+@pytest.fixture(scope="module")
+def headers(client):
+    return login(client, "cache-alice@example.com")
+
+
+def _etag(client, url, headers):
+    response = client.get(url, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.headers["etag"]
+
+
+def _revalidate(client, url, headers, etag):
+    return client.get(url, headers={**headers, "If-None-Match": etag})
+
+
+def test_unchanged_list_is_not_modified(client, headers):
+    url = "/student/room/civil/resources"
+    etag = _etag(client, url, headers)
+    assert etag.startswith('W/"')
+
+    response = _revalidate(client, url, headers, etag)
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert not response.content
+
+    # The query string is part of the ETag
+    assert _etag(client, url + "?sort=top_rated", headers) != etag
+
+
+def test_upload_invalidates_only_its_room(client, headers):
+    room, other = "/student/room/hum/resources", "/student/room/mech/resources"
+    before, untouched = _etag(client, room, headers), _etag(client, other, headers)
+
+    resource_id = upload(client, headers, "Cache notes", room_slug="hum")
+
+    response = _revalidate(client, room, headers, before)
+    assert response.status_code == 200
+    assert response.headers["etag"] != before
+    assert resource_id in [r["id"] for r in response.json()]
+    assert _revalidate(client, other, headers, untouched).status_code == 304
+
+
+def test_comment_and_moderation_invalidate_comments(client, headers):
+    admin = login(client, "cache-admin@example.com", role="admin")
+    resource_id = upload(client, headers, "Cache comments", room_slug="hum")
+    url = f"/student/comments/{resource_id}"
+
+    etag = _etag(client, url, headers)
+    client.post("/student/comment", headers=headers, json={"resource_id": resource_id, "content": "First"})
+    assert _revalidate(client, url, headers, etag).status_code == 200
+
+    etag = _etag(client, url, headers)
+    comment_id = client.get(url, headers=headers).json()["comments"][0]["id"]
+    client.put(f"/admin/verify-comment/{comment_id}", headers=admin)
+    assert _revalidate(client, url, headers, etag).status_code == 200
+
+    etag = _etag(client, url, headers)
+    client.delete(f"/admin/delete-comment/{comment_id}", headers=admin)
+    response = _revalidate(client, url, headers, etag)
+    assert response.status_code == 200
+    assert response.json()["comments"] == []
+
+
+def test_chat_message_invalidates_history(client, headers):
+    group_id = client.post("/groups/create", headers=headers, json={"name": "Cache group", "description": "d"}).json()["id"]
+    url = f"/groups/{group_id}/messages"
+
+    etag = _etag(client, url, headers)
+    assert _revalidate(client, url, headers, etag).status_code == 304
+    client.post(f"/groups/{group_id}/chat", headers=headers, json={"content": "hello"})
+    assert _revalidate(client, url, headers, etag).status_code == 200
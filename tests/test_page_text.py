@@ -0,0 +1,61 @@
+"""
+Page text sidecars: what write() stores comes back page by page, and the
+file stays plain zstd (the index is a skippable frame).
+
+Usage:
+    python -m pytest tests/test_page_text.py
+"""
+import json
+import shutil
+import subprocess
+
+import pytest
+from langchain_core.documents import Document
+
+from backend.services import page_text
+
+DOCS = [
+    Document(page_content="Entropy — ΔS ≥ 0\nsecond line", metadata={"page": 0, "source": "thermo.pdf"}),
+    Document(page_content="", metadata={"page": 1, "source": "thermo.pdf"}),
+    Document(page_content="Carnot efficiency 1 - Tc/Th", metadata={"page": 2, "source": "thermo.pdf"}),
+]
+SHA = "ab" + "0" * 62
+
+
+@pytest.fixture
+def sidecar(tmp_path, monkeypatch):
+    monkeypatch.setattr(page_text, "PAGE_TEXT_DIR", str(tmp_path))
+    path = page_text.sidecar_path(SHA)
+    page_text.write(path, DOCS)
+    return path
+
+
+def test_round_trip(sidecar):
+    with page_text.PageText(sidecar) as pages:
+        assert len(pages) == len(DOCS)
+        assert pages.page(2) == DOCS[2]
+        assert pages.pages([1, 0]) == [DOCS[1], DOCS[0]]
+        assert pages.pages() == DOCS
+
+
+def test_load_pages_reads_the_sidecar_without_parsing(sidecar):
+    # No PDF at this path: a parse would fail, so the pages came from the sidecar
+    assert page_text.load_pages("missing.pdf", SHA) == DOCS
+
+    page_text.discard(SHA)
+    with pytest.raises(FileNotFoundError):
+        page_text.PageText(sidecar)
+    page_text.discard(SHA)  # already gone is fine
+
+
+def test_other_extract_versions_are_rejected(sidecar, monkeypatch):
+    monkeypatch.setattr(page_text, "EXTRACT_VERSION", page_text.EXTRACT_VERSION + 1)
+    with pytest.raises(ValueError):
+        page_text.PageText(sidecar)
+
+
+@pytest.mark.skipif(shutil.which("zstd") is None, reason="zstd CLI not installed")
+def test_zstd_cli_prints_jsonl(sidecar):
+    output = subprocess.run(["zstd", "-dc", sidecar], capture_output=True, check=True).stdout
+    records = [json.loads(line) for line in output.decode().splitlines()]
+    assert records == [{"text": doc.page_content, "metadata": doc.metadata} for doc in DOCS]
@@ -0,0 +1,167 @@
+"""
+EXPLAIN QUERY PLAN check for the statements the endpoints actually run.
+
+Builds a scratch SQLite database through the migrations, seeds a little of
+everything, then calls each hot endpoint through TestClient while a
+before_cursor_execute hook records the SQL it sends. Every recorded
+statement is EXPLAINed with its own parameters; a statement fails if it
+scans a whole table or sorts in a temp b-tree instead of walking an index.
+Because the SQL comes from the routers themselves, a changed query is
+checked as it is, not as a copy of it.
+
+Usage:
+    python -m pytest tests/test_query_plans.py
+"""
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+from conftest import PDF, login
+
+EXPLAINED = ("SELECT", "WITH", "UPDATE", "DELETE", "INSERT")
+
+# Plans that are expected, and why: (plan line prefix, applies to this SQL)
+ACCEPTED = [
+    # SELECT EXISTS (...) with no FROM; the subquery inside is checked on its own line
+    ("SCAN CONSTANT ROW", lambda sql: True),
+    # bm25 scores only exist once FTS5 has matched, so ranking is a sort;
+    # search.MAX_RANKED_MATCHES bounds how many rows it sorts
+    ("USE TEMP B-TREE FOR ORDER BY", lambda sql: "bm25(resources_fts" in sql),
+]
+
+
+@pytest.fixture(scope="module")
+def app(client):
+    from backend.services import database
+
+    return client, database.engine, _seed(client)
+
+
+def _seed(client) -> dict:
+    alice, bob = login(client, "plans-alice@example.com"), login(client, "plans-bob@example.com")
+
+    resources = []
+    for i in range(3):
+        response = client.post("/student/upload", headers=alice, files={"file": (f"n{i}.pdf", PDF, "application/pdf")},
+                               data={"title": f"Lecture notes {i}", "room_slug": "cs", "tags": "notes, exam"})
+        resources.append(response.json()["resource_id"])
+    client.post("/student/rate", headers=bob, json={"resource_id": resources[0], "stars": 4})
+    for i in range(3):
+        client.post("/student/comment", headers=bob, json={"resource_id": resources[0], "content": f"Comment {i}"})
+
+    group_id = client.post("/groups/create", headers=alice, json={"name": "Physics", "description": "d"}).json()["id"]
+    client.post(f"/groups/{group_id}/join", headers=bob)
+    messages = [
+        client.post(f"/groups/{group_id}/chat", headers=bob, json={"content": f"Message {i}"}).json()["id"]
+        for i in range(3)
+    ]
+    client.post(f"/groups/{group_id}/upload", headers=alice, data={"title": "Shared"},
+                files={"file": ("s.pdf", PDF, "application/pdf")})
+    return {"alice": alice, "bob": bob, "resources": resources, "group": group_id, "messages": messages}
+
+
+def _comments_next_page(client, headers, seed):
+    url = f"/student/comments/{seed['resources'][0]}?limit=2"
+    cursor = client.get(url, headers=headers).json()["next_cursor"]
+    return client.get(f"{url}&cursor={cursor}", headers=headers)
+
+
+def _room_not_modified(client, headers, seed):
+    etag = client.get("/student/room/cs/resources", headers=headers).headers["etag"]
+    return client.get("/student/room/cs/resources", headers={**headers, "If-None-Match": etag})
+
+
+# (label, request) -- each request runs as alice against the seeded database
+ENDPOINTS = [
+    ("auth.login", lambda c, h, s: c.post("/auth/login", data={"username": "plans-alice@example.com", "password": "pw"})),
+    ("student.get_room_resources (newest)", lambda c, h, s: c.get("/student/room/cs/resources", headers=h)),
+    ("student.get_room_resources (top_rated)",
+     lambda c, h, s: c.get("/student/room/cs/resources?sort=top_rated", headers=h)),
+    ("student.get_room_resources (tag)", lambda c, h, s: c.get("/student/room/cs/resources?tag=exam", headers=h)),
+    ("student.get_room_resources (not modified)", _room_not_modified),
+    ("student.get_tag_facets (room)", lambda c, h, s: c.get("/student/tags?room_slug=cs", headers=h)),
+    ("student.get_tag_facets (global)", lambda c, h, s: c.get("/student/tags", headers=h)),
+    ("student.search", lambda c, h, s: c.get("/student/search?q=lecture", headers=h)),
+    ("student.search (room)", lambda c, h, s: c.get("/student/search?q=lecture&room_slug=cs", headers=h)),
+    ("student.rate_resource", lambda c, h, s: c.post("/student/rate", headers=h, json={"resource_id": s["resources"][1], "stars": 5})),
+    ("student.get_comments", lambda c, h, s: c.get(f"/student/comments/{s['resources'][0]}?limit=2", headers=h)),
+    ("student.get_comments (next page)", _comments_next_page),
+    ("student.get_my_profile", lambda c, h, s: c.get("/student/me", headers=h)),
+    ("student.get_leaderboard (global)", lambda c, h, s: c.get("/student/leaderboard", headers=h)),
+    ("student.get_leaderboard (room)", lambda c, h, s: c.get("/student/leaderboard?room_slug=cs", headers=h)),
+    ("groups.get_all_groups", lambda c, h, s: c.get("/groups/all", headers=h)),
+    ("groups.get_all_groups (search)", lambda c, h, s: c.get("/groups/all?search=phy", headers=h)),
+    ("groups.get_group_members", lambda c, h, s: c.get(f"/groups/{s['group']}/members", headers=h)),
+    ("groups.send_message", lambda c, h, s: c.post(f"/groups/{s['group']}/chat", headers=h, json={"content": "hi"})),
+    ("groups.get_chat_history (latest)", lambda c, h, s: c.get(f"/groups/{s['group']}/messages", headers=h)),
+    ("groups.get_chat_history (since_id)", lambda c, h, s: c.get(f"/groups/{s['group']}/messages?since_id={s['messages'][0]}", headers=h)),
+    ("groups.get_chat_history (before_id)", lambda c, h, s: c.get(f"/groups/{s['group']}/messages?before_id={s['messages'][2]}", headers=h)),
+    ("groups.get_group_resources", lambda c, h, s: c.get(f"/groups/{s['group']}/resources", headers=h)),
+]
+
+
+@contextmanager
+def _recorded(engine):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(EXPLAINED) and not executemany:
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+def _problems(sql: str, plan_rows) -> list:
+    found = []
+    for row in plan_rows:
+        detail = row[-1]
+        scans = detail.startswith("SCAN") and "INDEX" not in detail
+        if (scans or "USE TEMP B-TREE" in detail) and not any(
+            detail.startswith(prefix) and accepts(sql) for prefix, accepts in ACCEPTED
+        ):
+            found.append(detail)
+    return found
+
+
+def _unindexed(engine, statements) -> list:
+    failures = []
+    with engine.connect() as conn:
+        for sql, parameters in statements:
+            plan = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + sql, parameters).all()
+            bad = _problems(sql, plan)
+            if bad:
+                failures.append(f"{sql}\n    " + "\n    ".join(bad))
+    return failures
+
+
+@pytest.mark.parametrize("label,call", ENDPOINTS, ids=[label for label, _ in ENDPOINTS])
+def test_endpoint_queries_use_indexes(app, label, call):
+    client, engine, seed = app
+    with _recorded(engine) as statements:
+        response = call(client, seed["alice"], seed)
+    assert response.status_code < 400, response.text
+    assert statements, f"{label} ran no SQL"
+
+    failures = _unindexed(engine, statements)
+    assert not failures, f"{label}: statements without a usable index\n" + "\n\n".join(failures)
+
+
+def test_dashboard_snapshot_uses_indexes(app):
+    # /stats/dashboard serves a cached snapshot, so build one directly
+    from backend.services import dashboard, database
+
+    _, engine, _ = app
+    db = database.SessionLocal()
+    try:
+        with _recorded(engine) as statements:
+            dashboard.build_snapshot(db)
+    finally:
+        db.close()
+
+    failures = _unindexed(engine, statements)
+    assert not failures, "dashboard.build_snapshot: statements without a usable index\n" + "\n\n".join(failures)
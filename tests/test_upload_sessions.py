@@ -0,0 +1,105 @@
+"""
+Resumable uploads through the /student/uploads routes: chunks resume from
+the stored offset after a dropped connection, and completing the session
+hands over exactly the bytes that were sent.
+
+Usage:
+    python -m pytest tests/test_upload_sessions.py
+"""
+import os
+
+import pytest
+
+from conftest import PDF, login
+
+CHUNK = 16
+DATA = PDF + b"x" * 20  # 64 bytes, 4 chunks
+
+
+@pytest.fixture
+def session(client, monkeypatch):
+    from backend.services import upload_sessions
+
+    monkeypatch.setattr(upload_sessions, "CHUNK_SIZE", CHUNK)
+    headers = login(client, "sessions-alice@example.com")
+
+    def create(data: bytes = DATA, **fields) -> str:
+        body = {"title": "Resumed", "room_slug": "cs", "tags": "notes", "filename": "Book.pdf",
+                "size": len(data), **fields}
+        response = client.post("/student/uploads", headers=headers, json=body)
+        assert response.status_code == 200, response.text
+        return response.json()["upload_id"]
+
+    return headers, create
+
+
+def _put(client, headers, upload_id, index, data=DATA):
+    return client.put(f"/student/uploads/{upload_id}/chunks/{index}", headers=headers,
+                      content=data[index * CHUNK:(index + 1) * CHUNK])
+
+
+def test_resume_and_finalize(client, db, session):
+    from backend.services import models, upload_sessions
+
+    headers, create = session
+    upload_id = create()
+    url = f"/student/uploads/{upload_id}"
+
+    assert _put(client, headers, upload_id, 0).json()["offset"] == CHUNK
+    assert _put(client, headers, upload_id, 0).json()["offset"] == CHUNK  # retried chunk is a no-op
+
+    # Skipping ahead is refused with the offset to resume from
+    response = _put(client, headers, upload_id, 2)
+    assert response.status_code == 409
+    assert response.json()["detail"]["next_chunk"] == 1
+
+    # A connection dropped mid-chunk leaves a partial chunk that doesn't count
+    with open(upload_sessions._data_path(upload_id), "ab") as f:
+        f.write(DATA[CHUNK:CHUNK + 5])
+    status = client.get(url, headers=headers).json()
+    assert (status["offset"], status["next_chunk"], status["complete"]) == (CHUNK, 1, False)
+    assert client.post(f"{url}/complete", headers=headers).status_code == 409
+
+    for index in range(status["next_chunk"], 4):
+        status = _put(client, headers, upload_id, index).json()
+    assert status["complete"]
+
+    # Sessions belong to their uploader
+    assert client.get(url, headers=login(client, "sessions-bob@example.com")).status_code == 404
+
+    response = client.post(f"{url}/complete", headers=headers)
+    assert response.status_code == 200, response.text
+    resource = db.get(models.Resource, response.json()["resource_id"])
+    with open(resource.file_path, "rb") as f:
+        assert f.read() == DATA
+    assert resource.title == "Resumed"
+    assert client.get(url, headers=headers).status_code == 404
+    assert not os.path.exists(upload_sessions._session_dir(upload_id))
+
+
+def test_rejects_non_pdf(client, session):
+    from backend.services import upload_sessions
+
+    headers, create = session
+    assert client.post("/student/uploads", headers=headers, json={
+        "title": "t", "room_slug": "cs", "tags": "", "filename": "notes.pdf", "size": 32, "content_type": "text/html",
+    }).status_code == 400
+
+    html = b"<html>" + b"x" * 26
+    upload_id = create(html)
+    assert _put(client, headers, upload_id, 0, html).status_code == 400
+
+    # Bytes that got in some other way are checked again on completion
+    with open(upload_sessions._data_path(upload_id), "wb") as f:
+        f.write(html)
+    assert client.post(f"/student/uploads/{upload_id}/complete", headers=headers).status_code == 400
+    assert not os.path.exists(upload_sessions._session_dir(upload_id))
+
+
+def test_abort(client, session):
+    headers, create = session
+    upload_id = create()
+    _put(client, headers, upload_id, 0)
+
+    assert client.delete(f"/student/uploads/{upload_id}", headers=headers).status_code == 200
+    assert client.get(f"/student/uploads/{upload_id}", headers=headers).status_code == 404